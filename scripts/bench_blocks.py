@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Keeponfirst Local Brain - Markdown Compiler Benchmark
+Measures notion_blocks throughput on a large Markdown document: median
+compile time over --runs runs, reported as blocks/s (nested list items
+included) and MB/s. Without --file the document is generated from a
+worklog-style section with headings, inline markup, nested lists, a table,
+a code block, quotes and links, repeated --sections times.
+
+Usage:
+    python bench_blocks.py
+    python bench_blocks.py --sections 5000 --runs 7
+    python bench_blocks.py --file notes.md --json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from notion_blocks import compile_markdown
+
+SECTION = """## Session {n}: **parser** work on `notion_blocks`
+
+Profiled the *publish* path and found the [hot loop](https://example.com/issues/{n}) in the
+line classifier; per-line dict literals were ~40% of the time.
+
+- Findings
+  - regex dispatch per line is **cheap**
+  - building rich text dominates for *annotated* lines
+    - fast path when a line has no markup
+- Next steps
+1. cache compiled blocks
+2. measure again with ~~old~~ new numbers
+
+| metric | before | after |
+|--------|--------|-------|
+| ms     | {n}    | {n}   |
+
+```py
+def f(x):
+    return x * {n}
+```
+
+> Decision: keep one compiler for all publishers.
+https://example.com/runs/{n}
+---
+"""
+
+
+def _count(blocks: list[dict]) -> int:
+    total = 0
+    for block in blocks:
+        total += 1 + _count(block[block["type"]].get("children", ()))
+    return total
+
+
+def measure(markdown: str, runs: int) -> dict:
+    compile_markdown(markdown)  # warm up
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        blocks = compile_markdown(markdown)
+        times.append(time.perf_counter() - start)
+    seconds = statistics.median(times)
+    count = _count(blocks)
+    mb = len(markdown.encode("utf-8")) / 1e6
+    return {
+        "lines": markdown.count("\n") + 1,
+        "mb": round(mb, 2),
+        "blocks": count,
+        "top_level_blocks": len(blocks),
+        "median_ms": round(seconds * 1000, 1),
+        "blocks_per_s": round(count / seconds),
+        "mb_per_s": round(mb / seconds, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Markdown to Notion blocks throughput")
+    parser.add_argument("--file", type=Path, help="Markdown file to compile (default: a generated document)")
+    parser.add_argument("--sections", type=int, default=2000, help="Sections in the generated document")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs (median is reported)")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a summary")
+    args = parser.parse_args()
+
+    if args.file:
+        if not args.file.exists():
+            print(f"❌ File not found: {args.file}", file=sys.stderr)
+            sys.exit(1)
+        markdown = args.file.read_text(encoding="utf-8")
+    else:
+        markdown = "".join(SECTION.format(n=n) for n in range(args.sections))
+
+    result = measure(markdown, args.runs)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"📄 {result['lines']:,} lines, {result['mb']} MB -> {result['blocks']:,} blocks ({result['top_level_blocks']:,} top-level)")
+        print(f"⚡ {result['median_ms']} ms median: {result['blocks_per_s']:,} blocks/s, {result['mb_per_s']} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Keeponfirst Local Brain - Startup Benchmark
+Measures the cold-start cost of the CLI entry points with `python -X importtime`
+and checks it against a per-command import budget, so a heavy module-level
+import (notion_client, requests, bs4, numpy, ...) sneaking back into a hot
+path shows up as a failure.
+
+For each command it reports the median wall time over --runs runs and the
+time spent importing modules on top of a bare interpreter (`python -c pass`),
+with the heaviest top-level imports. health_check.py is measured as an import
+only, since running it calls the Notion API.
+
+Usage:
+    python bench_startup.py
+    python bench_startup.py --runs 10 --top 8
+    python bench_startup.py --json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+EXAMPLE_RECORD = SCRIPT_DIR.parent / "tests" / "example_idea.json"
+
+# (label, argv after the interpreter, import budget in ms)
+TARGETS = [
+    ("write_record.py --dry-run", ["write_record.py", "--dry-run", "--input", str(EXAMPLE_RECORD)], 60),
+    ("search.py --help", ["search.py", "--help"], 30),
+    ("import health_check", ["-c", "import health_check"], 15),
+]
+
+
+def _run(argv: list[str], importtime: bool = False) -> tuple[float, str]:
+    """(wall ms, stderr) of one interpreter run in the scripts directory."""
+    env = dict(os.environ)
+    # Bytecode is what a real cold start reads; never measure compilation
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    cmd = [sys.executable, *(["-X", "importtime"] if importtime else []), *argv]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=SCRIPT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return (time.perf_counter() - start) * 1000, proc.stderr
+
+
+def parse_importtime(stderr: str) -> dict[str, float]:
+    """Top-level module -> cumulative import ms, from `-X importtime` output."""
+    top = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # the header line
+        name = parts[2]
+        if name.startswith(" ") and not name.startswith("  "):
+            top[name.strip()] = int(parts[1]) / 1000
+    return top
+
+
+def measure(label: str, argv: list[str], budget_ms: float, baseline: set[str], runs: int, top: int) -> dict:
+    _run(argv)  # warm the OS cache and write bytecode
+    walls = [_run(argv)[0] for _ in range(runs)]
+    imports = parse_importtime(_run(argv, importtime=True)[1])
+    own = {name: ms for name, ms in imports.items() if name not in baseline}
+    import_ms = sum(own.values())
+    return {
+        "command": label,
+        "wall_ms": round(statistics.median(walls), 1),
+        "import_ms": round(import_ms, 1),
+        "budget_ms": budget_ms,
+        "ok": import_ms <= budget_ms,
+        "heaviest": [[name, round(ms, 1)] for name, ms in sorted(own.items(), key=lambda kv: -kv[1])[:top]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import benchmark for the CLI scripts")
+    parser.add_argument("--runs", type=int, default=5, help="Wall-time runs per command (median is reported)")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest imports to list per command")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    _run(["-c", "pass"])
+    interpreter_ms = statistics.median(_run(["-c", "pass"])[0] for _ in range(args.runs))
+    baseline = set(parse_importtime(_run(["-c", "pass"], importtime=True)[1]))
+    results = [measure(label, argv, budget, baseline, args.runs, args.top) for label, argv, budget in TARGETS]
+
+    if args.json:
+        print(json.dumps({"interpreter_ms": round(interpreter_ms, 1), "results": results}, indent=2))
+    else:
+        print(f"🐍 Bare interpreter: {interpreter_ms:.0f} ms")
+        for r in results:
+            mark = "✅" if r["ok"] else "❌"
+            print(f"{mark} {r['command']:<28} wall {r['wall_ms']:6.0f} ms   imports {r['import_ms']:5.1f} ms / {r['budget_ms']} ms budget")
+            for name, ms in r["heaviest"]:
+                print(f"      {ms:6.1f} ms  {name}")
+    if not all(r["ok"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Keeponfirst Local Brain - Capture Client
+Thin client for the capture daemon (capture_daemon.py): forwards the draft
+JSON over a Unix socket and prints the daemon's write_record result. Uses
+only the standard library, so it starts in a few milliseconds.
+
+When no daemon is running it hands over to write_record.py with the same
+arguments, so it can replace write_record.py in the capture workflows.
+
+Usage:
+    echo '{"type": "idea", ...}' | python capture_client.py --stdin
+    python capture_client.py --input record.json [--dry-run] [--force]
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+SOCKET_ENV = "KOF_CAPTURE_SOCKET"
+DEFAULT_SOCKET = Path(__file__).resolve().parent.parent / ".agentic" / "capture.sock"
+# Generous: a capture includes the Notion and Supabase round-trips
+REQUEST_TIMEOUT_S = 120
+
+
+def socket_path() -> Path:
+    """Socket the daemon listens on (KOF_CAPTURE_SOCKET overrides the default)."""
+    return Path(os.environ.get(SOCKET_ENV) or DEFAULT_SOCKET)
+
+
+def connect(path: Path = None):
+    """Connected socket to the daemon, or None if it is not running."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path or socket_path()))
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(REQUEST_TIMEOUT_S)
+    return sock
+
+
+def request(sock, message: dict) -> dict:
+    """Send one JSON line and read the one-line JSON reply."""
+    with sock:
+        sock.sendall(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as reply:
+            line = reply.readline()
+    if not line:
+        raise ConnectionError("Capture daemon closed the connection without a reply")
+    return json.loads(line)
+
+
+def _fall_back_to_write_record() -> None:
+    """Replace this process with write_record.py (stdin is still unread)."""
+    script = Path(__file__).resolve().parent / "write_record.py"
+    os.execv(sys.executable, [sys.executable, str(script), *sys.argv[1:]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a capture to the capture daemon")
+    parser.add_argument("--input", "-i", type=str, help="Path to JSON input file")
+    parser.add_argument("--stdin", action="store_true", help="Read JSON from stdin")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be written without actually writing")
+    parser.add_argument("--force", action="store_true", help="Write even if the same capture was stored recently")
+    args = parser.parse_args()
+
+    if not (args.stdin or args.input):
+        parser.error("Either --input or --stdin is required")
+
+    sock = connect()
+    if sock is None:
+        _fall_back_to_write_record()
+
+    if args.stdin:
+        input_data = json.load(sys.stdin)
+    else:
+        with open(args.input, "r", encoding="utf-8") as f:
+            input_data = json.load(f)
+
+    try:
+        result = request(sock, {
+            "op": "write",
+            "input": input_data,
+            "dry_run": args.dry_run,
+            "force": args.force,
+            # The daemon resolves the brain and logs the workspace as write_record.py would here
+            "cwd": os.getcwd(),
+            "log_home": os.environ.get("ANTIGRAVITY_LOG_HOME"),
+        })
+    except (OSError, ValueError) as e:
+        result = {"success": False, "error_code": "DAEMON_ERROR", "error": str(e)}
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if not result.get("success"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Keeponfirst Local Brain - Capture Daemon
+Opt-in resident process that serves captures over a Unix socket, so a
+capture no longer pays for interpreter start-up, imports, .env loading and
+fresh TLS connections. Config, the Notion client, the Supabase connection
+pool, the local index and the seen-URL filter stay warm between captures.
+
+capture_client.py sends the draft JSON; without a running daemon it falls
+back to write_record.py, so nothing changes until the daemon is started.
+Edits to .env are picked up on the next capture. Each capture is resolved
+for the client's working directory and ANTIGRAVITY_LOG_HOME, so it lands in
+the same brain (and logs the same workspace) as write_record.py run there
+would. Captures are handled one at a time; with NOTION_SYNC=outbox their Notion pages are created on a
+background thread.
+
+Usage:
+    python capture_daemon.py --start     # in the background
+    python capture_daemon.py --serve     # in the foreground
+    python capture_daemon.py --status
+    python capture_daemon.py --stop
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from capture_client import connect, request, socket_path
+
+START_TIMEOUT_S = 15
+# Latencies kept for the --status percentiles
+LATENCY_WINDOW = 1000
+
+
+class CaptureServer(socketserver.UnixStreamServer):
+    """Unix socket server holding one warm CaptureContext."""
+
+    def __init__(self, path: Path):
+        from write_record import CaptureContext, _url_parser
+
+        from notion_outbox import OutboxDrainer
+        import http_transport
+        import log_manager
+
+        self.path = path
+        self.context = CaptureContext()
+        self.log = log_manager.enable_buffering()
+        # NOTION_SYNC=outbox: queued Notion pages are created on this thread
+        self.drainer = OutboxDrainer(self.context)
+        self.context.drainer = self.drainer
+        self.drainer.start()
+        # Pay for the lazy imports now rather than on the first capture
+        self.context.notion()
+        _url_parser()
+        http_transport.session()
+        self.started = time.time()
+        self.captures = 0
+        self.latencies_ms: list[float] = []
+        super().__init__(str(path), CaptureHandler)
+        os.chmod(path, 0o600)
+
+    def handle_message(self, message: dict) -> dict:
+        op = message.get("op")
+        if op == "write":
+            return self._write(message)
+        if op == "ping":
+            return {"success": True, **self.status()}
+        if op == "stop":
+            # shutdown() waits for serve_forever, so it must run on another thread
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"success": True, "stopping": True}
+        return {"success": False, "error_code": "INVALID_INPUT", "error": f"Invalid op: {op!r}"}
+
+    def _write(self, message: dict) -> dict:
+        from contextlib import nullcontext
+
+        from write_record import write_record, log_capture, _error_result
+        import log_manager
+
+        start = time.perf_counter()
+        # Clients from before per-request resolution send no cwd: use the daemon's
+        caller = (
+            log_manager.caller_context(message["cwd"], message.get("log_home"))
+            if message.get("cwd") else nullcontext()
+        )
+        try:
+            with caller:
+                self.context.refresh()
+                result = write_record(
+                    message.get("input"),
+                    dry_run=bool(message.get("dry_run")),
+                    force=bool(message.get("force")),
+                    context=self.context,
+                )
+                if result["success"]:
+                    log_capture(result)
+        except Exception as e:
+            result = _error_result(e)
+        self.captures += 1
+        self.latencies_ms = self.latencies_ms[-(LATENCY_WINDOW - 1):] + [(time.perf_counter() - start) * 1000]
+        return result
+
+    def status(self) -> dict:
+        latencies = sorted(self.latencies_ms)
+
+        def pct(p: float):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1) if latencies else None
+
+        return {
+            "pid": os.getpid(),
+            "socket": str(self.path),
+            "uptime_s": round(time.time() - self.started),
+            "captures": self.captures,
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+        }
+
+    def server_close(self) -> None:
+        import http_transport
+
+        super().server_close()
+        self.drainer.stop()
+        self.drainer.join(timeout=5)
+        self.context.close()
+        http_transport.close()
+        self.log.close()
+        self.path.unlink(missing_ok=True)
+
+
+class CaptureHandler(socketserver.StreamRequestHandler):
+    """One JSON request line in, one JSON reply line out."""
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            message = json.loads(line)
+            if not isinstance(message, dict):
+                raise ValueError("expected a JSON object")
+            reply = self.server.handle_message(message)
+        except ValueError as e:
+            reply = {"success": False, "error_code": "INVALID_INPUT", "error": f"Invalid request: {e}"}
+        self.wfile.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+def serve(path: Path) -> None:
+    """Run the daemon in the foreground until --stop or Ctrl-C."""
+    if connect(path) is not None:
+        print(f"❌ Capture daemon already running on {path}", file=sys.stderr)
+        sys.exit(1)
+    # Leftover from a daemon that did not shut down cleanly
+    path.unlink(missing_ok=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    server = CaptureServer(path)
+    print(f"✅ Capture daemon listening on {path} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print("👋 Capture daemon stopped", flush=True)
+
+
+def start(path: Path) -> None:
+    """Start the daemon in the background and wait until it answers."""
+    if connect(path) is not None:
+        print(f"✅ Capture daemon already running on {path}")
+        return
+    log_path = path.with_name("capture_daemon.log")
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "ab") as log:
+        proc = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "--serve"],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+            start_new_session=True,
+        )
+    deadline = time.monotonic() + START_TIMEOUT_S
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            print(f"❌ Capture daemon exited during start-up; see {log_path}", file=sys.stderr)
+            sys.exit(1)
+        sock = connect(path)
+        if sock is not None:
+            sock.close()
+            print(f"✅ Capture daemon started (pid {proc.pid}) on {path}")
+            return
+        time.sleep(0.05)
+    print(f"❌ Capture daemon did not answer within {START_TIMEOUT_S}s; see {log_path}", file=sys.stderr)
+    sys.exit(1)
+
+
+def send(path: Path, op: str) -> dict:
+    sock = connect(path)
+    if sock is None:
+        print(f"⚪ Capture daemon not running ({path})")
+        sys.exit(1)
+    return request(sock, {"op": op})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident capture daemon (Unix socket)")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--start", action="store_true", help="Start in the background")
+    group.add_argument("--serve", action="store_true", help="Run in the foreground")
+    group.add_argument("--status", action="store_true", help="Show pid, uptime and capture latency")
+    group.add_argument("--stop", action="store_true", help="Stop a running daemon")
+    args = parser.parse_args()
+
+    path = socket_path()
+    if args.serve:
+        serve(path)
+    elif args.start:
+        start(path)
+    elif args.status:
+        print(json.dumps(send(path, "ping"), indent=2))
+    elif args.stop:
+        send(path, "stop")
+        print("✅ Capture daemon stopping")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,19 +6,86 @@ Supports auto-initialization of Root Page.
 
 import os
 import json
+from datetime import datetime
 from pathlib import Path
 from dataclasses import dataclass
 from typing import Literal, Optional
-from dotenv import load_dotenv
-import log_manager
 
-# Find project root and load .env
+# Find project root (.env is loaded on first use, see load_env)
 PROJECT_ROOT = Path(__file__).parent.parent
-load_dotenv(PROJECT_ROOT / ".env")
+ENV_FILE = PROJECT_ROOT / ".env"
+_env_loaded = False
+_env_stamp = None  # (mtime_ns, size) of .env when it was last loaded (None: no .env)
+_env_keys: set = set()  # keys that came from .env (not from the real environment)
+
+# Environment variables Config.load reads (a change to any of them reloads the cached Config)
+CONFIG_ENV_KEYS = (
+    "NOTION_TOKEN", "NOTION_PARENT", "NOTION_MODE", "PRIMARY_LANGUAGE", "RECORD_STORAGE",
+    "MARKDOWN_MODE", "DEDUPE_WINDOW_MINUTES", "WARN_SEEN_URLS", "RECORD_LAYOUT", "NOTION_SYNC",
+)
+# get_config() cache: (stamp, Config)
+_config_cache: Optional[tuple] = None
 
 # Local state file for storing auto-generated config
 STATE_FILE = PROJECT_ROOT / ".local_state.json"
 
+# Record type -> subdirectory under records/
+RECORD_TYPE_DIRS = {
+    "decision": "decisions",
+    "worklog": "worklogs",
+    "idea": "ideas",
+    "backlog": "backlogs",
+}
+DEFAULT_RECORD_DIR = "other"
+
+# Local record storage backends: one JSON+MD file pair per record, or append-only segments
+RECORD_STORAGE_BACKENDS = ("files", "segments")
+# When the human-readable .md is produced: on every capture, or on demand (markdown_view.py)
+MARKDOWN_MODES = ("eager", "lazy")
+# Record files directly under records/<type>/, or sharded as records/<type>/YYYY/MM/
+RECORD_LAYOUTS = ("flat", "sharded")
+# Notion page created during the capture, or afterwards from the outbox (notion_outbox.py)
+NOTION_SYNC_MODES = ("inline", "outbox")
+
+
+def shard_subpath(when: datetime) -> Path:
+    """YYYY/MM shard directory (relative to a type directory) for a capture time."""
+    return Path(f"{when.year:04d}") / f"{when.month:02d}"
+
+
+def _file_stamp(path: Path) -> Optional[tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def load_env() -> None:
+    """
+    Load .env into the environment; deferred so importing config stays cheap.
+    Re-reads it only when the file changed. Like load_dotenv, variables set in
+    the real environment win; values that came from .env follow its edits.
+    """
+    global _env_loaded, _env_stamp, _env_keys
+    stamp = _file_stamp(ENV_FILE)
+    if _env_loaded and stamp == _env_stamp:
+        return
+    values = {}
+    if stamp is not None:
+        from dotenv import dotenv_values
+
+        values = {k: v for k, v in dotenv_values(ENV_FILE).items() if v is not None}
+    for key in _env_keys - values.keys():
+        os.environ.pop(key, None)
+    keys = set()
+    for key, value in values.items():
+        if key in os.environ and key not in _env_keys:
+            continue
+        os.environ[key] = value
+        keys.add(key)
+    _env_loaded, _env_stamp, _env_keys = True, stamp, keys
+
 
 def load_local_state() -> dict:
     """Load local state from file."""
@@ -48,18 +115,44 @@ class Config:
     records_dir: Path
     assets_dir: Path
     
+    record_storage: str = "files"  # files | segments
+    markdown_mode: str = "eager"   # eager | lazy
+    dedupe_window_minutes: float = 60.0  # identical captures within this window are not re-written (0 = off)
+    warn_seen_urls: bool = True  # warn when a captured URL was captured before
+    record_layout: str = "flat"  # flat | sharded
+    notion_sync: str = "inline"  # inline | outbox
+    
     @classmethod
     def load(cls) -> "Config":
         """Load configuration from environment variables and local state."""
+        load_env()
         token = os.getenv("NOTION_TOKEN")
         parent = os.getenv("NOTION_PARENT", "").strip()
         mode = os.getenv("NOTION_MODE", "page").lower()
         lang = os.getenv("PRIMARY_LANGUAGE", "en")
+        storage = os.getenv("RECORD_STORAGE", "files").strip().lower() or "files"
+        markdown_mode = os.getenv("MARKDOWN_MODE", "eager").strip().lower() or "eager"
+        dedupe_window = os.getenv("DEDUPE_WINDOW_MINUTES", "60").strip() or "60"
+        warn_seen_urls = os.getenv("WARN_SEEN_URLS", "true").strip().lower() not in ("0", "false", "no")
+        layout = os.getenv("RECORD_LAYOUT", "flat").strip().lower() or "flat"
+        notion_sync = os.getenv("NOTION_SYNC", "inline").strip().lower() or "inline"
         
         if not token:
             raise ValueError("NOTION_TOKEN is required. Set it in .env file.")
         if mode not in ("database", "page"):
             raise ValueError(f"NOTION_MODE must be 'database' or 'page', got: {mode}")
+        if storage not in RECORD_STORAGE_BACKENDS:
+            raise ValueError(f"RECORD_STORAGE must be one of {RECORD_STORAGE_BACKENDS}, got: {storage}")
+        if markdown_mode not in MARKDOWN_MODES:
+            raise ValueError(f"MARKDOWN_MODE must be one of {MARKDOWN_MODES}, got: {markdown_mode}")
+        if layout not in RECORD_LAYOUTS:
+            raise ValueError(f"RECORD_LAYOUT must be one of {RECORD_LAYOUTS}, got: {layout}")
+        if notion_sync not in NOTION_SYNC_MODES:
+            raise ValueError(f"NOTION_SYNC must be one of {NOTION_SYNC_MODES}, got: {notion_sync}")
+        try:
+            dedupe_window_minutes = float(dedupe_window)
+        except ValueError:
+            raise ValueError(f"DEDUPE_WINDOW_MINUTES must be a number, got: {dedupe_window}")
         
         # Check for auto-initialized root page
         auto_init = False
@@ -70,6 +163,8 @@ class Config:
                 auto_init = True
         
         # Use Central Log Home as the Brain Root
+        import log_manager
+
         try:
             brain_root = log_manager.resolve_log_home()
         except Exception:
@@ -84,14 +179,27 @@ class Config:
             primary_language=lang,
             records_dir=brain_root / "records",
             assets_dir=brain_root / "assets",
+            record_storage=storage,
+            markdown_mode=markdown_mode,
+            dedupe_window_minutes=dedupe_window_minutes,
+            warn_seen_urls=warn_seen_urls,
+            record_layout=layout,
+            notion_sync=notion_sync,
         )
     
     def ensure_dirs(self) -> None:
         """Ensure all required directories exist."""
-        for subdir in ["decisions", "worklogs", "ideas", "backlogs"]:
+        for subdir in RECORD_TYPE_DIRS.values():
             (self.records_dir / subdir).mkdir(parents=True, exist_ok=True)
         (self.assets_dir / "prompts").mkdir(parents=True, exist_ok=True)
     
+    def record_dir(self, record_type: str, when: Optional[datetime] = None) -> Path:
+        """Directory a new record file goes to, per RECORD_LAYOUT."""
+        base = self.records_dir / RECORD_TYPE_DIRS.get(record_type, DEFAULT_RECORD_DIR)
+        if self.record_layout == "sharded":
+            return base / shard_subpath(when or datetime.now())
+        return base
+    
     def save_root_page(self, page_id: str) -> None:
         """Save auto-created root page ID to local state."""
         state = load_local_state()
@@ -106,8 +214,34 @@ class Config:
 
 
 def get_config() -> Config:
-    """Get configuration singleton."""
-    return Config.load()
+    """
+    Get configuration singleton. The cached Config is reused until .env,
+    .local_state.json, the environment or the resolved log home change.
+    """
+    global _config_cache
+    load_env()
+    import log_manager
+
+    try:
+        home = log_manager.resolve_log_home()
+    except Exception:
+        home = None
+    stamp = (_env_stamp, _file_stamp(STATE_FILE), tuple(map(os.environ.get, CONFIG_ENV_KEYS)), home)
+    if _config_cache is not None and _config_cache[0] == stamp:
+        return _config_cache[1]
+    config = Config.load()
+    _config_cache = (stamp, config)
+    return config
+
+
+def invalidate_config() -> None:
+    """Drop the cached Config and log-home resolutions; the next get_config() reloads."""
+    global _config_cache, _env_loaded
+    import log_manager
+
+    _config_cache = None
+    _env_loaded = False
+    log_manager.invalidate_log_home_cache()
 
 
 if __name__ == "__main__":
@@ -121,6 +255,6 @@ if __name__ == "__main__":
         else:
             print("   Parent: Not set (needs initialization)")
         print(f"   Auto-init: {config.auto_init}")
-        print(f"   Records: {config.records_dir}")
+        print(f"   Records: {config.records_dir} ({config.record_storage})")
     except ValueError as e:
         print(f"❌ Configuration error: {e}")
@@ -1,9 +1,9 @@
-from notion_client import Client
 from config import get_config
+import http_transport
 
 def main():
     config = get_config()
-    client = Client(auth=config.notion_token)
+    client = http_transport.notion_sdk(config.notion_token)
     
     print("Searching for databases...")
     
@@ -61,16 +61,16 @@ def check_notion_api() -> Dict[str, Any]:
         # Try to retrieve the parent page (lightweight check)
         if config.notion_parent:
             # Simple API call to verify connectivity
-            import requests
+            import http_transport
             headers = {
                 "Authorization": f"Bearer {config.notion_token}",
                 "Notion-Version": "2022-06-28"
             }
             start = datetime.now()
-            resp = requests.get(
+            resp = http_transport.session().get(
                 f"https://api.notion.com/v1/pages/{config.notion_parent}",
                 headers=headers,
-                timeout=10
+                timeout=http_transport.timeout(10)
             )
             latency = (datetime.now() - start).total_seconds() * 1000
             
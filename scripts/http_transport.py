@@ -0,0 +1,118 @@
+"""
+Keeponfirst Local Brain - HTTP Transport
+One set of keep-alive connection pools per process, shared by every HTTP
+call site: Notion (an httpx client under notion_client), Supabase and URL
+fetching (a requests session). Connections are pooled per host, so batch
+captures and the capture daemon reuse TCP+TLS sessions instead of paying a
+handshake per request. Nothing is imported until first use.
+
+Settings (.env):
+    HTTP_POOL_SIZE       connections kept alive per host (default 10)
+    HTTP_TIMEOUT_S       request timeout in seconds for every call site
+                         (default: each call site's own, 10-60 s)
+    HTTP_GZIP_REQUESTS   gzip JSON request bodies over 1 KB sent to Supabase
+                         (default false; needs a gateway that accepts them)
+"""
+
+import gzip
+import json
+import os
+import threading
+
+DEFAULT_POOL_SIZE = 10
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+
+_lock = threading.Lock()
+_session = None
+_httpx_client = None
+
+
+def pool_size() -> int:
+    try:
+        return max(1, int(os.environ.get("HTTP_POOL_SIZE", "").strip() or DEFAULT_POOL_SIZE))
+    except ValueError:
+        return DEFAULT_POOL_SIZE
+
+
+def timeout(default: float) -> float:
+    """HTTP_TIMEOUT_S if set, else the call site's default."""
+    try:
+        return float(os.environ.get("HTTP_TIMEOUT_S", "").strip() or default)
+    except ValueError:
+        return default
+
+
+def gzip_requests() -> bool:
+    return os.environ.get("HTTP_GZIP_REQUESTS", "").strip().lower() in ("1", "true", "yes")
+
+
+def session():
+    """Process-wide requests.Session with a keep-alive pool of HTTP_POOL_SIZE connections per host."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                new = requests.Session()
+                adapter = HTTPAdapter(pool_connections=DEFAULT_POOL_SIZE, pool_maxsize=pool_size())
+                new.mount("https://", adapter)
+                new.mount("http://", adapter)
+                _session = new
+    return _session
+
+
+def httpx_client():
+    """Process-wide httpx.Client for Notion (notion_client sets its base URL, token and timeout)."""
+    global _httpx_client
+    if _httpx_client is None:
+        with _lock:
+            if _httpx_client is None:
+                import httpx
+
+                size = pool_size()
+                _httpx_client = httpx.Client(
+                    limits=httpx.Limits(max_connections=size, max_keepalive_connections=size)
+                )
+    return _httpx_client
+
+
+def notion_sdk(token: str, retry: bool = True):
+    """
+    notion_client.Client on the shared pool. One token per process: every
+    client made here shares the pool's auth header. retry=False leaves
+    retries to the caller (NotionClient paces them with its token bucket).
+    Releases without the `retry` option have no built-in retries, so the
+    option is only passed where it exists.
+    """
+    from notion_client import Client
+    from notion_client.client import ClientOptions
+
+    options = {"auth": token, "timeout_ms": int(timeout(60) * 1000)}
+    if not retry and "retry" in ClientOptions.__dataclass_fields__:
+        options["retry"] = False
+    return Client(options, client=httpx_client())
+
+
+def post_json(url: str, payload, headers: dict, default_timeout: float):
+    """POST a JSON body on the shared session, gzip-compressed when HTTP_GZIP_REQUESTS is on."""
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = {**headers, "Content-Type": "application/json"}
+    if gzip_requests() and len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return session().post(url, data=body, headers=headers, timeout=timeout(default_timeout))
+
+
+def close() -> None:
+    """Close the pools (capture daemon shutdown)."""
+    global _session, _httpx_client
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+        if _httpx_client is not None:
+            _httpx_client.close()
+            _httpx_client = None
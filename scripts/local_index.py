@@ -0,0 +1,852 @@
+#!/usr/bin/env python3
+"""
+Keeponfirst Local Brain - Local Search Index
+Offline full-text index over the JSON records under records/ (record files
+and, when used, the segment store; segment records are keyed "segment:<id>").
+Backed by SQLite FTS5 (.agentic/local_index.sqlite in the brain root). The
+KOFNote desktop index (.agentic/kofnote_search.sqlite) is never touched.
+
+Usage:
+    python local_index.py --rebuild
+    python local_index.py --sync       # pick up files added/edited by hand
+    python local_index.py --query "api refactoring"
+    python local_index.py --since 7d
+    python local_index.py --between 2026-09-01 2026-09-30
+    python local_index.py --facets
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config import RECORD_TYPE_DIRS, DEFAULT_RECORD_DIR
+from segment_store import SegmentStore, parse_uri
+
+INDEX_FILENAME = ".agentic/local_index.sqlite"
+SCHEMA_VERSION = "8"
+
+# Columns of records_fts, in table order (same as the KOFNote desktop index)
+FTS_COLUMNS = (
+    "json_path", "md_path", "record_type", "title", "final_body", "source_text",
+    "tags", "created_at", "date", "notion_sync_status", "notion_page_id",
+    "notion_url", "notion_error",
+)
+# Only these columns take part in MATCH; the rest are metadata
+SEARCH_COLUMNS = ("title", "final_body", "source_text", "tags")
+# bm25() weights, one per FTS column (title and tags count most)
+BM25_WEIGHTS = (0, 0, 0, 10.0, 1.0, 0.5, 5.0, 0, 0, 0, 0, 0, 0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_SINCE_RE = re.compile(r"^(\d+)\s*([hdwm])$")
+_SINCE_UNITS = {"h": "hours", "d": "days", "w": "weeks", "m": "months"}
+# Query parameters that only track the click, not the content
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "igshid", "mc_cid", "mc_eid", "ref_src")
+
+
+@dataclass
+class SearchHit:
+    """One ranked result from the local index."""
+    title: str
+    record_type: str
+    created_at: str
+    date: Optional[str]
+    tags: list[str]
+    notion_url: Optional[str]
+    json_path: str
+    md_path: str
+    score: float
+
+
+@dataclass
+class RecordFilter:
+    """Structured filters answered by the index: time window, type and tags."""
+    start_ts: Optional[float] = None
+    end_ts: Optional[float] = None
+    record_type: Optional[str] = None
+    tags: Optional[list[str]] = None
+    match_all_tags: bool = True  # AND (all tags) vs OR (any tag)
+
+    @property
+    def active(self) -> bool:
+        return any(v is not None for v in (self.start_ts, self.end_ts, self.record_type)) or bool(self.tags)
+
+
+@dataclass
+class SyncStats:
+    """Outcome of an incremental index sync."""
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    elapsed_ms: float = 0.0
+
+
+def _month_bounds(year: int, month: int) -> tuple[float, float]:
+    """[start, end) of a calendar month in local time, as epoch seconds."""
+    start = datetime(year, month, 1)
+    end = datetime(year + month // 12, month % 12 + 1, 1)
+    return start.timestamp(), end.timestamp()
+
+
+def _overlaps(bounds: tuple[float, float], start_ts: Optional[float], end_ts: Optional[float]) -> bool:
+    return (start_ts is None or bounds[1] > start_ts) and (end_ts is None or bounds[0] < end_ts)
+
+
+def _scan_json(dir_path: str) -> Iterator[os.DirEntry]:
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            if entry.name.endswith(".json") and entry.is_file():
+                yield entry
+
+
+def iter_record_entries(
+    records_dir: Path,
+    start_ts: Optional[float] = None,
+    end_ts: Optional[float] = None,
+) -> Iterator[os.DirEntry]:
+    """
+    Yield a DirEntry for every record JSON file under records_dir, in both
+    the flat (records/<type>/) and sharded (records/<type>/YYYY/MM/) layouts.
+    start_ts/end_ts skip whole YYYY/MM shards captured outside the range;
+    flat files are always yielded, so callers still filter by record time.
+    """
+    for subdir in (*RECORD_TYPE_DIRS.values(), DEFAULT_RECORD_DIR):
+        dir_path = records_dir / subdir
+        if not dir_path.is_dir():
+            continue
+        with os.scandir(dir_path) as it:
+            entries = list(it)
+        for entry in entries:
+            if entry.name.endswith(".json") and entry.is_file():
+                yield entry
+            elif len(entry.name) == 4 and entry.name.isdigit() and entry.is_dir():
+                year = int(entry.name)
+                if not _overlaps((datetime(year, 1, 1).timestamp(), datetime(year + 1, 1, 1).timestamp()), start_ts, end_ts):
+                    continue
+                with os.scandir(entry.path) as months:
+                    shards = [m for m in months if len(m.name) == 2 and m.name.isdigit() and m.is_dir()]
+                for shard in sorted(shards, key=lambda m: m.name):
+                    month = int(shard.name)
+                    if 1 <= month <= 12 and _overlaps(_month_bounds(year, month), start_ts, end_ts):
+                        yield from _scan_json(shard.path)
+
+
+def iter_record_files(records_dir: Path) -> Iterator[Path]:
+    """Yield every record JSON file under records_dir."""
+    for entry in iter_record_entries(records_dir):
+        yield Path(entry.path)
+
+
+def _watermark(st: os.stat_result) -> tuple[int, int, int]:
+    """Change watermark for a record file: (mtime_ns, size, inode)."""
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def normalize_tags(tags) -> list[str]:
+    """Tags as a clean, lowercased, de-duplicated list (accepts a list or comma string)."""
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    seen = []
+    for tag in tags:
+        tag = str(tag).strip().lower()
+        if tag and tag not in seen:
+            seen.append(tag)
+    return seen
+
+
+def normalize_url(url: Optional[str]) -> str:
+    """Canonical form of a URL for seen-URL lookups ("" if it is not http(s))."""
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return ""
+    if parts.scheme.lower() not in ("http", "https") or not parts.hostname:
+        return ""
+    host = parts.hostname.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    )
+    return urlunsplit(("https", host, parts.path.rstrip("/"), urlencode(query), ""))
+
+
+def _normalize_text(text: Optional[str]) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text or "").split()).casefold()
+
+
+def capture_hash(record_type: str, title: str, final_body: str, source_text: str) -> str:
+    """Dedupe key of a capture: hash of its normalized type, title, body and source text."""
+    parts = (record_type, title, final_body, source_text)
+    return hashlib.sha256("\x1f".join(_normalize_text(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def record_capture_hash(record: dict) -> str:
+    """Stored dedupe key of a record (computed from its fields for older records)."""
+    return record.get("content_hash") or capture_hash(
+        record.get("type") or record.get("record_type") or "",
+        record.get("title") or "",
+        record.get("final_body") or "",
+        record.get("source_text") or "",
+    )
+
+
+def parse_timestamp(value: Optional[str]) -> float:
+    """Epoch seconds for an ISO timestamp or date (naive values are local time); 0.0 if unparseable."""
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def record_timestamp(record: dict) -> float:
+    """When a record happened: its `date` (local midnight) if set, else created_at."""
+    return parse_timestamp(record.get("date")) or parse_timestamp(record.get("created_at"))
+
+
+def parse_since(value: str, now: Optional[datetime] = None) -> float:
+    """
+    Start of a relative window such as 12h, 7d, 2w or 3m, as epoch seconds.
+    Day-based units start at local midnight, so 7d means "today and the 7 days before".
+    """
+    match = _SINCE_RE.match(value.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid --since value: {value!r} (expected e.g. 12h, 7d, 2w, 3m)")
+    amount, unit = int(match.group(1)), match.group(2)
+    now = now or datetime.now()
+    if unit == "h":
+        return (now - timedelta(hours=amount)).timestamp()
+    days = amount * {"d": 1, "w": 7, "m": 30}[unit]
+    start = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return start.timestamp()
+
+
+def day_range(first_day: str, last_day: str) -> tuple[float, float]:
+    """[start, end) epoch seconds covering two inclusive YYYY-MM-DD days."""
+    start = datetime.fromisoformat(first_day)
+    end = datetime.fromisoformat(last_day) + timedelta(days=1)
+    return start.timestamp(), end.timestamp()
+
+
+def build_match_query(query: str, operator: str = "AND") -> Optional[str]:
+    """Turn free text into an FTS5 MATCH expression (prefix terms, content columns only)."""
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    terms = f" {operator} ".join(f'"{t}"*' for t in tokens)
+    return f"{{{' '.join(SEARCH_COLUMNS)}}} : ({terms})"
+
+
+def is_notion_pending(record: dict) -> bool:
+    """True for a record whose Notion page was never created (sync failed or still queued)."""
+    return not record.get("notion_page_id") and record.get("notion_sync_status") in ("PENDING", "FAILED")
+
+
+def _row_from_record(json_path, record: dict) -> tuple:
+    """Map a LocalRecord dict to a records_fts row."""
+    tags = record.get("tags") or []
+    if isinstance(tags, str):
+        tags = [t.strip() for t in tags.split(",") if t.strip()]
+    # Segment records have no .md file; their URI is also their Markdown locator
+    md_path = json_path if parse_uri(json_path) else Path(json_path).with_suffix(".md")
+    return (
+        str(json_path),
+        str(md_path),
+        record.get("type") or record.get("record_type") or "",
+        record.get("title") or "",
+        record.get("final_body") or "",
+        record.get("source_text") or "",
+        ",".join(tags),
+        record.get("created_at") or "",
+        record.get("date") or "",
+        record.get("notion_sync_status") or "",
+        record.get("notion_page_id"),
+        record.get("notion_url"),
+        record.get("notion_error"),
+    )
+
+
+def _load_record(json_path: Path) -> Optional[dict]:
+    """Read a record JSON file, warning (not failing) on bad files."""
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Skipping {json_path.name}: {e}", file=sys.stderr)
+        return None
+
+
+class LocalIndex:
+    """SQLite FTS5 index over local records."""
+
+    def __init__(self, records_dir: Path, db_path: Optional[Path] = None):
+        self.records_dir = Path(records_dir)
+        self.db_path = Path(db_path) if db_path else self.records_dir.parent / INDEX_FILENAME
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @classmethod
+    def for_config(cls, config) -> "LocalIndex":
+        """Index living next to config.records_dir (the brain root)."""
+        return cls(config.records_dir)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ── Schema ────────────────────────────────────────────────────────────────
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        try:
+            row = self.conn.execute(
+                "SELECT value FROM records_index_meta WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO records_index_meta (key, value) VALUES (?, ?)",
+            (key, value),
+        )
+
+    def is_current(self) -> bool:
+        """True if the on-disk index exists with the expected schema."""
+        return self._get_meta("schemaVersion") == SCHEMA_VERSION
+
+    def _create_schema(self) -> None:
+        conn = self.conn
+        conn.execute("DROP TABLE IF EXISTS records_fts")
+        conn.execute("DROP TABLE IF EXISTS records_index_meta")
+        conn.execute("DROP TABLE IF EXISTS records_files")
+        conn.execute("DROP TABLE IF EXISTS records_tags")
+        conn.execute("DROP TABLE IF EXISTS records_tag_counts")
+        conn.execute("DROP TABLE IF EXISTS records_urls")
+        columns = ",\n            ".join(
+            f"{c} UNINDEXED" if c in ("json_path", "md_path", "notion_page_id", "notion_url", "notion_error") else c
+            for c in FTS_COLUMNS
+        )
+        conn.execute(f"CREATE VIRTUAL TABLE records_fts USING fts5(\n            {columns}\n         )")
+        conn.execute(
+            """CREATE TABLE records_index_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+         )"""
+        )
+        # One row per indexed record: FTS rowid plus its change watermark
+        # (segment records store offset, length, segment in the same three columns)
+        conn.execute(
+            """CREATE TABLE records_files (
+            json_path TEXT PRIMARY KEY,
+            fts_rowid INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            inode INTEGER NOT NULL,
+            record_type TEXT NOT NULL,
+            record_ts REAL NOT NULL,
+            content_hash TEXT NOT NULL,
+            notion_pending INTEGER NOT NULL DEFAULT 0
+         )"""
+        )
+        # B-tree time index for window queries (recall --since/--between)
+        conn.execute("CREATE INDEX records_files_ts ON records_files (record_ts, record_type)")
+        conn.execute("CREATE INDEX records_files_rowid ON records_files (fts_rowid)")
+        # Capture dedupe lookups (write_record)
+        conn.execute("CREATE INDEX records_files_hash ON records_files (content_hash)")
+        # Records still waiting for their Notion page (notion_outbox.py --retry-pending)
+        conn.execute("CREATE INDEX records_files_notion_pending ON records_files (record_ts) WHERE notion_pending = 1")
+        # Tag -> record postings, plus per-tag counts maintained by triggers
+        conn.execute(
+            """CREATE TABLE records_tags (
+            tag TEXT NOT NULL,
+            fts_rowid INTEGER NOT NULL,
+            PRIMARY KEY (tag, fts_rowid)
+         ) WITHOUT ROWID"""
+        )
+        conn.execute("CREATE INDEX records_tags_rowid ON records_tags (fts_rowid)")
+        # Normalized source_url -> record (seen-URL lookups, see seen_urls.py).
+        # seq is never reused (unlike FTS rowids), so the Bloom filter tops up by it
+        conn.execute(
+            """CREATE TABLE records_urls (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            fts_rowid INTEGER NOT NULL
+         )"""
+        )
+        conn.execute("CREATE INDEX records_urls_url ON records_urls (url)")
+        conn.execute("CREATE INDEX records_urls_rowid ON records_urls (fts_rowid)")
+        conn.execute(
+            """CREATE TABLE records_tag_counts (
+            tag TEXT PRIMARY KEY,
+            count INTEGER NOT NULL
+         ) WITHOUT ROWID"""
+        )
+        conn.execute(
+            """CREATE TRIGGER records_tags_insert AFTER INSERT ON records_tags BEGIN
+            INSERT INTO records_tag_counts (tag, count) VALUES (new.tag, 1)
+                ON CONFLICT (tag) DO UPDATE SET count = count + 1;
+         END"""
+        )
+        conn.execute(
+            """CREATE TRIGGER records_tags_delete AFTER DELETE ON records_tags BEGIN
+            UPDATE records_tag_counts SET count = count - 1 WHERE tag = old.tag;
+            DELETE FROM records_tag_counts WHERE tag = old.tag AND count <= 0;
+         END"""
+        )
+        self._set_meta("schemaVersion", SCHEMA_VERSION)
+        self._set_meta("createdAt", datetime.now().astimezone().isoformat())
+
+    # ── Build ─────────────────────────────────────────────────────────────────
+
+    def _segments(self) -> Optional[SegmentStore]:
+        """The segment store next to the record files, if one has been written."""
+        store = SegmentStore(self.records_dir)
+        return store if store.exists() else None
+
+    def load(self, json_path) -> Optional[tuple[dict, tuple[int, int, int]]]:
+        """(record, watermark) for a record file or segment URI, or None if it is gone."""
+        record_id = parse_uri(json_path)
+        if record_id is None:
+            record = _load_record(Path(json_path))
+            return (record, _watermark(Path(json_path).stat())) if record is not None else None
+        store = SegmentStore(self.records_dir)
+        try:
+            ref = store.ref(record_id) if store.exists() else None
+            return (store.read(ref), ref.watermark) if ref is not None else None
+        finally:
+            store.close()
+
+    def rebuild(self, only_if_stale: bool = False) -> int:
+        """
+        Drop and rebuild the index from every JSON record on disk.
+        only_if_stale skips the rebuild if another process finished one meanwhile.
+        """
+        loaded = []
+        for entry in iter_record_entries(self.records_dir):
+            record = _load_record(Path(entry.path))
+            if record is not None:
+                loaded.append((Path(entry.path), record, _watermark(entry.stat())))
+        store = self._segments()
+        if store is not None:
+            try:
+                loaded.extend((ref.uri, record, ref.watermark) for ref, record in store.iter_records())
+            finally:
+                store.close()
+
+        with self.conn:
+            # Schema changes are not transactional by default; take the write lock up front
+            self.conn.execute("BEGIN IMMEDIATE")
+            if only_if_stale and self.is_current():
+                return 0
+            self._create_schema()
+            for json_path, record, watermark in loaded:
+                self._write_row(json_path, record, watermark)
+            self._touch_meta()
+        return len(loaded)
+
+    def upsert(self, json_path, record: Optional[dict] = None, watermark: Optional[tuple] = None) -> None:
+        """
+        Index (or re-index) a single record. Called by save_local on every capture.
+        json_path is a record file or a segment URI; watermark defaults to the file's stat().
+        """
+        # First use builds the index; the record is (re)written below either way,
+        # in case a concurrent build scanned the disk before it existed
+        self.ensure_built()
+        record_id = parse_uri(json_path)
+        if record_id is None:
+            json_path = Path(json_path)
+        if record is None or watermark is None:
+            loaded = self.load(json_path)
+            if loaded is None:
+                return
+            record, watermark = loaded
+        with self.conn:
+            self._write_row(json_path, record, watermark)
+            self._touch_meta()
+
+    def upsert_many(self, rows: list[tuple]) -> None:
+        """Index several (json_path, record, watermark) rows in one transaction (batch capture)."""
+        self.ensure_built()
+        with self.conn:
+            for json_path, record, watermark in rows:
+                self._write_row(json_path, record, watermark)
+            self._touch_meta()
+
+    def remove(self, json_path: Path) -> bool:
+        """Drop a record file from the index. Returns True if it was indexed."""
+        if not self.is_current():
+            return False
+        with self.conn:
+            removed = self._delete_row(str(json_path))
+            if removed:
+                self._touch_meta()
+        return removed
+
+    def sync(self) -> SyncStats:
+        """
+        Bring the index up to date with files added, edited or deleted by hand.
+        Each file is only stat()ed and compared against its stored
+        (mtime, size, inode) watermark; only changed files are read and re-indexed.
+        Segment records are compared by their version (sequence number).
+        """
+        start = time.perf_counter()
+        if not self.is_current():
+            count = self.rebuild()
+            return SyncStats(added=count, elapsed_ms=(time.perf_counter() - start) * 1000)
+
+        known = {
+            path: (mtime_ns, size, inode)
+            for path, mtime_ns, size, inode in self.conn.execute(
+                "SELECT json_path, mtime_ns, size, inode FROM records_files"
+            )
+        }
+        stats = SyncStats()
+        changed = []
+        for entry in iter_record_entries(self.records_dir):
+            watermark = _watermark(entry.stat())
+            previous = known.pop(entry.path, None)
+            if previous == watermark:
+                stats.unchanged += 1
+                continue
+            changed.append((Path(entry.path), watermark, previous is None, None))
+        store = self._segments()
+        if store is not None:
+            for ref in store.refs():
+                previous = known.pop(ref.uri, None)
+                if previous == ref.watermark:
+                    stats.unchanged += 1
+                    continue
+                changed.append((ref.uri, ref.watermark, previous is None, ref))
+
+        with self.conn:
+            for json_path, watermark, is_new, ref in changed:
+                record = _load_record(json_path) if ref is None else store.read(ref)
+                if record is None:
+                    continue
+                self._write_row(json_path, record, watermark)
+                if is_new:
+                    stats.added += 1
+                else:
+                    stats.updated += 1
+            # Whatever is left in `known` no longer exists on disk
+            for json_path in known:
+                self._delete_row(json_path)
+                stats.removed += 1
+            if stats.added or stats.updated or stats.removed:
+                self._touch_meta()
+        if store is not None:
+            store.close()
+
+        stats.elapsed_ms = (time.perf_counter() - start) * 1000
+        return stats
+
+    def _write_row(self, json_path, record: dict, watermark: tuple[int, int, int]) -> None:
+        placeholders = ", ".join("?" for _ in FTS_COLUMNS)
+        self._delete_row(str(json_path))
+        cursor = self.conn.execute(
+            f"INSERT INTO records_fts VALUES ({placeholders})",
+            _row_from_record(json_path, record),
+        )
+        self.conn.execute(
+            "INSERT INTO records_files (json_path, fts_rowid, mtime_ns, size, inode, record_type, record_ts, content_hash, notion_pending) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(json_path), cursor.lastrowid, *watermark,
+                record.get("type") or record.get("record_type") or "",
+                record_timestamp(record),
+                record_capture_hash(record),
+                is_notion_pending(record),
+            ),
+        )
+        self.conn.executemany(
+            "INSERT INTO records_tags (tag, fts_rowid) VALUES (?, ?)",
+            [(tag, cursor.lastrowid) for tag in normalize_tags(record.get("tags"))],
+        )
+        url = normalize_url(record.get("source_url"))
+        if url:
+            self.conn.execute("INSERT INTO records_urls (url, fts_rowid) VALUES (?, ?)", (url, cursor.lastrowid))
+
+    def _delete_row(self, json_path: str) -> bool:
+        row = self.conn.execute(
+            "SELECT fts_rowid FROM records_files WHERE json_path = ?", (json_path,)
+        ).fetchone()
+        if row is None:
+            return False
+        self.conn.execute("DELETE FROM records_fts WHERE rowid = ?", row)
+        self.conn.execute("DELETE FROM records_tags WHERE fts_rowid = ?", row)
+        self.conn.execute("DELETE FROM records_urls WHERE fts_rowid = ?", row)
+        self.conn.execute("DELETE FROM records_files WHERE json_path = ?", (json_path,))
+        return True
+
+    def _touch_meta(self) -> None:
+        count = self.conn.execute("SELECT COUNT(*) FROM records_files").fetchone()[0]
+        self._set_meta("recordCount", str(count))
+        self._set_meta("updatedAt", datetime.now().astimezone().isoformat())
+
+    def ensure_built(self) -> None:
+        """Build the index on first use (or after a schema change)."""
+        if not self.is_current():
+            self.rebuild(only_if_stale=True)
+
+    # ── Query ─────────────────────────────────────────────────────────────────
+
+    def search(self, query: str, limit: int = 20, record_type: Optional[str] = None) -> list[SearchHit]:
+        """
+        Ranked full-text search over title, body, source text and tags.
+        All terms must match; falls back to any-term matching if nothing does.
+        """
+        self.ensure_built()
+        for operator in ("AND", "OR"):
+            match = build_match_query(query, operator)
+            if match is None:
+                return []
+            hits = self._run_match(match, limit, record_type)
+            if hits:
+                return hits
+        return []
+
+    def _run_match(self, match: str, limit: int, record_type: Optional[str]) -> list[SearchHit]:
+        weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+        sql = (
+            f"SELECT title, record_type, created_at, date, tags, notion_url, json_path, md_path, "
+            f"bm25(records_fts, {weights}) AS rank "
+            f"FROM records_fts WHERE records_fts MATCH ?"
+        )
+        params: list = [match]
+        if record_type:
+            sql += " AND record_type = ?"
+            params.append(record_type)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        return [
+            SearchHit(
+                title=title,
+                record_type=rtype,
+                created_at=created_at,
+                date=date or None,
+                tags=[t for t in tags.split(",") if t],
+                notion_url=notion_url,
+                json_path=json_path,
+                md_path=md_path,
+                score=-rank,  # bm25() is lower-is-better
+            )
+            for title, rtype, created_at, date, tags, notion_url, json_path, md_path, rank
+            in self.conn.execute(sql, params)
+        ]
+
+    def _filter_sql(self, flt: Optional["RecordFilter"]) -> tuple[str, list]:
+        """WHERE clause over records_files (alias f) for a RecordFilter; None matches every record."""
+        clauses, params = [], []
+        if flt is None:
+            return "1", params
+        if flt.start_ts is not None:
+            clauses.append("f.record_ts >= ?")
+            params.append(flt.start_ts)
+        if flt.end_ts is not None:
+            clauses.append("f.record_ts < ?")
+            params.append(flt.end_ts)
+        if flt.record_type:
+            clauses.append("f.record_type = ?")
+            params.append(flt.record_type)
+        tags = normalize_tags(flt.tags)
+        if tags:
+            marks = ", ".join("?" for _ in tags)
+            subquery = f"SELECT fts_rowid FROM records_tags WHERE tag IN ({marks})"
+            if flt.match_all_tags and len(tags) > 1:
+                subquery += " GROUP BY fts_rowid HAVING COUNT(*) = ?"
+                params.extend([*tags, len(tags)])
+            else:
+                params.extend(tags)
+            clauses.append(f"f.fts_rowid IN ({subquery})")
+        return (" AND ".join(clauses) or "1"), params
+
+    def list_records(self, flt: "RecordFilter", limit: Optional[int] = None) -> list[SearchHit]:
+        """Records matching a filter, newest first. Answered from the index alone."""
+        self.ensure_built()
+        where, params = self._filter_sql(flt)
+        sql = (
+            "SELECT t.title, t.record_type, t.created_at, t.date, t.tags, t.notion_url, t.json_path, t.md_path, "
+            f"f.record_ts FROM records_files f JOIN records_fts t ON t.rowid = f.fts_rowid "
+            f"WHERE {where} ORDER BY f.record_ts DESC"
+        )
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [
+            SearchHit(
+                title=title,
+                record_type=rtype,
+                created_at=created_at,
+                date=date or None,
+                tags=[t for t in tags.split(",") if t],
+                notion_url=notion_url,
+                json_path=json_path,
+                md_path=md_path,
+                score=record_ts,
+            )
+            for title, rtype, created_at, date, tags, notion_url, json_path, md_path, record_ts
+            in self.conn.execute(sql, params)
+        ]
+
+    def type_counts(self, flt: Optional["RecordFilter"] = None) -> dict[str, int]:
+        """Number of matching records per type."""
+        self.ensure_built()
+        where, params = self._filter_sql(flt)
+        rows = self.conn.execute(
+            f"SELECT f.record_type, COUNT(*) FROM records_files f WHERE {where} "
+            "GROUP BY f.record_type ORDER BY COUNT(*) DESC",
+            params,
+        )
+        return {record_type or "other": count for record_type, count in rows}
+
+    def tag_facets(self, flt: Optional["RecordFilter"] = None, limit: int = 20) -> dict[str, int]:
+        """Most used tags (with counts) among the matching records."""
+        self.ensure_built()
+        if flt is None or not flt.active:
+            # Unfiltered facets are kept up to date by triggers
+            rows = self.conn.execute(
+                "SELECT tag, count FROM records_tag_counts ORDER BY count DESC, tag LIMIT ?", (limit,)
+            )
+        else:
+            where, params = self._filter_sql(flt)
+            rows = self.conn.execute(
+                f"SELECT g.tag, COUNT(*) FROM records_tags g JOIN records_files f ON f.fts_rowid = g.fts_rowid "
+                f"WHERE {where} GROUP BY g.tag ORDER BY COUNT(*) DESC, g.tag LIMIT ?",
+                [*params, limit],
+            )
+        return dict(rows)
+
+    def filter_rowids(self, flt: "RecordFilter") -> list[int]:
+        """FTS rowids of the matching records, for restricting ranked search."""
+        self.ensure_built()
+        where, params = self._filter_sql(flt)
+        return [rowid for (rowid,) in self.conn.execute(f"SELECT f.fts_rowid FROM records_files f WHERE {where}", params)]
+
+    def find_duplicate(self, content_hash: str, since_ts: float) -> Optional[tuple[str, str, dict]]:
+        """Newest record with this capture hash created at or after since_ts: (json_path, md_path, record)."""
+        self.ensure_built()
+        rows = self.conn.execute(
+            "SELECT f.json_path, t.md_path FROM records_files f JOIN records_fts t ON t.rowid = f.fts_rowid "
+            "WHERE f.content_hash = ?",
+            (content_hash,),
+        ).fetchall()
+        best = None
+        for json_path, md_path in rows:
+            loaded = self.load(json_path)
+            if loaded is None:
+                continue
+            record = loaded[0]
+            created_ts = parse_timestamp(record.get("created_at"))
+            if created_ts >= since_ts and (best is None or created_ts > best[0]):
+                best = (created_ts, json_path, md_path, record)
+        return best[1:] if best else None
+
+    def notion_pending(self) -> list[str]:
+        """json_path (or segment URI) of every record waiting for its Notion page, oldest first."""
+        self.ensure_built()
+        rows = self.conn.execute(
+            "SELECT json_path FROM records_files WHERE notion_pending = 1 ORDER BY record_ts"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self) -> int:
+        self.ensure_built()
+        return self.conn.execute("SELECT COUNT(*) FROM records_files").fetchone()[0]
+
+
+def main():
+    from config import get_config
+
+    parser = argparse.ArgumentParser(description="Manage the local search index")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index from records/")
+    parser.add_argument("--sync", action="store_true", help="Incrementally index files added/edited/deleted since the last run")
+    parser.add_argument("--query", "-q", type=str, help="Run a test query against the index")
+    parser.add_argument("--limit", type=int, default=20, help="Max results for --query/--since/--between")
+    parser.add_argument("--since", type=str, help="List records from a relative window, e.g. 7d, 2w, 12h")
+    parser.add_argument("--between", nargs=2, metavar=("START", "END"), help="List records between two YYYY-MM-DD days (inclusive)")
+    parser.add_argument("--facets", action="store_true", help="Show the most used tags with counts")
+    args = parser.parse_args()
+
+    index = LocalIndex.for_config(get_config())
+
+    if args.rebuild:
+        start = time.perf_counter()
+        count = index.rebuild()
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"✅ Indexed {count} records in {elapsed:.0f}ms → {index.db_path}")
+
+    if args.sync:
+        stats = index.sync()
+        print(
+            f"✅ Synced in {stats.elapsed_ms:.0f}ms: "
+            f"+{stats.added} added, ~{stats.updated} updated, -{stats.removed} removed, "
+            f"{stats.unchanged} unchanged"
+        )
+
+    if args.query:
+        start = time.perf_counter()
+        hits = index.search(args.query, limit=args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        for hit in hits:
+            print(f"{hit.score:7.2f}  [{hit.record_type}] {hit.title}  ({hit.json_path})")
+        print(f"\n{len(hits)} results in {elapsed:.1f}ms")
+
+    if args.since or args.between:
+        start = time.perf_counter()
+        try:
+            if args.between:
+                start_ts, end_ts = day_range(*args.between)
+            else:
+                start_ts, end_ts = parse_since(args.since), None
+        except ValueError as e:
+            parser.error(str(e))
+        flt = RecordFilter(start_ts=start_ts, end_ts=end_ts)
+        hits = index.list_records(flt, limit=args.limit)
+        counts = index.type_counts(flt)
+        elapsed = (time.perf_counter() - start) * 1000
+        for hit in hits:
+            print(f"{(hit.date or hit.created_at)[:10]}  [{hit.record_type}] {hit.title}")
+        summary = ", ".join(f"{t}: {n}" for t, n in counts.items())
+        print(f"\n{sum(counts.values())} records ({summary}) in {elapsed:.1f}ms")
+
+    if args.facets:
+        for tag, count in index.tag_facets(limit=args.limit).items():
+            print(f"{count:6d}  #{tag}")
+
+    if not (args.rebuild or args.sync or args.query or args.since or args.between or args.facets):
+        print(f"📦 {index.count()} records indexed at {index.db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Keeponfirst Local Brain - Central Log Index
+Queryable SQLite index (.agentic/log_index.sqlite in the log home) over the
+central log events, so activity questions ("how many captures failed Notion
+sync this week?") do not mean opening every log file.
+
+The index is maintained incrementally: each log file is tracked by inode
+and byte offset, so a sync only reads lines appended since the last one
+(a rotated file keeps its inode and is picked up where it was left).
+Queries sync first unless --no-sync is given.
+
+Usage:
+    python log_index.py --sync
+    python log_index.py --intent 'capture_*' --since 7d --data notion_pending=true
+    python log_index.py --status SUCCESS --group-by day --since 30d
+    python log_index.py --cwd ~/work/project --between 2026-09-01 2026-09-30 --list 20
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from local_index import parse_timestamp, parse_since, day_range
+from log_manager import LOG_DIR_NAME
+
+INDEX_FILENAME = ".agentic/log_index.sqlite"
+SCHEMA_VERSION = "1"
+
+# --group-by choices -> SQL expression over log_events
+GROUP_BY = {
+    "intent": "intent",
+    "status": "status",
+    "cwd": "cwd",
+    "day": "strftime('%Y-%m-%d', ts, 'unixepoch', 'localtime')",
+    "week": "strftime('%Y-W%W', ts, 'unixepoch', 'localtime')",
+    "month": "strftime('%Y-%m', ts, 'unixepoch', 'localtime')",
+}
+
+
+@dataclass
+class LogFilter:
+    """Which log events a query covers. Unset fields do not filter."""
+    intent: Optional[str] = None  # exact, or a glob such as capture_*
+    status: Optional[str] = None
+    start_ts: Optional[float] = None
+    end_ts: Optional[float] = None
+    cwd: Optional[str] = None  # workspace_cwd, including its subdirectories
+    data: dict = field(default_factory=dict)  # data key -> JSON value (true, 3, "x", null)
+
+
+@dataclass
+class LogSyncStats:
+    added: int = 0
+    files_read: int = 0
+    elapsed_ms: float = 0.0
+
+
+def _event_row(entry: dict) -> Optional[tuple]:
+    """(event_id, ts, intent, status, cwd, data) for a log entry, or None if it is not one."""
+    if not isinstance(entry, dict):
+        return None
+    meta = entry.get("meta") or {}
+    task = entry.get("task") or {}
+    context = entry.get("context") or {}
+    data = json.dumps(entry.get("data"), ensure_ascii=False, sort_keys=True)
+    event_id = meta.get("event_id") or f"{meta.get('timestamp')}:{task.get('intent')}:{data}"
+    return (
+        event_id,
+        parse_timestamp(meta.get("timestamp")),
+        task.get("intent"),
+        task.get("status"),
+        context.get("workspace_cwd"),
+        data,
+    )
+
+
+def _parse_lines(chunk: bytes) -> list[tuple]:
+    rows = []
+    for line in chunk.splitlines():
+        try:
+            row = _event_row(json.loads(line))
+        except ValueError:
+            continue  # torn line from a crashed writer
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+class LogIndex:
+    """SQLite index over the central log of one log home."""
+
+    def __init__(self, home: Path, db_path: Optional[Path] = None):
+        self.home = Path(home)
+        self.logs_dir = self.home / LOG_DIR_NAME
+        self.db_path = Path(db_path) if db_path else self.home / INDEX_FILENAME
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @classmethod
+    def for_config(cls, config) -> "LogIndex":
+        """Index of the log home that is also the brain root of config."""
+        return cls(config.records_dir.parent)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ── Schema ────────────────────────────────────────────────────────────────
+
+    def is_current(self) -> bool:
+        try:
+            row = self.conn.execute("SELECT value FROM log_index_meta WHERE key = 'schemaVersion'").fetchone()
+        except sqlite3.OperationalError:
+            return False
+        return row is not None and row[0] == SCHEMA_VERSION
+
+    def _create_schema(self) -> None:
+        conn = self.conn
+        for table in ("log_index_meta", "log_events", "log_sources"):
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute("CREATE TABLE log_index_meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute(
+            """CREATE TABLE log_events (
+                event_id TEXT PRIMARY KEY,
+                ts REAL NOT NULL,
+                intent TEXT,
+                status TEXT,
+                cwd TEXT,
+                data TEXT
+            )"""
+        )
+        conn.execute("CREATE INDEX log_events_ts ON log_events (ts)")
+        conn.execute("CREATE INDEX log_events_intent ON log_events (intent, ts)")
+        conn.execute("CREATE INDEX log_events_status ON log_events (status, ts)")
+        conn.execute("CREATE INDEX log_events_cwd ON log_events (cwd, ts)")
+        # One row per log file (keyed by inode, which survives rotation): how far it was read
+        conn.execute(
+            """CREATE TABLE log_sources (
+                file_id TEXT PRIMARY KEY,
+                name TEXT,
+                size INTEGER,
+                mtime_ns INTEGER,
+                offset INTEGER
+            )"""
+        )
+        conn.execute("INSERT INTO log_index_meta (key, value) VALUES ('schemaVersion', ?)", (SCHEMA_VERSION,))
+
+    def rebuild(self) -> LogSyncStats:
+        """Drop the index and read every log file again."""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._create_schema()
+        return self.sync()
+
+    # ── Sync ──────────────────────────────────────────────────────────────────
+
+    def _read_new(self, path: Path, st: os.stat_result, offset: int) -> tuple[list[tuple], int]:
+        """Events in path past `offset`, and the offset to resume from next time."""
+        if path.suffix == ".gz":
+            # Compressed when rotated (a new inode): read whole, repeats are ignored by event_id
+            with gzip.open(path, "rb") as f:
+                return _parse_lines(f.read()), st.st_size
+        if path.suffix == ".json":
+            # Legacy one-event-per-file log
+            with open(path, "rb") as f:
+                try:
+                    row = _event_row(json.load(f))
+                except ValueError:
+                    row = None
+            return ([row] if row else []), st.st_size
+        with open(path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read(st.st_size - offset)
+        # Leave a trailing partial line (an append in progress) for the next sync
+        complete = chunk.rfind(b"\n") + 1
+        return _parse_lines(chunk[:complete]), offset + complete
+
+    def sync(self) -> LogSyncStats:
+        """Index events appended to the central log since the last sync."""
+        start = time.perf_counter()
+        if not self.is_current():
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                if not self.is_current():
+                    self._create_schema()
+        stats = LogSyncStats()
+        if not self.logs_dir.is_dir():
+            return stats
+
+        known = {
+            file_id: (size, mtime_ns, offset)
+            for file_id, size, mtime_ns, offset in self.conn.execute(
+                "SELECT file_id, size, mtime_ns, offset FROM log_sources"
+            )
+        }
+        with self.conn:
+            for entry in os.scandir(self.logs_dir):
+                name = entry.name
+                if not (name.endswith(".jsonl") or name.endswith(".jsonl.gz") or name.endswith(".json")):
+                    continue
+                st = entry.stat()
+                file_id = f"{st.st_dev}:{st.st_ino}"
+                previous = known.get(file_id)
+                if previous is not None and previous[:2] == (st.st_size, st.st_mtime_ns):
+                    continue
+                # A file that shrank is not the one we read (inode reused): start over
+                offset = previous[2] if previous is not None and previous[2] <= st.st_size else 0
+                try:
+                    rows, offset = self._read_new(Path(entry.path), st, offset)
+                except OSError:
+                    continue
+                stats.files_read += 1
+                before = self.conn.total_changes
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO log_events (event_id, ts, intent, status, cwd, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                stats.added += self.conn.total_changes - before
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO log_sources (file_id, name, size, mtime_ns, offset) VALUES (?, ?, ?, ?, ?)",
+                    (file_id, name, st.st_size, st.st_mtime_ns, offset),
+                )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO log_index_meta (key, value) VALUES ('updatedAt', ?)",
+                (datetime.now().astimezone().isoformat(),),
+            )
+        stats.elapsed_ms = (time.perf_counter() - start) * 1000
+        return stats
+
+    # ── Queries ───────────────────────────────────────────────────────────────
+
+    def _where(self, flt: LogFilter) -> tuple[str, list]:
+        clauses, params = [], []
+        if flt.intent:
+            if any(c in flt.intent for c in "*?["):
+                clauses.append("intent GLOB ?")
+            else:
+                clauses.append("intent = ?")
+            params.append(flt.intent)
+        if flt.status:
+            clauses.append("status = ?")
+            params.append(flt.status)
+        if flt.start_ts is not None:
+            clauses.append("ts >= ?")
+            params.append(flt.start_ts)
+        if flt.end_ts is not None:
+            clauses.append("ts < ?")
+            params.append(flt.end_ts)
+        if flt.cwd:
+            # The directory itself or anything below it ('0' sorts right after '/')
+            root = flt.cwd.rstrip("/") or "/"
+            clauses.append("(cwd = ? OR (cwd >= ? AND cwd < ?))")
+            params.extend([root, root.rstrip("/") + "/", root.rstrip("/") + "0"])
+        for key, value in flt.data.items():
+            path = f"$.{key}"
+            if value is None:
+                clauses.append("json_extract(data, ?) IS NULL")
+                params.append(path)
+            else:
+                clauses.append("json_extract(data, ?) = ?")
+                params.extend([path, int(value) if isinstance(value, bool) else value])
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, flt: LogFilter) -> int:
+        where, params = self._where(flt)
+        return self.conn.execute(f"SELECT COUNT(*) FROM log_events{where}", params).fetchone()[0]
+
+    def group_counts(self, flt: LogFilter, group_by: str) -> list[tuple[str, int]]:
+        """(group, count) pairs; time groups in order, others most frequent first."""
+        expr = GROUP_BY[group_by]
+        where, params = self._where(flt)
+        order = "grp" if group_by in ("day", "week", "month") else "n DESC, grp"
+        rows = self.conn.execute(
+            f"SELECT {expr} AS grp, COUNT(*) AS n FROM log_events{where} GROUP BY grp ORDER BY {order}", params
+        ).fetchall()
+        return [(str(grp), n) for grp, n in rows]
+
+    def events(self, flt: LogFilter, limit: int = 20) -> list[dict]:
+        """Most recent matching events."""
+        where, params = self._where(flt)
+        rows = self.conn.execute(
+            f"SELECT ts, intent, status, cwd, data FROM log_events{where} ORDER BY ts DESC LIMIT ?",
+            [*params, limit],
+        ).fetchall()
+        return [
+            {"ts": ts, "intent": intent, "status": status, "cwd": cwd, "data": json.loads(data) if data else None}
+            for ts, intent, status, cwd, data in rows
+        ]
+
+
+def parse_data_filters(values: list[str]) -> dict:
+    """KEY=VALUE pairs; VALUE is read as JSON when it parses (true, 3, null), else as a string."""
+    filters = {}
+    for item in values:
+        key, sep, raw = item.partition("=")
+        if not sep or not key:
+            raise ValueError(f"Invalid --data value: {item!r} (expected KEY=VALUE)")
+        try:
+            filters[key] = json.loads(raw)
+        except ValueError:
+            filters[key] = raw
+    return filters
+
+
+def main():
+    from config import get_config
+
+    parser = argparse.ArgumentParser(description="Query the central log (activity analytics)")
+    parser.add_argument("--sync", action="store_true", help="Index events appended since the last sync")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index from every log file")
+    parser.add_argument("--no-sync", action="store_true", help="Query without syncing first")
+    parser.add_argument("--intent", type=str, help="Task intent, exact or glob (e.g. 'capture_*')")
+    parser.add_argument("--status", type=str, help="Task status, e.g. SUCCESS")
+    parser.add_argument("--since", type=str, help="Relative window, e.g. 7d, 2w, 12h")
+    parser.add_argument("--between", nargs=2, metavar=("START", "END"), help="Two YYYY-MM-DD days (inclusive)")
+    parser.add_argument("--cwd", type=str, help="Workspace directory (includes its subdirectories)")
+    parser.add_argument("--data", action="append", default=[], metavar="KEY=VALUE", help="Match a data field (repeatable)")
+    parser.add_argument("--group-by", choices=sorted(GROUP_BY), help="Count events per group")
+    parser.add_argument("--list", type=int, metavar="N", help="Show the N most recent matching events")
+    parser.add_argument("--json", action="store_true", help="Print JSON")
+    args = parser.parse_args()
+
+    try:
+        flt = LogFilter(
+            intent=args.intent,
+            status=args.status,
+            cwd=str(Path(args.cwd).expanduser().resolve()) if args.cwd else None,
+            data=parse_data_filters(args.data),
+        )
+        if args.between:
+            flt.start_ts, flt.end_ts = day_range(*args.between)
+        elif args.since:
+            flt.start_ts = parse_since(args.since)
+    except ValueError as e:
+        parser.error(str(e))
+
+    index = LogIndex.for_config(get_config())
+    try:
+        if args.rebuild:
+            stats = index.rebuild()
+            print(f"✅ Indexed {stats.added} events from {stats.files_read} files in {stats.elapsed_ms:.0f}ms → {index.db_path}")
+        elif args.sync or not args.no_sync:
+            stats = index.sync()
+            if args.sync:
+                print(f"✅ Synced in {stats.elapsed_ms:.0f}ms: +{stats.added} events from {stats.files_read} files")
+        if (args.sync or args.rebuild) and not (args.intent or args.status or args.since or args.between
+                                                or args.cwd or args.data or args.group_by or args.list):
+            return
+
+        start = time.perf_counter()
+        groups = index.group_counts(flt, args.group_by) if args.group_by else []
+        # Every event falls in exactly one group, so skip the second scan
+        total = sum(n for _, n in groups) if args.group_by else index.count(flt)
+        events = index.events(flt, args.list) if args.list else []
+        elapsed = (time.perf_counter() - start) * 1000
+    finally:
+        index.close()
+
+    if args.json:
+        print(json.dumps({"count": total, "groups": dict(groups), "events": events}, ensure_ascii=False, indent=2))
+        return
+    for event in events:
+        when = datetime.fromtimestamp(event["ts"]).strftime("%Y-%m-%d %H:%M")
+        title = (event["data"] or {}).get("title", "") if isinstance(event["data"], dict) else ""
+        print(f"{when}  {event['intent']:<20} {event['status'] or '':<10} {title}")
+    if events and groups:
+        print()
+    for grp, n in groups:
+        print(f"{n:8d}  {grp}")
+    print(f"\n📊 {total} events in {elapsed:.1f}ms", file=sys.stderr if args.list or groups else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
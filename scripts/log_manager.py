@@ -1,21 +1,63 @@
+import atexit
 import os
 import json
 import sys
+import threading
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Iterator, Optional, Dict, Any
+
+# fcntl is POSIX-only; without it appends are not locked against rotation
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 # Resolution Constraints
 ENV_VAR_NAME = "ANTIGRAVITY_LOG_HOME"
 MARKER_FILENAME = ".agentic/CENTRAL_LOG_MARKER"
 LOG_DIR_NAME = ".agentic/logs"
+# Append-only JSONL log inside LOG_DIR_NAME; rotated to events-<timestamp>.jsonl[.gz]
+ACTIVE_LOG_FILENAME = "events.jsonl"
+LOG_LOCK_FILENAME = ".lock"
+DEFAULT_LOG_MAX_MB = 16
+DEFAULT_LOG_ROTATE_HOURS = 24
 
 # Determine path to config.json (sibling to scripts/ parent)
 # Structure: skill_root/scripts/log_manager.py -> skill_root/config.json
 SCRIPT_DIR = Path(__file__).parent.absolute()
 SKILL_ROOT = SCRIPT_DIR.parent
 CONFIG_FILE = SKILL_ROOT / "config.json"
+# Resolved log homes per CWD, with the file stamps they depend on
+RESOLUTION_CACHE_FILE = SKILL_ROOT / ".log_home_cache.json"
+
+# In-process copy of the resolution cache: cwd -> {"home": str, "stamps": {path: stamp}}
+_resolution_cache: Optional[Dict[str, Any]] = None
+
+# Per-thread (cwd, ANTIGRAVITY_LOG_HOME) of the process a capture came from (capture daemon)
+_caller = threading.local()
+
+
+@contextmanager
+def caller_context(cwd: Optional[str], log_home: Optional[str]):
+    """
+    On this thread, resolve the log home and log workspace_cwd as if running
+    in `cwd` with ANTIGRAVITY_LOG_HOME=`log_home`. With log_home None only a
+    value from .env applies, as for a fresh process without the variable.
+    """
+    previous = getattr(_caller, "value", None)
+    _caller.value = (cwd, log_home)
+    try:
+        yield
+    finally:
+        _caller.value = previous
+
+
+def _current_cwd() -> str:
+    caller = getattr(_caller, "value", None)
+    return caller[0] if caller is not None and caller[0] else os.getcwd()
 
 
 def load_config() -> Dict[str, Any]:
@@ -34,6 +76,60 @@ def save_config(config: Dict[str, Any]):
             json.dump(config, f, indent=2, ensure_ascii=False)
     except Exception as e:
         print(f"Warning: Failed to save config to {CONFIG_FILE}: {e}", file=sys.stderr)
+    invalidate_log_home_cache()
+
+
+def _stamp(path) -> Optional[list]:
+    """(mtime_ns, size) of a path, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _load_resolution_cache() -> Dict[str, Any]:
+    global _resolution_cache
+    if _resolution_cache is None:
+        try:
+            with open(RESOLUTION_CACHE_FILE, "r", encoding="utf-8") as f:
+                _resolution_cache = json.load(f)
+        except (OSError, ValueError):
+            _resolution_cache = {}
+    return _resolution_cache
+
+
+def _cached_log_home(cwd: str) -> Optional[Path]:
+    """Cached home for cwd, if every file it was resolved from is unchanged."""
+    entry = _load_resolution_cache().get(cwd)
+    if not entry:
+        return None
+    for path, stamp in entry["stamps"].items():
+        if _stamp(path) != stamp:
+            return None
+    return Path(entry["home"])
+
+
+def _remember_log_home(cwd: str, home: Path, depends_on: list) -> None:
+    cache = _load_resolution_cache()
+    cache[cwd] = {"home": str(home), "stamps": {str(p): _stamp(p) for p in depends_on}}
+    try:
+        tmp = RESOLUTION_CACHE_FILE.with_name(f"{RESOLUTION_CACHE_FILE.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp, RESOLUTION_CACHE_FILE)
+    except OSError:
+        pass  # The in-process cache still works
+
+
+def invalidate_log_home_cache() -> None:
+    """Forget every cached resolution (in this process and on disk)."""
+    global _resolution_cache
+    _resolution_cache = {}
+    try:
+        RESOLUTION_CACHE_FILE.unlink()
+    except OSError:
+        pass
 
 
 def is_valid_log_home(path: Path) -> bool:
@@ -63,31 +159,55 @@ def resolve_log_home() -> Path:
     3. auto-detect marker (upwards from CWD)
     4. (TTY) ask once & persist
     5. Fail
+
+    Results of steps 2-3 are cached per CWD (in-process and in
+    .log_home_cache.json) together with the (mtime, size) of every file they
+    depend on: config.json, the resolved home or marker, and the .agentic
+    directories between CWD and the marker. Any change to those re-resolves.
+    Inside caller_context() the caller's CWD and variable are used instead.
     """
     
-    # 1. Environment Variable
-    env_path = os.getenv(ENV_VAR_NAME)
+    # 1. Environment Variable (which may come from .env)
+    import config as config_module
+    config_module.load_env()
+    caller = getattr(_caller, "value", None)
+    if caller is None:
+        env_path = os.getenv(ENV_VAR_NAME)
+    else:
+        # A caller's own variable, else only one loaded from .env (not the daemon's)
+        from_env_file = ENV_VAR_NAME in config_module._env_keys
+        env_path = caller[1] or (os.getenv(ENV_VAR_NAME) if from_env_file else None)
     if env_path:
         path = Path(env_path).resolve()
         # We assume ENV is authoritative; try to ensure dir exists
         return path
 
+    cwd = _current_cwd()
+    cached = _cached_log_home(cwd)
+    if cached is not None:
+        return cached
+
     # 2. Persisted Config
     config = load_config()
     resolved_home = config.get("resolved", {}).get("central_log_home")
     if resolved_home:
         path = Path(resolved_home).resolve()
         if path.exists():
+            _remember_log_home(cwd, path, [CONFIG_FILE, path])
             return path
         # If configured path is missing, fall through to re-detect/ask
 
     # 3. Auto-detect (Marker)
-    # Start from CWD and look up
-    cwd = Path.cwd()
-    search_path = cwd
+    # Start from CWD and look up. A marker created in a directory passed on
+    # the way changes the stamp of its .agentic (the home's own .agentic is
+    # busy with index files, so the marker itself is stamped there)
+    search_path = Path(cwd)
+    visited = [CONFIG_FILE]
     while True:
         if (search_path / MARKER_FILENAME).exists():
+            _remember_log_home(cwd, search_path, visited + [search_path / MARKER_FILENAME])
             return search_path
+        visited.append(search_path / ".agentic")
         if search_path.parent == search_path:  # Root
             break
         search_path = search_path.parent
@@ -151,42 +271,236 @@ def ensure_log_home_exists(home: Path) -> Path:
     return logs_dir
 
 
+def _log_settings() -> tuple[int, float, bool]:
+    """(max bytes, max hours, gzip) for rotating the central log, from the environment."""
+    try:
+        max_mb = float(os.getenv("CENTRAL_LOG_MAX_MB", "") or DEFAULT_LOG_MAX_MB)
+        max_hours = float(os.getenv("CENTRAL_LOG_ROTATE_HOURS", "") or DEFAULT_LOG_ROTATE_HOURS)
+    except ValueError:
+        max_mb, max_hours = DEFAULT_LOG_MAX_MB, DEFAULT_LOG_ROTATE_HOURS
+    gzip_rotated = os.getenv("CENTRAL_LOG_GZIP", "false").strip().lower() in ("1", "true", "yes")
+    return int(max_mb * 1024 * 1024), max_hours, gzip_rotated
+
+
+def _make_entry(task_intent: str, event_data: Dict[str, Any], status: str, home: Path) -> Dict[str, Any]:
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "log_version": "1.0",
+            "event_id": str(uuid.uuid4())
+        },
+        "context": {
+            "workspace_cwd": _current_cwd(),
+            "repo_root": str(home), # In this context, log home is often the repo root
+            "tool": "keeponfirst-local-brain-skill"
+        },
+        "task": {
+            "intent": task_intent,
+            "status": status
+        },
+        "data": event_data
+    }
+
+
+@contextmanager
+def _logs_lock(logs_dir: Path, exclusive: bool):
+    """Appends share the lock; rotation takes it exclusively, so no append lands in a rotated file."""
+    with open(logs_dir / LOG_LOCK_FILENAME, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _first_timestamp(path: Path) -> Optional[datetime]:
+    try:
+        with open(path, "rb") as f:
+            return datetime.fromisoformat(json.loads(f.readline())["meta"]["timestamp"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+# (st_dev, st_ino) of an active log -> timestamp of its first event
+_log_started: Dict[tuple, Optional[datetime]] = {}
+
+
+def _needs_rotation(active: Path, incoming: int) -> bool:
+    max_bytes, max_hours, _ = _log_settings()
+    try:
+        st = active.stat()
+    except FileNotFoundError:
+        return False
+    if not st.st_size:
+        return False
+    if st.st_size + incoming > max_bytes:
+        return True
+    key = (st.st_dev, st.st_ino)
+    if key not in _log_started:
+        _log_started[key] = _first_timestamp(active)
+    started = _log_started[key]
+    return started is not None and (datetime.now() - started).total_seconds() > max_hours * 3600
+
+
+def _rotate(logs_dir: Path) -> Optional[Path]:
+    """Move the active log aside as events-<timestamp>.jsonl[.gz] (caller holds the exclusive lock)."""
+    active = logs_dir / ACTIVE_LOG_FILENAME
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+    target = logs_dir / f"events-{stamp}.jsonl"
+    n = 1
+    while target.exists() or target.with_suffix(".jsonl.gz").exists():
+        n += 1
+        target = logs_dir / f"events-{stamp}-{n}.jsonl"
+    os.replace(active, target)
+    if _log_settings()[2]:
+        import gzip
+        import shutil
+
+        gz_path = target.with_suffix(".jsonl.gz")
+        with open(target, "rb") as src, gzip.open(gz_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        target.unlink()
+        target = gz_path
+    return target
+
+
+def append_central_log(entries: list, home: Optional[Path] = None) -> Path:
+    """Append entries to the active JSONL log in one write, rotating it first if due."""
+    home = home or resolve_log_home()
+    logs_dir = ensure_log_home_exists(home)
+    active = logs_dir / ACTIVE_LOG_FILENAME
+    payload = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries).encode("utf-8")
+    if _needs_rotation(active, len(payload)):
+        with _logs_lock(logs_dir, exclusive=True):
+            # Another process may have rotated while we waited for the lock
+            if _needs_rotation(active, len(payload)):
+                _rotate(logs_dir)
+    with _logs_lock(logs_dir, exclusive=False):
+        fd = os.open(active, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, payload)
+        finally:
+            os.close(fd)
+    return active
+
+
+class CentralLogWriter:
+    """
+    Buffered central log for long-running paths (capture daemon, batch capture).
+    Events are appended in one write once `max_events` are queued or the oldest
+    is `max_delay_s` old, and on flush()/close()/interpreter exit.
+    """
+
+    def __init__(self, max_events: int = 64, max_delay_s: float = 2.0):
+        self.max_events = max_events
+        self.max_delay_s = max_delay_s
+        self._pending: list = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        atexit.register(self.flush)
+
+    def write(self, task_intent: str, event_data: Dict[str, Any], status: str = "COMPLETED") -> None:
+        entry = _make_entry(task_intent, event_data, status, resolve_log_home())
+        with self._lock:
+            self._pending.append(entry)
+            full = len(self._pending) >= self.max_events
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.max_delay_s, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+        # Events are grouped by home in case it changed while they were queued
+        by_home: Dict[str, list] = {}
+        for entry in pending:
+            by_home.setdefault(entry["context"]["repo_root"], []).append(entry)
+        for home, entries in by_home.items():
+            try:
+                append_central_log(entries, Path(home))
+            except Exception as e:
+                print(f"Warning: Failed to write central log: {e}", file=sys.stderr)
+
+    def close(self) -> None:
+        self.flush()
+        atexit.unregister(self.flush)
+
+
+_buffered_writer: Optional[CentralLogWriter] = None
+
+
+def enable_buffering(max_events: int = 64, max_delay_s: float = 2.0) -> CentralLogWriter:
+    """Route write_central_log through a CentralLogWriter for the rest of this process."""
+    global _buffered_writer
+    if _buffered_writer is None:
+        _buffered_writer = CentralLogWriter(max_events, max_delay_s)
+    return _buffered_writer
+
+
+def _rotated_order(path: Path) -> tuple[str, int]:
+    """events-<stamp>[-<n>].jsonl[.gz] -> (stamp, n), so -10 sorts after -9."""
+    stamp, _, n = path.name.split(".")[0][len("events-"):].partition("-")
+    return stamp, int(n) if n.isdigit() else 1
+
+
+def iter_central_log(home: Optional[Path] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Every central log entry in the order it was written: legacy
+    one-file-per-event JSON, rotated events-*.jsonl(.gz) segments, then the
+    active events.jsonl. (Buffered writers append their events late, so
+    timestamps are only roughly ordered.)
+    """
+    import gzip
+
+    logs_dir = (home or resolve_log_home()) / LOG_DIR_NAME
+    if not logs_dir.is_dir():
+        return
+    legacy = sorted(logs_dir.glob("*.json"))
+    for path in legacy:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                yield json.load(f)
+        except (OSError, ValueError):
+            continue
+    rotated = sorted(logs_dir.glob("events-*.jsonl*"), key=_rotated_order)
+    for path in [*rotated, logs_dir / ACTIVE_LOG_FILENAME]:
+        try:
+            opener = gzip.open if path.suffix == ".gz" else open
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # torn line from a crashed writer
+        except OSError:
+            continue
+
+
 def write_central_log(
     task_intent: str,
     event_data: Dict[str, Any],
     status: str = "COMPLETED"
 ) -> Optional[Path]:
+    """
+    Append one event to the central JSONL log (.agentic/logs/events.jsonl).
+    Buffered when enable_buffering() was called. Returns the log file path.
+    """
     try:
+        if _buffered_writer is not None:
+            _buffered_writer.write(task_intent, event_data, status)
+            return resolve_log_home() / LOG_DIR_NAME / ACTIVE_LOG_FILENAME
         home = resolve_log_home()
-        logs_dir = ensure_log_home_exists(home)
-        
-        timestamp = datetime.now().isoformat()
-        safe_slug = "".join(c if c.isalnum() or c in "-_" else "-" for c in task_intent.lower())[:50]
-        filename = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{safe_slug}.json"
-        log_file = logs_dir / filename
-        
-        log_entry = {
-            "meta": {
-                "timestamp": timestamp,
-                "log_version": "1.0",
-                "event_id": str(uuid.uuid4())
-            },
-            "context": {
-                "workspace_cwd": str(Path.cwd()),
-                "repo_root": str(home), # In this context, log home is often the repo root
-                "tool": "keeponfirst-local-brain-skill"
-            },
-            "task": {
-                "intent": task_intent,
-                "status": status
-            },
-            "data": event_data
-        }
-        
-        with open(log_file, "w", encoding="utf-8") as f:
-            json.dump(log_entry, f, indent=2, ensure_ascii=False)
-            
-        return log_file
+        return append_central_log([_make_entry(task_intent, event_data, status, home)], home)
     except Exception as e:
         # Fail gracefully - logging should not break the main flow
         print(f"Warning: Failed to write central log: {e}", file=sys.stderr)
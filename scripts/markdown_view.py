@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Keeponfirst Local Brain - Markdown View
+Renders the human-readable Markdown of a record on demand instead of on
+every capture (MARKDOWN_MODE=lazy, and always for the segment store).
+
+Rendered Markdown is cached under .agentic/markdown/ in the brain root,
+keyed by a hash of the record content, so a record is rendered once per
+version and unchanged records are never rendered again.
+
+Usage:
+    python markdown_view.py --show records/ideas/20260101_120000_idea_x.json
+    python markdown_view.py --show segment:<record_id>
+    python markdown_view.py --render        # write missing/stale .md next to JSON records
+    python markdown_view.py --export ./brain_markdown
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from dataclasses import fields
+from pathlib import Path
+from typing import Optional
+
+from config import RECORD_TYPE_DIRS, DEFAULT_RECORD_DIR
+from local_index import iter_record_entries, _load_record
+from segment_store import SegmentStore, parse_uri
+
+CACHE_DIRNAME = ".agentic/markdown"
+# Bump when generate_markdown's layout changes to invalidate the cache
+RENDER_VERSION = "1"
+
+
+def _as_local_record(record: dict):
+    """LocalRecord from a stored dict, tolerating missing or extra keys."""
+    from write_record import LocalRecord
+
+    known = {f.name for f in fields(LocalRecord)}
+    data = {k: v for k, v in record.items() if k in known}
+    data.setdefault("type", record.get("record_type") or "idea")
+    for name in ("title", "created_at", "source_text", "final_body"):
+        data.setdefault(name, "")
+    data.setdefault("notion_page_id", None)
+    data.setdefault("notion_url", None)
+    return LocalRecord(**data)
+
+
+def render_markdown(record: dict) -> str:
+    """Markdown view of a stored record (same layout as eager capture)."""
+    from write_record import generate_markdown
+
+    return generate_markdown(_as_local_record(record))
+
+
+def content_hash(record: dict) -> str:
+    """Stable hash of a record's content (key order does not matter)."""
+    canonical = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{RENDER_VERSION}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class MarkdownCache:
+    """Content-addressed cache of rendered Markdown."""
+
+    def __init__(self, records_dir: Path):
+        self.records_dir = Path(records_dir)
+        self.dir = self.records_dir.parent / CACHE_DIRNAME
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_config(cls, config) -> "MarkdownCache":
+        return cls(config.records_dir)
+
+    def path_for(self, record: dict) -> Path:
+        digest = content_hash(record)
+        return self.dir / digest[:2] / f"{digest}.md"
+
+    def get(self, record: dict) -> str:
+        """Markdown of a record, rendered at most once per content version."""
+        path = self.path_for(record)
+        try:
+            text = path.read_text(encoding="utf-8")
+            self.hits += 1
+            return text
+        except FileNotFoundError:
+            pass
+        self.misses += 1
+        text = render_markdown(record)
+        _write_atomic(path, text)
+        return text
+
+    def load(self, locator: str) -> Optional[dict]:
+        """Record behind a segment URI, a record .json path, or its sibling .md path."""
+        record_id = parse_uri(locator)
+        if record_id is not None:
+            store = SegmentStore(self.records_dir)
+            try:
+                return store.get(record_id) if store.exists() else None
+            finally:
+                store.close()
+        path = Path(locator)
+        if path.suffix == ".md":
+            path = path.with_suffix(".json")
+        return _load_record(path) if path.exists() else None
+
+    def render_siblings(self) -> tuple[int, int]:
+        """
+        Batch renderer: write the .md next to every JSON record whose .md is
+        missing or older than the JSON. Returns (written, up_to_date).
+        The sibling file is its own cache, so these bypass the hash cache.
+        """
+        written = up_to_date = 0
+        for entry in iter_record_entries(self.records_dir):
+            md_path = Path(entry.path).with_suffix(".md")
+            try:
+                if md_path.stat().st_mtime_ns >= entry.stat().st_mtime_ns:
+                    up_to_date += 1
+                    continue
+            except FileNotFoundError:
+                pass
+            record = _load_record(Path(entry.path))
+            if record is None:
+                continue
+            _write_atomic(md_path, render_markdown(record))
+            written += 1
+        return written, up_to_date
+
+    def export(self, out_dir: Path) -> int:
+        """Write every record (files and segments) as Markdown under out_dir, mirroring records/."""
+        out_dir = Path(out_dir)
+        count = 0
+        for entry in iter_record_entries(self.records_dir):
+            record = _load_record(Path(entry.path))
+            if record is not None:
+                relative = Path(entry.path).relative_to(self.records_dir)
+                _write_atomic(out_dir / relative.with_suffix(".md"), self.get(record))
+                count += 1
+        store = SegmentStore(self.records_dir)
+        if store.exists():
+            try:
+                for ref, record in store.iter_records():
+                    subdir = RECORD_TYPE_DIRS.get(record.get("type"), DEFAULT_RECORD_DIR)
+                    _write_atomic(out_dir / subdir / f"{ref.record_id}.md", self.get(record))
+                    count += 1
+            finally:
+                store.close()
+        return count
+
+
+def main():
+    from config import get_config
+
+    parser = argparse.ArgumentParser(description="Render record Markdown on demand")
+    parser.add_argument("--show", metavar="LOCATOR", help="Print a record as Markdown (JSON/MD path or segment:<id>)")
+    parser.add_argument("--render", action="store_true", help="Write missing or stale .md files next to JSON records")
+    parser.add_argument("--export", metavar="DIR", help="Write every record as Markdown under DIR")
+    args = parser.parse_args()
+
+    if not (args.show or args.render or args.export):
+        parser.error("One of --show, --render or --export is required")
+
+    cache = MarkdownCache.for_config(get_config())
+    if args.show:
+        record = cache.load(args.show)
+        if record is None:
+            print(f"❌ No record {args.show}", file=sys.stderr)
+            sys.exit(1)
+        print(cache.get(record))
+    if args.render:
+        written, up_to_date = cache.render_siblings()
+        print(f"✅ Rendered {written} Markdown files ({up_to_date} up to date)")
+    if args.export:
+        count = cache.export(Path(args.export))
+        print(f"✅ Exported {count} records to {args.export} ({cache.hits} from cache, {cache.misses} rendered)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Keeponfirst Local Brain - Record Layout Migration
+Moves existing record files between the flat layout (records/<type>/)
+and the sharded layout (records/<type>/YYYY/MM/), then syncs the local
+index. The shard of a record is the month of its created_at.
+
+Set RECORD_LAYOUT in .env to the same layout afterwards so new captures
+land in the right place. Readers understand both layouts, so a tree that
+is half-migrated (or was interrupted) keeps working; re-run to finish.
+
+Usage:
+    python migrate_layout.py --to sharded --dry-run
+    python migrate_layout.py --to sharded
+    python migrate_layout.py --to flat
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from config import RECORD_TYPE_DIRS, DEFAULT_RECORD_DIR, shard_subpath
+from local_index import LocalIndex, iter_record_entries, _load_record
+from notion_outbox import NotionOutbox
+
+
+def _capture_time(json_path: Path) -> datetime:
+    """When a record was captured: created_at, else the filename timestamp, else mtime."""
+    record = _load_record(json_path) or {}
+    try:
+        return datetime.fromisoformat(record.get("created_at", "").replace("Z", "+00:00"))
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(json_path.name[:15], "%Y%m%d_%H%M%S")
+    except ValueError:
+        return datetime.fromtimestamp(json_path.stat().st_mtime)
+
+
+def plan_moves(records_dir: Path, layout: str) -> list[tuple[Path, Path]]:
+    """(current, target) JSON paths of every record not yet in `layout`."""
+    moves = []
+    for entry in iter_record_entries(records_dir):
+        json_path = Path(entry.path)
+        type_dir = records_dir / json_path.relative_to(records_dir).parts[0]
+        if layout == "sharded":
+            target_dir = type_dir / shard_subpath(_capture_time(json_path))
+        else:
+            target_dir = type_dir
+        if json_path.parent != target_dir:
+            moves.append((json_path, target_dir / json_path.name))
+    return moves
+
+
+def apply_moves(moves: list[tuple[Path, Path]]) -> tuple[int, int]:
+    """Move each JSON (and its .md, if any). Returns (moved, skipped)."""
+    moved = skipped = 0
+    for source, target in moves:
+        if target.exists():
+            print(f"⚠️  Skipping {source.name}: {target} already exists", file=sys.stderr)
+            skipped += 1
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        md_source = source.with_suffix(".md")
+        if md_source.exists():
+            os.replace(md_source, target.with_suffix(".md"))
+        # JSON last: a record is only "moved" once its JSON is in place
+        os.replace(source, target)
+        moved += 1
+    return moved, skipped
+
+
+def remove_empty_shards(records_dir: Path) -> None:
+    """Drop YYYY/MM directories left empty by a migration to flat."""
+    for subdir in (*RECORD_TYPE_DIRS.values(), DEFAULT_RECORD_DIR):
+        for month_dir in sorted((records_dir / subdir).glob("[0-9][0-9][0-9][0-9]/[0-9][0-9]"), reverse=True):
+            for path in (month_dir, month_dir.parent):
+                try:
+                    path.rmdir()
+                except OSError:
+                    pass
+
+
+def main():
+    from config import get_config
+
+    parser = argparse.ArgumentParser(description="Move record files between flat and YYYY/MM sharded layouts")
+    parser.add_argument("--to", choices=["flat", "sharded"], required=True, help="Target layout")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would move")
+    args = parser.parse_args()
+
+    config = get_config()
+    start = time.perf_counter()
+    moves = plan_moves(config.records_dir, args.to)
+    if args.dry_run:
+        for source, target in moves[:20]:
+            print(f"  {source.relative_to(config.records_dir)} → {target.relative_to(config.records_dir)}")
+        print(f"🔵 DRY RUN — {len(moves)} records would move to the {args.to} layout")
+        return
+
+    moved, skipped = apply_moves(moves)
+    if args.to == "flat":
+        remove_empty_shards(config.records_dir)
+    # Captures still waiting for their Notion page follow their files
+    outbox = NotionOutbox.for_config(config)
+    if outbox.exists():
+        try:
+            outbox.relocate([(source, target) for source, target in moves if not source.exists()])
+        finally:
+            outbox.close()
+
+    index = LocalIndex.for_config(config)
+    try:
+        stats = index.sync()
+    finally:
+        index.close()
+    elapsed = time.perf_counter() - start
+    print(f"✅ Moved {moved} records to the {args.to} layout ({skipped} skipped) in {elapsed:.1f}s")
+    print(f"   Index: +{stats.added} added, -{stats.removed} removed")
+    if config.record_layout != args.to:
+        print(f"   Set RECORD_LAYOUT={args.to} in .env so new captures use it")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ Reads all JSON records from the local brain directory and upserts them
 to Supabase. Safe to run multiple times (idempotent via upsert_record RPC).
 
 Usage:
-    python scripts/migrate_to_supabase.py [--dry-run] [--limit N]
+    python scripts/migrate_to_supabase.py [--dry-run] [--limit N] [--since YYYY-MM-DD]
 
 Required env vars (or .env file):
     SUPABASE_URL
@@ -20,10 +20,12 @@ import os
 import sys
 from pathlib import Path
 from datetime import datetime
+from typing import Optional
 
-import requests
 from dotenv import load_dotenv
 
+import http_transport
+
 # ── Config ────────────────────────────────────────────────────────────────────
 
 SCRIPT_DIR = Path(__file__).parent
@@ -46,6 +48,7 @@ def main():
     parser = argparse.ArgumentParser(description="Migrate local records to Supabase")
     parser.add_argument("--dry-run", action="store_true", help="Print records without uploading")
     parser.add_argument("--limit", type=int, default=0, help="Limit number of records (0 = all)")
+    parser.add_argument("--since", type=str, help="Only records created on or after YYYY-MM-DD")
     args = parser.parse_args()
 
     url = os.environ.get("SUPABASE_URL", "").strip()
@@ -57,7 +60,8 @@ def main():
         print("   請複製 .env.example 為 .env 並填入實際值")
         sys.exit(1)
 
-    records = load_all_records()
+    since = datetime.strptime(args.since, "%Y-%m-%d") if args.since else None
+    records = load_all_records(since)
     total = len(records)
 
     if args.limit > 0:
@@ -92,29 +96,49 @@ def main():
     print(f"Migration 完成！")
 
 
-def load_all_records() -> list[dict]:
-    """Load all JSON records from the local brain directory."""
+def load_all_records(since: Optional[datetime] = None) -> list[dict]:
+    """
+    Load all JSON records from the local brain directory (flat or YYYY/MM
+    sharded layout). With since, shards from earlier months are not read.
+    """
+    from local_index import iter_record_entries
+
     records = []
+    folder_types = {folder: record_type for record_type, folder in RECORD_TYPE_DIRS.items()}
+    since_ts = since.timestamp() if since else None
+    since_iso = since.isoformat() if since else ""
 
-    for record_type, folder in RECORD_TYPE_DIRS.items():
-        dir_path = RECORDS_ROOT / folder
-        if not dir_path.exists():
-            continue
+    for entry in iter_record_entries(RECORDS_ROOT, start_ts=since_ts):
+        json_file = Path(entry.path)
+        try:
+            with open(json_file, encoding="utf-8") as f:
+                data = json.load(f)
 
-        for json_file in sorted(dir_path.glob("*.json")):
-            try:
-                with open(json_file, encoding="utf-8") as f:
-                    data = json.load(f)
+            # Normalize record type (from the type folder the file lives under)
+            if "record_type" not in data:
+                data["record_type"] = folder_types.get(json_file.relative_to(RECORDS_ROOT).parts[0], "note")
+            if "id" not in data:
+                data["id"] = json_file.stem
 
-                # Normalize record type
-                if "record_type" not in data:
-                    data["record_type"] = record_type
-                if "id" not in data:
-                    data["id"] = json_file.stem
+            records.append(data)
+        except Exception as e:
+            print(f"  ⚠️  跳過 {json_file.name}: {e}")
 
+    # Records kept in the segment store (RECORD_STORAGE=segments)
+    from segment_store import SegmentStore
+
+    store = SegmentStore(RECORDS_ROOT)
+    if store.exists():
+        try:
+            for ref, data in store.iter_records():
+                data.setdefault("record_type", data.get("type", "note"))
+                data.setdefault("id", ref.record_id)
                 records.append(data)
-            except Exception as e:
-                print(f"  ⚠️  跳過 {json_file.name}: {e}")
+        finally:
+            store.close()
+
+    if since_iso:
+        records = [r for r in records if r.get("created_at", "") >= since_iso]
 
     # Sort by created_at ascending (oldest first)
     records.sort(key=lambda r: r.get("created_at", ""))
@@ -152,15 +176,11 @@ def upsert_record(url: str, key: str, user_id: str, record: dict) -> bool:
         "p_updated_at": created_at,
     }
 
-    resp = requests.post(
+    resp = http_transport.post_json(
         f"{url}/rest/v1/rpc/upsert_record",
-        headers={
-            "apikey": key,
-            "Authorization": f"Bearer {key}",
-            "Content-Type": "application/json",
-        },
-        json=payload,
-        timeout=15,
+        payload,
+        headers={"apikey": key, "Authorization": f"Bearer {key}"},
+        default_timeout=15,
     )
 
     if resp.status_code in (200, 201, 204):
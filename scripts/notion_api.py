@@ -5,10 +5,34 @@ Supports auto-creation of Root Page for first-time setup.
 """
 
 import json
+import random
+import time
 from typing import Optional
 from dataclasses import dataclass
-from notion_client import Client
+from notion_client.errors import HTTPResponseError
 from config import get_config, Config
+from rate_limit import TokenBucket
+from notion_blocks import BlockCache, block_key, compile_markdown
+import http_transport
+
+# Attempts per API request. Only answers that ask for a retry (429, 5xx, 409) are
+# retried here; unreachable or timed-out requests fail fast and are left to the outbox
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_S = 1.0
+BACKOFF_MAX_S = 30.0
+RETRYABLE_STATUS = (409, 429, 500, 502, 503, 504)
+# Requests that create content (pages.create, blocks.children.append) may have
+# been applied despite a 409 or 5xx answer; only a 429 is sure to have been rejected
+NON_IDEMPOTENT_RETRYABLE_STATUS = (429,)
+
+# Notion request limits: children per request, characters per rich_text item,
+# rich_text items per block. Request bodies are also kept under MAX_REQUEST_BYTES
+# and MAX_NESTED_BLOCKS blocks, nested list items included.
+MAX_BLOCKS_PER_REQUEST = 100
+MAX_NESTED_BLOCKS = 1000
+MAX_RICH_TEXT_CHARS = 2000
+MAX_RICH_TEXT_ITEMS = 100
+MAX_REQUEST_BYTES = 450_000
 
 
 @dataclass
@@ -28,12 +52,169 @@ class RecordData:
     tags: Optional[list[str]] = None
 
 
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds form), if any."""
+    headers = getattr(error, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+def retry_delay(error: Exception, attempt: int, idempotent: bool = True) -> Optional[float]:
+    """Seconds to wait before retrying a failed request, or None if it should not be retried now."""
+    retryable = RETRYABLE_STATUS if idempotent else NON_IDEMPOTENT_RETRYABLE_STATUS
+    if not isinstance(error, HTTPResponseError) or error.status not in retryable:
+        return None
+    backoff = BACKOFF_BASE_S * 2 ** attempt * random.uniform(0.5, 1.0)
+    return min(BACKOFF_MAX_S, _retry_after(error) or backoff)
+
+
+def _utf16_len(text: str) -> int:
+    """Length as Notion counts it (UTF-16 code units)."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _split_text(text: str, limit: int = MAX_RICH_TEXT_CHARS) -> list[str]:
+    """Split text into pieces of at most `limit` characters, preferring line and word breaks."""
+    pieces, start = [], 0
+    while start < len(text):
+        cut = min(len(text), start + limit)
+        # Characters outside the BMP count twice: drop half the excess until the piece fits
+        excess = _utf16_len(text[start:cut]) - limit
+        while excess > 0:
+            cut -= (excess + 1) // 2
+            excess = _utf16_len(text[start:cut]) - limit
+        if cut < len(text):
+            # Break after a newline, else a space, if one is in the second half of the piece
+            for sep in ("\n", " "):
+                at = text.rfind(sep, start + (cut - start) // 2, cut)
+                if at != -1:
+                    cut = at + 1
+                    break
+        pieces.append(text[start:cut])
+        start = cut
+    return pieces or [""]
+
+
+def fit_block_limits(blocks: list[dict]) -> list[dict]:
+    """
+    Make blocks fit Notion's rich-text limits: a text item over 2,000
+    characters becomes several items in the same block, and a block with
+    more than 100 items becomes several consecutive blocks of its type
+    (nested children stay with the last one).
+    """
+    fitted = []
+    for block in blocks:
+        payload = block.get(block.get("type"), {})
+        if isinstance(payload, dict) and payload.get("children"):
+            payload = {**payload, "children": fit_block_limits(payload["children"])}
+            block = {**block, block["type"]: payload}
+        rich_text = payload.get("rich_text") if isinstance(payload, dict) else None
+        if not rich_text or len(rich_text) <= MAX_RICH_TEXT_ITEMS and all(
+            _utf16_len(item.get("text", {}).get("content", "")) <= MAX_RICH_TEXT_CHARS for item in rich_text
+        ):
+            fitted.append(block)
+            continue
+        items = []
+        for item in rich_text:
+            text = item.get("text")
+            if not text or _utf16_len(text.get("content", "")) <= MAX_RICH_TEXT_CHARS:
+                items.append(item)
+                continue
+            items.extend({**item, "text": {**text, "content": piece}} for piece in _split_text(text["content"]))
+        starts = range(0, len(items), MAX_RICH_TEXT_ITEMS)
+        head = {k: v for k, v in payload.items() if k != "children"}
+        for start in starts:
+            piece = payload if start == starts[-1] else head
+            fitted.append({**block, block["type"]: {**piece, "rich_text": items[start:start + MAX_RICH_TEXT_ITEMS]}})
+    return fitted
+
+
+def _count_blocks(block: dict) -> int:
+    """A block plus its nested children."""
+    payload = block.get(block.get("type"))
+    children = payload.get("children") if isinstance(payload, dict) else None
+    return 1 + sum(_count_blocks(child) for child in children or ())
+
+
+def batch_blocks(blocks: list[dict]) -> list[list[dict]]:
+    """
+    Consecutive batches of at most 100 blocks, MAX_NESTED_BLOCKS blocks with
+    their children and MAX_REQUEST_BYTES of JSON each (fewest requests, order kept).
+    """
+    batches, batch, size, count = [], [], 0, 0
+    for block in blocks:
+        block_bytes = len(json.dumps(block, ensure_ascii=False).encode("utf-8"))
+        block_count = _count_blocks(block)
+        if batch and (
+            len(batch) == MAX_BLOCKS_PER_REQUEST
+            or size + block_bytes > MAX_REQUEST_BYTES
+            or count + block_count > MAX_NESTED_BLOCKS
+        ):
+            batches.append(batch)
+            batch, size, count = [], 0, 0
+        batch.append(block)
+        size += block_bytes
+        count += block_count
+    if batch:
+        batches.append(batch)
+    return batches
+
+
 class NotionClient:
     """Minimal Notion API client for Keeponfirst Local Brain."""
     
     def __init__(self, config: Optional[Config] = None):
         self.config = config or get_config()
-        self.client = Client(auth=self.config.notion_token)
+        # Shared keep-alive pool; retries are _call's, paced by the bucket
+        self.client = http_transport.notion_sdk(self.config.notion_token, retry=False)
+        self.bucket = TokenBucket.for_config(self.config)
+        self.block_cache = BlockCache.for_config(self.config)
+    
+    def _call(self, method, *, idempotent: bool = True, **kwargs):
+        """
+        One API request, paced by the shared token bucket. 429s and 5xx are
+        retried with exponential backoff; a 429's Retry-After holds off every
+        process sharing the bucket. Pass idempotent=False for requests that
+        create content: those are retried on 429 only, so a page created
+        before a 502 or a timeout is never created twice.
+        """
+        for attempt in range(MAX_ATTEMPTS):
+            self.bucket.acquire()
+            try:
+                return method(**kwargs)
+            except Exception as e:
+                delay = retry_delay(e, attempt, idempotent)
+                if delay is None or attempt == MAX_ATTEMPTS - 1:
+                    raise
+                if getattr(e, "status", None) == 429:
+                    self.bucket.pause(delay)
+                else:
+                    time.sleep(delay)
+    
+    def create_page(self, parent: dict, properties: dict, blocks: list[dict]) -> NotionPage:
+        """
+        Create a page with any number of blocks: the first batch goes in
+        pages.create, the rest in ordered blocks.children.append calls. If an
+        append fails the partial page is archived, so a retry does not leave
+        a truncated duplicate behind.
+        """
+        batches = batch_blocks(fit_block_limits(blocks)) or [[]]
+        response = self._call(
+            self.client.pages.create, idempotent=False, parent=parent, properties=properties, children=batches[0]
+        )
+        try:
+            for batch in batches[1:]:
+                self._call(self.client.blocks.children.append, idempotent=False, block_id=response["id"], children=batch)
+        except Exception:
+            try:
+                self._call(self.client.pages.update, page_id=response["id"], archived=True)
+            except Exception:
+                pass
+            raise
+        return NotionPage(page_id=response["id"], url=response["url"])
     
     def initialize_root_page(self, seed_page_id: str) -> NotionPage:
         """
@@ -84,7 +265,9 @@ class NotionClient:
             },
         ]
         
-        response = self.client.pages.create(
+        response = self._call(
+            self.client.pages.create,
+            idempotent=False,
             parent={"page_id": seed_page_id},
             properties={
                 "title": {
@@ -126,19 +309,14 @@ class NotionClient:
         blocks = self._markdown_to_blocks(record)
         
         # Create the page
-        response = self.client.pages.create(
+        return self.create_page(
             parent={"page_id": self.config.notion_parent},
             properties={
                 "title": {
                     "title": [{"text": {"content": record.title}}]
                 }
             },
-            children=blocks
-        )
-        
-        return NotionPage(
-            page_id=response["id"],
-            url=response["url"]
+            blocks=blocks
         )
     
     def _create_in_database(self, record: RecordData) -> NotionPage:
@@ -154,18 +332,18 @@ class NotionClient:
         # Build page content blocks
         blocks = self._markdown_to_blocks(record)
         
-        response = self.client.pages.create(
+        return self.create_page(
             parent={"database_id": self.config.notion_parent},
             properties=properties,
-            children=blocks
-        )
-        
-        return NotionPage(
-            page_id=response["id"],
-            url=response["url"]
+            blocks=blocks
         )
     
     def _markdown_to_blocks(self, record: RecordData) -> list[dict]:
+        """Notion blocks for a record, compiled once per content version (retries reuse them)."""
+        key = block_key(record.body_markdown, record.record_type, record.date, record.tags)
+        return self.block_cache.get(key, lambda: self._compile_blocks(record))
+    
+    def _compile_blocks(self, record: RecordData) -> list[dict]:
         """Convert record to Notion blocks."""
         blocks = []
         
@@ -217,138 +395,8 @@ class NotionClient:
         return blocks
     
     def _parse_markdown_body(self, markdown: str) -> list[dict]:
-        """
-        Parse markdown into Notion blocks.
-        Supports: Headers, Lists, Quotes, Code Blocks, and basic Bookmarks.
-        """
-        blocks = []
-        lines = markdown.strip().split("\n")
-        i = 0
-        
-        while i < len(lines):
-            line = lines[i]
-            
-            # Skip empty lines
-            if not line.strip():
-                i += 1
-                continue
-            
-            # Code Blocks
-            if line.strip().startswith("```"):
-                language = line.strip()[3:] or "plain text"
-                code_content = []
-                i += 1
-                while i < len(lines) and not lines[i].strip().startswith("```"):
-                    code_content.append(lines[i])
-                    i += 1
-                
-                # Consume the closing ```
-                if i < len(lines):
-                    i += 1
-                
-                blocks.append({
-                    "object": "block",
-                    "type": "code",
-                    "code": {
-                        "rich_text": [{"type": "text", "text": {"content": "\n".join(code_content)}}],
-                        "language": self._map_language(language)
-                    }
-                })
-                continue
-            
-            # Headers
-            if line.startswith("### "):
-                blocks.append({
-                    "object": "block",
-                    "type": "heading_3",
-                    "heading_3": {"rich_text": [{"type": "text", "text": {"content": line[4:]}}]}
-                })
-            elif line.startswith("## "):
-                blocks.append({
-                    "object": "block",
-                    "type": "heading_2",
-                    "heading_2": {"rich_text": [{"type": "text", "text": {"content": line[3:]}}]}
-                })
-            elif line.startswith("# "):
-                blocks.append({
-                    "object": "block",
-                    "type": "heading_1",
-                    "heading_1": {"rich_text": [{"type": "text", "text": {"content": line[2:]}}]}
-                })
-            # Bullet list
-            elif line.startswith("- ") or line.startswith("* "):
-                blocks.append({
-                    "object": "block",
-                    "type": "bulleted_list_item",
-                    "bulleted_list_item": {"rich_text": [{"type": "text", "text": {"content": line[2:]}}]}
-                })
-            # Numbered list
-            elif len(line) > 2 and line[0].isdigit() and line[1:3] in (". ", ") "):
-                blocks.append({
-                    "object": "block",
-                    "type": "numbered_list_item",
-                    "numbered_list_item": {"rich_text": [{"type": "text", "text": {"content": line[3:]}}]}
-                })
-            # Quote
-            elif line.startswith("> "):
-                blocks.append({
-                    "object": "block",
-                    "type": "quote",
-                    "quote": {"rich_text": [{"type": "text", "text": {"content": line[2:]}}]}
-                })
-            # Bookmark (Standalone URL)
-            elif line.strip().startswith("http") and " " not in line.strip():
-                blocks.append({
-                    "object": "block",
-                    "type": "bookmark",
-                    "bookmark": {"url": line.strip()}
-                })
-            # Regular paragraph
-            else:
-                blocks.append({
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {"rich_text": [{"type": "text", "text": {"content": line}}]}
-                })
-            
-            i += 1
-        
-        return blocks
-
-    def _map_language(self, lang: str) -> str:
-        """Map common language names to Notion API supported languages."""
-        lang = lang.lower().strip()
-        mapping = {
-            "py": "python",
-            "js": "javascript",
-            "ts": "typescript",
-            "md": "markdown",
-            "sh": "bash",
-            "shell": "bash",
-            "json": "json",
-            "html": "html",
-            "css": "css",
-            "sql": "sql",
-            "go": "go",
-            "java": "java",
-            "c": "c",
-            "cpp": "c++",
-            "c++": "c++",
-            "rs": "rust",
-            "rust": "rust",
-            "rb": "ruby",
-            "ruby": "ruby",
-            "php": "php",
-            "swift": "swift",
-            "kt": "kotlin",
-            "dart": "dart",
-            "yaml": "yaml",
-            "yml": "yaml",
-            "xml": "xml",
-            "dockerfile": "docker",
-            "docker": "docker"
-        }
-        return mapping.get(lang, "plain text")
+        """Parse the record body into Notion blocks (see notion_blocks)."""
+        return compile_markdown(markdown)
     
     def test_connection(self) -> bool:
         """Test Notion API connection."""
@@ -0,0 +1,325 @@
+"""
+Keeponfirst Local Brain - Markdown to Notion Blocks
+One streaming compiler from Markdown to Notion block dicts, shared by record
+pages (NotionClient), publish_to_notion.py and generate_mcp_payload.py.
+
+Lines are read one at a time and blocks are yielded as soon as they are
+complete: a list is yielded when its top-level item closes, a code block at
+its closing fence. Supported: headings (#, ##, ### and deeper as level 3),
+bulleted and numbered lists nested by indentation (two levels deep, Notion's
+limit per request), quotes, fenced code, dividers, standalone URLs as
+bookmarks and table rows. Inline **bold**, *italic*, ~~strikethrough~~,
+`code` and [links](https://...) become rich-text annotations.
+
+Compiled pages are cached by content hash (BlockCache): in a small LRU in
+the process and as JSON under .agentic/notion_blocks/ in the brain root, so
+retries and republishes of an unchanged record skip conversion.
+
+Usage:
+    from notion_blocks import compile_markdown, iter_blocks
+    blocks = compile_markdown(markdown)
+    for block in iter_blocks(open("notes.md"), skip_title=True):
+        ...
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+# Nesting levels below a top-level list item that Notion accepts in one request
+MAX_LIST_DEPTH = 2
+
+CACHE_DIRNAME = ".agentic/notion_blocks"
+# Bump when the compiled output changes to invalidate cached pages
+COMPILE_VERSION = "1"
+# Pages kept in memory per process, and on disk (oldest pruned first)
+LRU_SIZE = 64
+DISK_MAX_ENTRIES = 2000
+# Share of disk writes that also check the disk budget
+PRUNE_CHANCE = 0.01
+
+_HEADING = re.compile(r"(#{1,6})\s+(.*)")
+_LIST_ITEM = re.compile(r"([ \t]*)([-*+]|\d{1,9}[.)])\s+(.*)")
+_DIVIDER = re.compile(r"(?:-{3,}|\*{3,}|_{3,})")
+
+# Inline patterns by the markup character they start with, tried only where one occurs
+_INLINE = {
+    "*": re.compile(
+        r"\*\*(?P<bold>.+?)\*\*"
+        r"|(?<![\w*])\*(?P<italic>[^*\s](?:[^*]*[^*\s])?)\*(?![\w*])"
+    ),
+    "_": re.compile(r"(?<![\w_])_(?P<italic>[^_\s](?:[^_]*[^_\s])?)_(?![\w_])"),
+    "~": re.compile(r"~~(?P<strike>.+?)~~"),
+    "`": re.compile(r"`(?P<code>[^`]+)`"),
+    "[": re.compile(r"\[(?P<label>[^\]]+)\]\((?P<url>(?:https?://|mailto:)[^)\s]+)\)"),
+}
+_MARKUP = re.compile(r"[*_`\[~]")
+_ANNOTATION = {"bold": "bold", "italic": "italic", "strike": "strikethrough"}
+
+LANGUAGE_ALIASES = {
+    "py": "python",
+    "js": "javascript",
+    "ts": "typescript",
+    "md": "markdown",
+    "sh": "bash",
+    "shell": "bash",
+    "zsh": "bash",
+    "cpp": "c++",
+    "rs": "rust",
+    "rb": "ruby",
+    "kt": "kotlin",
+    "yml": "yaml",
+    "dockerfile": "docker",
+    "golang": "go",
+}
+NOTION_LANGUAGES = frozenset({
+    "bash", "c", "c#", "c++", "css", "dart", "diff", "docker", "go", "graphql",
+    "html", "java", "javascript", "json", "kotlin", "lua", "makefile", "markdown",
+    "mermaid", "php", "plain text", "powershell", "python", "r", "ruby", "rust",
+    "scala", "sql", "swift", "typescript", "xml", "yaml",
+})
+
+
+def map_language(lang: str) -> str:
+    """Map a fence's language tag to a language the Notion API accepts."""
+    lang = lang.lower().strip()
+    lang = LANGUAGE_ALIASES.get(lang, lang)
+    return lang if lang in NOTION_LANGUAGES else "plain text"
+
+
+def _text(content: str, annotations: Optional[dict] = None, url: Optional[str] = None) -> dict:
+    text = {"content": content}
+    if url:
+        text["link"] = {"url": url}
+    item = {"type": "text", "text": text}
+    if annotations:
+        item["annotations"] = annotations
+    return item
+
+
+def rich_text(text: str, annotations: Optional[dict] = None, url: Optional[str] = None) -> list[dict]:
+    """Rich-text items for one line of Markdown, with inline annotations and links."""
+    if not text:
+        return []
+    if not _MARKUP.search(text):
+        return [_text(text, annotations, url)]
+    items, pos, find = [], 0, 0
+    # Only try the inline patterns where a markup character is
+    while (hit := _MARKUP.search(text, find)) is not None:
+        at = hit.start()
+        m = _INLINE[text[at]].match(text, at)
+        if m is None:
+            find = at + 1
+            continue
+        if m.start() > pos:
+            items.append(_text(text[pos:m.start()], annotations, url))
+        kind = m.lastgroup
+        if kind == "code":
+            items.append(_text(m["code"], {**(annotations or {}), "code": True}, url))
+        elif kind == "url":
+            items.extend(rich_text(m["label"], annotations, m["url"]))
+        else:
+            items.extend(rich_text(m[kind], {**(annotations or {}), _ANNOTATION[kind]: True}, url))
+        pos = find = m.end()
+    if pos < len(text):
+        items.append(_text(text[pos:], annotations, url))
+    return items
+
+
+def _block(kind: str, payload: dict) -> dict:
+    return {"object": "block", "type": kind, kind: payload}
+
+
+def _code_block(lines: list[str], language: str) -> dict:
+    return _block("code", {"rich_text": [_text("\n".join(lines))], "language": language})
+
+
+def _indent(spaces: str) -> int:
+    return len(spaces.expandtabs(4))
+
+
+def iter_blocks(
+    markdown: Union[str, Iterable[str]],
+    skip_title: bool = False,
+    tables: str = "paragraph",
+) -> Iterator[dict]:
+    """
+    Yield Notion blocks for Markdown text or an iterable of lines (e.g. an
+    open file). skip_title drops a leading "# " line (the page title).
+    tables="code" keeps consecutive table rows together as one plain-text
+    code block, so columns stay aligned; "paragraph" makes each row a
+    paragraph.
+    """
+    lines = markdown.splitlines() if isinstance(markdown, str) else (line.rstrip("\r\n") for line in markdown)
+    fence: Optional[tuple[str, list[str]]] = None  # (language, lines) inside ```
+    table: list[str] = []
+    items: list[tuple[int, dict]] = []  # open list items: (indent, block), top level first
+    root: Optional[dict] = None  # top-level item of the open list
+
+    for lineno, line in enumerate(lines):
+        stripped = line.strip()
+        if fence is not None:
+            if stripped.startswith("```"):
+                yield _code_block(fence[1], fence[0])
+                fence = None
+            else:
+                fence[1].append(line)
+            continue
+        if not stripped:
+            continue  # blank lines neither end a list nor a table
+        if lineno == 0 and skip_title and line.startswith("# "):
+            continue
+
+        first = stripped[0]
+        rule = first in "-*_" and _DIVIDER.fullmatch(stripped)
+        match = _LIST_ITEM.match(line) if (first in "-*+" or first.isdigit()) and not rule else None
+        if match:
+            if table:
+                yield _code_block(table, "plain text")
+                table = []
+            indent, marker, content = match.groups()
+            kind = "numbered_list_item" if marker[0].isdigit() else "bulleted_list_item"
+            block = _block(kind, {"rich_text": rich_text(content)})
+            indent = _indent(indent)
+            while items and items[-1][0] >= indent:
+                items.pop()
+            if not items:
+                # A new top-level item: the previous list tree is complete
+                if root is not None:
+                    yield root
+                root = block
+            else:
+                # Deeper items become siblings at the deepest level allowed
+                del items[MAX_LIST_DEPTH:]
+                parent = items[-1][1]
+                parent[parent["type"]].setdefault("children", []).append(block)
+            items.append((indent, block))
+            continue
+
+        if root is not None:
+            yield root
+            items, root = [], None
+        if first == "|" and tables == "code":
+            table.append(line)
+            continue
+        if table:
+            yield _code_block(table, "plain text")
+            table = []
+
+        if stripped.startswith("```"):
+            fence = (map_language(stripped[3:]), [])
+        elif first == "#" and line[0] == "#" and (heading := _HEADING.fullmatch(line)):
+            level = min(3, len(heading[1]))
+            yield _block(f"heading_{level}", {"rich_text": rich_text(heading[2])})
+        elif rule:
+            yield _block("divider", {})
+        elif first == ">":
+            yield _block("quote", {"rich_text": rich_text(stripped[1:].strip())})
+        elif stripped.startswith(("http://", "https://")) and " " not in stripped:
+            yield _block("bookmark", {"url": stripped})
+        elif first == "|":
+            yield _block("paragraph", {"rich_text": [_text(line)]})
+        else:
+            yield _block("paragraph", {"rich_text": rich_text(line)})
+
+    if root is not None:
+        yield root
+    if table:
+        yield _code_block(table, "plain text")
+    if fence is not None:
+        # Unclosed fence: keep the code rather than drop it
+        yield _code_block(fence[1], fence[0])
+
+
+def compile_markdown(markdown: Union[str, Iterable[str]], skip_title: bool = False, tables: str = "paragraph") -> list[dict]:
+    """All blocks of iter_blocks() as a list."""
+    return list(iter_blocks(markdown, skip_title=skip_title, tables=tables))
+
+
+def block_key(markdown: str, *metadata) -> str:
+    """Cache key for a page compiled from `markdown` plus the metadata that feeds its header blocks."""
+    canonical = json.dumps([COMPILE_VERSION, markdown, *metadata], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+_lru: "OrderedDict[str, list[dict]]" = OrderedDict()
+_lru_lock = threading.Lock()
+
+
+class BlockCache:
+    """Content-addressed cache of compiled block lists: process LRU in front of JSON files."""
+
+    def __init__(self, cache_dir: Path):
+        self.dir = Path(cache_dir)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_config(cls, config) -> "BlockCache":
+        return cls(config.records_dir.parent / CACHE_DIRNAME)
+
+    def path_for(self, key: str) -> Path:
+        return self.dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str, build: Callable[[], list[dict]]) -> list[dict]:
+        """Blocks cached under `key`, built (and cached) on a miss. Treat them as read-only."""
+        with _lru_lock:
+            blocks = _lru.get(key)
+            if blocks is not None:
+                _lru.move_to_end(key)
+                self.hits += 1
+                return list(blocks)
+        path = self.path_for(key)
+        try:
+            blocks = json.loads(path.read_bytes())
+            self.disk_hits += 1
+            # Recently used pages are the last to be pruned
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            blocks = list(build())
+            self._write(path, blocks)
+        with _lru_lock:
+            _lru[key] = blocks
+            while len(_lru) > LRU_SIZE:
+                _lru.popitem(last=False)
+        return list(blocks)
+
+    def _write(self, path: Path, blocks: list[dict]) -> None:
+        # The cache is an optimisation: a failed write only costs a rebuild later
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(blocks, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            return
+        if random.random() < PRUNE_CHANCE:
+            self.prune()
+
+    def prune(self, keep: int = DISK_MAX_ENTRIES) -> int:
+        """Delete the least recently used files beyond `keep`. Returns how many were deleted."""
+        entries = []
+        for path in self.dir.glob("*/*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        if len(entries) <= keep:
+            return 0
+        entries.sort()
+        removed = 0
+        for _, path in entries[:len(entries) - keep]:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+        return removed
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Keeponfirst Local Brain - Notion Outbox
+Durable queue of captures waiting for their Notion page (NOTION_SYNC=outbox).
+The capture saves the record locally with notion_sync_status PENDING, adds it
+to the outbox (.agentic/notion_outbox.sqlite) and returns; a drainer creates
+the pages afterwards and writes notion_page_id, notion_url and the status
+back into the stored record.
+
+The drainer is a detached `notion_outbox.py --drain` process started by the
+capture, or a thread inside the capture daemon. Only one drains at a time.
+A page that fails is retried on a later drain, with exponential backoff.
+Requests are paced by a token bucket shared by all processes (rate_limit.py)
+and 429s are retried after their Retry-After.
+
+--retry-pending also picks up records that failed an inline Notion sync
+(notion_sync_status PENDING), found through the local index.
+
+Usage:
+    python notion_outbox.py                  # queued and failing counts
+    python notion_outbox.py --list
+    python notion_outbox.py --drain
+    python notion_outbox.py --retry-pending [--now]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional
+
+# fcntl is POSIX-only; without it two drainers may run at once (pages could be created twice)
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+OUTBOX_FILENAME = ".agentic/notion_outbox.sqlite"
+LOCK_FILENAME = ".agentic/notion_outbox.lock"
+DRAINER_LOG = ".agentic/notion_outbox.log"
+# Entries read per drain query
+DRAIN_BATCH = 50
+# Page creations in flight at once; the shared token bucket (rate_limit.py) sets the actual rate
+DRAIN_WORKERS = 3
+# A failed page is retried RETRY_DELAY_S after its first failure, doubling per attempt up to RETRY_MAX_DELAY_S
+RETRY_DELAY_S = 60
+RETRY_MAX_DELAY_S = 6 * 3600
+
+
+@dataclass
+class OutboxEntry:
+    """A saved record whose Notion page is still to be created."""
+    record_id: str
+    location: str  # record JSON path or segment URI
+    enqueued_at: float
+    attempts: int = 0
+    last_error: Optional[str] = None
+    # Set once the page exists, so a retry after a failed local update reuses it
+    notion_page_id: Optional[str] = None
+    notion_url: Optional[str] = None
+
+
+@dataclass
+class DrainStats:
+    synced: int = 0
+    failed: int = 0
+    dropped: int = 0  # record deleted, or already on Notion
+    adopted: int = 0  # pending records found in the local index and queued
+    elapsed_s: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.synced / self.elapsed_s if self.elapsed_s else 0.0
+
+
+class NotionOutbox:
+    """SQLite-backed queue of records to publish to Notion, in the brain root."""
+
+    def __init__(self, home: Path):
+        self.home = Path(home)
+        self.db_path = self.home / OUTBOX_FILENAME
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @classmethod
+    def for_config(cls, config) -> "NotionOutbox":
+        return cls(config.records_dir.parent)
+
+    def exists(self) -> bool:
+        return self.db_path.exists()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            with self._conn:
+                self._conn.execute(
+                    """CREATE TABLE IF NOT EXISTS outbox (
+                        record_id TEXT PRIMARY KEY,
+                        location TEXT NOT NULL,
+                        enqueued_at REAL NOT NULL,
+                        next_attempt_at REAL NOT NULL,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        last_error TEXT,
+                        notion_page_id TEXT,
+                        notion_url TEXT
+                    )"""
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_attempt_at)")
+                columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+                for column in ("notion_page_id", "notion_url"):
+                    if column not in columns:
+                        # Outbox created before pages were recorded
+                        self._conn.execute(f"ALTER TABLE outbox ADD COLUMN {column} TEXT")
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def enqueue_many(self, items: list[tuple[str, str]]) -> None:
+        """Queue (record_id, location) pairs, due now. A record already queued keeps its entry."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO outbox (record_id, location, enqueued_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                [(record_id, str(location), now, now) for record_id, location in items],
+            )
+
+    def due(self, limit: int = DRAIN_BATCH, now: Optional[float] = None) -> list[OutboxEntry]:
+        """Entries whose next attempt is due, oldest first."""
+        rows = self.conn.execute(
+            "SELECT record_id, location, enqueued_at, attempts, last_error, notion_page_id, notion_url FROM outbox "
+            "WHERE next_attempt_at <= ? ORDER BY next_attempt_at, enqueued_at LIMIT ?",
+            (time.time() if now is None else now, limit),
+        ).fetchall()
+        return [OutboxEntry(*row) for row in rows]
+
+    def entries(self) -> list[OutboxEntry]:
+        rows = self.conn.execute(
+            "SELECT record_id, location, enqueued_at, attempts, last_error, notion_page_id, notion_url FROM outbox ORDER BY enqueued_at"
+        ).fetchall()
+        return [OutboxEntry(*row) for row in rows]
+
+    def record_page(self, record_id: str, page_id: str, url: Optional[str]) -> None:
+        """Remember the page created for an entry before the record itself is updated."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET notion_page_id = ?, notion_url = ? WHERE record_id = ?",
+                (page_id, url, record_id),
+            )
+
+    def complete(self, record_id: str) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM outbox WHERE record_id = ?", (record_id,))
+
+    def fail(self, record_id: str, error: str) -> None:
+        """Count a failed attempt and back the entry off exponentially."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET next_attempt_at = ? + MIN(?, ? * (1 << MIN(attempts, 20))), "
+                "attempts = attempts + 1, last_error = ? WHERE record_id = ?",
+                (time.time(), RETRY_MAX_DELAY_S, RETRY_DELAY_S, error, record_id),
+            )
+
+    def make_due(self) -> None:
+        """Make every entry due now, cutting its backoff short."""
+        with self.conn:
+            self.conn.execute("UPDATE outbox SET next_attempt_at = ?", (time.time(),))
+
+    def relocate(self, moves: list[tuple[str, str]]) -> None:
+        """Follow record files moved to new paths (migrate_layout.py)."""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE outbox SET location = ? WHERE location = ?",
+                [(str(target), str(source)) for source, target in moves],
+            )
+
+    def counts(self) -> dict:
+        queued, failing = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(attempts > 0), 0) FROM outbox"
+        ).fetchone()
+        return {"queued": queued, "failing": failing}
+
+
+@contextmanager
+def _drain_lock(home: Path):
+    """Yield True if this process may drain (no other drainer is running), else False."""
+    path = home / LOCK_FILENAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as lock_file:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def adopt_pending(index, outbox: NotionOutbox) -> int:
+    """
+    Queue the records the local index marks as Notion-pending that are not
+    in the outbox yet (inline captures whose Notion call failed, records
+    from before the outbox). Returns how many were added.
+    """
+    from segment_store import parse_uri
+
+    queued = {row[0] for row in outbox.conn.execute("SELECT location FROM outbox")}
+    items = []
+    for location in index.notion_pending():
+        if location in queued:
+            continue
+        loaded = index.load(location)
+        if loaded is not None:
+            items.append((loaded[0].get("supabase_id") or parse_uri(location) or location, location))
+    outbox.enqueue_many(items)
+    return len(items)
+
+
+def _drain_batch(entries: list[OutboxEntry], outbox: NotionOutbox, index, config, notion, workers: int, stats: DrainStats) -> None:
+    """Create the pages of one batch (`workers` at a time) and record each outcome."""
+    from markdown_view import _as_local_record
+    from write_record import sync_to_notion, update_local, _run_stage
+
+    pending = []
+    for entry in entries:
+        loaded = index.load(entry.location)
+        if loaded is None or loaded[0].get("notion_page_id"):
+            # Deleted, or published some other way
+            outbox.complete(entry.record_id)
+            stats.dropped += 1
+        else:
+            pending.append((entry, _as_local_record(loaded[0])))
+    if not pending:
+        return
+
+    # A page created by an earlier attempt whose local update failed is reused, not created again
+    to_create = []
+    for entry, record in pending:
+        if entry.notion_page_id:
+            record.notion_page_id, record.notion_url = entry.notion_page_id, entry.notion_url
+        else:
+            to_create.append((entry, record))
+    if to_create:
+        client, client_error = notion()
+        _run_stage(lambda item: sync_to_notion(item[1], client, client_error), to_create, workers)
+    for entry, record in pending:
+        try:
+            if record.notion_page_id:
+                if not entry.notion_page_id:
+                    outbox.record_page(entry.record_id, record.notion_page_id, record.notion_url)
+                changes = {"notion_page_id": record.notion_page_id, "notion_url": record.notion_url,
+                           "notion_sync_status": "SUCCESS", "notion_error": None}
+                update_local(entry.location, changes, config, index)
+                outbox.complete(entry.record_id)
+                stats.synced += 1
+                continue
+            update_local(entry.location, {"notion_error": record.notion_error}, config, index)
+            error = record.notion_error
+        except Exception as e:
+            error = str(e)
+        outbox.fail(entry.record_id, error)
+        stats.failed += 1
+
+
+def drain(config, notion=None, workers: int = DRAIN_WORKERS, adopt: bool = False, now: bool = False) -> Optional[DrainStats]:
+    """
+    Publish every due outbox entry. Returns None without doing anything if
+    another drainer is running. `notion` is a callable returning
+    (client, error), e.g. CaptureContext.notion; by default a client is
+    created on first need. adopt first queues the Notion-pending records of
+    the local index; now also retries entries that are still backing off.
+    """
+    from local_index import LocalIndex
+
+    outbox = NotionOutbox.for_config(config)
+    if not (outbox.exists() or adopt):
+        return DrainStats()
+    if notion is None:
+        created = []
+
+        def notion():
+            if not created:
+                try:
+                    from notion_api import NotionClient
+
+                    created.append((NotionClient(config), None))
+                except Exception as e:
+                    created.append((None, e))
+            return created[0]
+
+    start = time.perf_counter()
+    stats = DrainStats()
+    index = LocalIndex.for_config(config)
+    try:
+        while True:
+            with _drain_lock(outbox.home) as acquired:
+                if not acquired:
+                    return None
+                if adopt:
+                    stats.adopted = adopt_pending(index, outbox)
+                    adopt = False
+                if now:
+                    outbox.make_due()
+                    now = False
+                while True:
+                    entries = outbox.due()
+                    if not entries:
+                        break
+                    _drain_batch(entries, outbox, index, config, notion, workers, stats)
+            # A capture may have queued a record after the last query but before
+            # the lock was released, and its drainer found the lock held
+            if not outbox.due(limit=1):
+                break
+    finally:
+        index.close()
+        outbox.close()
+    stats.elapsed_s = time.perf_counter() - start
+    if stats.synced or stats.failed:
+        import log_manager
+
+        log_manager.write_central_log(
+            task_intent="notion_outbox_drain",
+            event_data={
+                "synced": stats.synced,
+                "failed": stats.failed,
+                "dropped": stats.dropped,
+                "adopted": stats.adopted,
+                "elapsed_s": round(stats.elapsed_s, 3),
+            },
+            status="SUCCESS" if not stats.failed else "PARTIAL",
+        )
+    return stats
+
+
+def drainer_running(home: Path) -> bool:
+    """True if another process holds the drain lock."""
+    with _drain_lock(home) as acquired:
+        return not acquired
+
+
+def start_drainer(config):
+    """
+    Drain the outbox in a detached process, so the capture can return now.
+    Returns the process, or None if a drainer is already running (it
+    rechecks the outbox before it exits, so it picks up the new entries).
+    """
+    import subprocess
+
+    if drainer_running(config.records_dir.parent):
+        return None
+    log_path = config.records_dir.parent / DRAINER_LOG
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "ab") as log:
+        return subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "--drain", "--quiet"],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+            start_new_session=True,
+        )
+
+
+class OutboxDrainer(threading.Thread):
+    """
+    Drain thread of the capture daemon: runs when woken, and every
+    RETRY_DELAY_S. The daemon resolves the brain per capture, so it drains
+    the outbox of every brain that entries were queued in.
+    """
+
+    def __init__(self, context):
+        super().__init__(name="notion-outbox", daemon=True)
+        self.context = context
+        self._wake = threading.Event()
+        self._stopping = False
+        # Latest config per brain root, starting with the daemon's own brain
+        self._brains = {context.config.records_dir.parent: context.config}
+        self._brains_lock = threading.Lock()
+
+    def wake(self, config=None) -> None:
+        """Drain now; `config` is the brain an entry was just queued in."""
+        if config is not None:
+            with self._brains_lock:
+                self._brains[config.records_dir.parent] = config
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wake.set()
+
+    def run(self) -> None:
+        import log_manager
+
+        while True:
+            self._wake.wait(RETRY_DELAY_S)
+            self._wake.clear()
+            if self._stopping:
+                return
+            with self._brains_lock:
+                brains = list(self._brains.items())
+            for home, config in brains:
+                # The warm client belongs to the context's current brain; others get their own
+                notion = self.context.notion if config is self.context.config else None
+                try:
+                    # Log to the brain being drained, not the daemon's own
+                    with log_manager.caller_context(None, str(home)):
+                        drain(config, notion)
+                except Exception as e:
+                    print(f"⚠️  Notion outbox drain failed for {home}: {e}", file=sys.stderr, flush=True)
+
+
+def main():
+    from config import get_config
+
+    parser = argparse.ArgumentParser(description="Notion outbox: captures waiting for their Notion page")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--drain", action="store_true", help="Publish every due entry now")
+    group.add_argument("--retry-pending", action="store_true", help="Queue every Notion-pending record, then drain")
+    group.add_argument("--list", action="store_true", help="List queued entries")
+    parser.add_argument("--now", action="store_true", help="Also retry entries that are still backing off")
+    parser.add_argument("--workers", type=int, default=DRAIN_WORKERS, help=f"Pages created concurrently (default {DRAIN_WORKERS})")
+    parser.add_argument("--quiet", action="store_true", help="No output unless something failed")
+    parser.add_argument("--json", action="store_true", help="Print JSON")
+    args = parser.parse_args()
+
+    config = get_config()
+    if args.drain or args.retry_pending:
+        stats = drain(config, workers=max(1, args.workers), adopt=args.retry_pending, now=args.now)
+        if stats is None:
+            if not args.quiet:
+                print("⚪ Another drainer is running")
+            return
+        if stats.failed or not args.quiet:
+            adopted = f" ({stats.adopted} pending records queued)" if args.retry_pending else ""
+            print(f"✅ Notion outbox drained in {stats.elapsed_s:.1f}s{adopted}: "
+                  f"{stats.synced} synced ({stats.per_second:.1f}/s), {stats.failed} failed, {stats.dropped} dropped")
+        return
+
+    outbox = NotionOutbox.for_config(config)
+    if not outbox.exists():
+        print(json.dumps({"queued": 0, "failing": 0}) if args.json else "✅ Notion outbox is empty")
+        return
+    try:
+        if args.list:
+            entries = outbox.entries()
+            if args.json:
+                print(json.dumps([asdict(e) for e in entries], ensure_ascii=False, indent=2))
+                return
+            for entry in entries:
+                error = f"  ⚠️  {entry.last_error}" if entry.last_error else ""
+                print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.enqueued_at))}  "
+                      f"{os.path.basename(entry.location)}  attempts={entry.attempts}{error}")
+            return
+        counts = outbox.counts()
+    finally:
+        outbox.close()
+    if args.json:
+        print(json.dumps(counts))
+    else:
+        print(f"📬 {counts['queued']} captures waiting for Notion ({counts['failing']} failing)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Keeponfirst Local Brain - BM25 Ranking
+Relevance ranking for local search: BM25 over field-weighted word postings,
+multiplied by an optional recency decay on created_at and per-type boosts.
+
+Scores are computed in one batch over the postings of the query terms
+(np.bincount), and only the k best candidates are selected and sorted.
+"""
+
+import re
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from local_index import SearchHit
+from sparse_index import PostingsIndex
+
+# Field weights: a term in the title counts 3x a term in the body
+FIELD_WEIGHTS = (("title", 3.0), ("tags", 2.0), ("final_body", 1.0), ("source_text", 0.5))
+TYPE_CODES = {"decision": 0, "worklog": 1, "idea": 2, "backlog": 3}
+OTHER_TYPE_CODE = len(TYPE_CODES)
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af"
+_TOKEN_RE = re.compile(rf"([{_CJK}]+)|([^\W{_CJK}]+)", re.UNICODE)
+
+
+@dataclass
+class RankingProfile:
+    """BM25 parameters plus recency and record-type adjustments."""
+    k1: float = 1.2
+    b: float = 0.75
+    half_life_days: Optional[float] = None  # None disables recency decay
+    recency_weight: float = 0.3             # share of the score subject to decay
+    type_boosts: dict = field(default_factory=dict)
+
+
+# Default profile per search.py output mode
+PROFILES = {
+    "search": RankingProfile(half_life_days=180, recency_weight=0.2),
+    "trace": RankingProfile(type_boosts={"decision": 1.5, "idea": 1.2}),
+    "recall": RankingProfile(half_life_days=14, recency_weight=0.6),
+}
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens; CJK runs become overlapping character bigrams."""
+    tokens = []
+    for cjk, word in _TOKEN_RE.findall(text.lower()):
+        if word:
+            tokens.append(word)
+        elif len(cjk) == 1:
+            tokens.append(cjk)
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+
+def term_id(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+
+class BM25Index(PostingsIndex):
+    """BM25 postings (field-weighted term frequencies) over all local records."""
+
+    name = "bm25"
+    doc_arrays = ("length", "created_ts", "type_code")
+
+    def vectorize(self, row: dict) -> tuple[np.ndarray, np.ndarray, dict]:
+        counts: dict[str, float] = {}
+        length = 0.0
+        for name, weight in FIELD_WEIGHTS:
+            text = " ".join(row[name]) if name == "tags" else (row[name] or "")
+            tokens = tokenize(text)
+            length += weight * len(tokens)
+            for token in tokens:
+                counts[token] = counts.get(token, 0.0) + weight
+
+        ids = np.fromiter((term_id(t) for t in counts), dtype=np.uint32, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        # Sum the (rare) hash collisions so features stay unique
+        features, inverse = np.unique(ids, return_inverse=True)
+        tf = np.bincount(inverse, weights=tf, minlength=len(features)).astype(np.float32)
+        attrs = {
+            "length": length,
+            "created_ts": row["created_ts"],
+            "type_code": TYPE_CODES.get(row["record_type"], OTHER_TYPE_CODE),
+        }
+        return features, tf, attrs
+
+    def search(
+        self,
+        query: str,
+        profile: Optional[RankingProfile] = None,
+        limit: int = 20,
+        record_type: Optional[str] = None,
+        allowed_rowids: Optional[list[int]] = None,
+    ) -> list[SearchHit]:
+        """
+        Top `limit` records for a free-text query, best first.
+        allowed_rowids restricts results to those index rows (e.g. a time window).
+        """
+        profile = profile or PROFILES["search"]
+        self.refresh()
+        qf = np.unique(np.array([term_id(t) for t in tokenize(query)], dtype=np.uint32))
+        if not len(qf):
+            return []
+
+        alive = self.all_alive()
+        if allowed_rowids is not None:
+            rowids = np.concatenate([self.keys[:, 0], self.delta_keys[:, 0]])
+            alive &= np.isin(rowids, np.asarray(allowed_rowids, dtype=np.int64))
+        slots, tf, terms = self.lookup(qf)
+        live = alive[slots]
+        slots, tf, terms = slots[live], tf[live], terms[live]
+        if not len(slots):
+            return []
+
+        n_docs = max(int(alive.sum()), 1)
+        lengths = self.all_doc("length")
+        avgdl = max(float(lengths[alive].mean()) if alive.any() else 1.0, 1e-6)
+        df = np.bincount(terms, minlength=len(qf))
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+
+        norm = profile.k1 * (1.0 - profile.b + profile.b * lengths[slots] / avgdl)
+        contrib = idf[terms] * tf * (profile.k1 + 1.0) / (tf + norm)
+        scores = np.bincount(slots, weights=contrib, minlength=self.n_docs)
+
+        candidates = np.flatnonzero(scores)
+        type_codes = self.all_doc("type_code")[candidates].astype(np.int64)
+        if record_type:
+            code = TYPE_CODES.get(record_type, OTHER_TYPE_CODE)
+            scores[candidates[type_codes != code]] = 0.0
+        if profile.type_boosts:
+            boosts = np.ones(OTHER_TYPE_CODE + 1)
+            for name, boost in profile.type_boosts.items():
+                boosts[TYPE_CODES.get(name, OTHER_TYPE_CODE)] = boost
+            scores[candidates] *= boosts[type_codes]
+        if profile.half_life_days:
+            age_days = np.maximum(time.time() - self.all_doc("created_ts")[candidates], 0.0) / 86400.0
+            decay = 0.5 ** (age_days / profile.half_life_days)
+            scores[candidates] *= (1.0 - profile.recency_weight) + profile.recency_weight * decay
+
+        top = self.top_k(scores, limit)
+        hits = []
+        for slot, row in zip(top, self.rows_for(top)):
+            if row is None:
+                continue
+            title, rtype, created_at, date, tags, notion_url, json_path, md_path = row
+            hits.append(SearchHit(
+                title=title,
+                record_type=rtype,
+                created_at=created_at,
+                date=date or None,
+                tags=[t for t in tags.split(",") if t],
+                notion_url=notion_url,
+                json_path=json_path,
+                md_path=md_path,
+                score=round(float(scores[slot]), 4),
+            ))
+        return hits
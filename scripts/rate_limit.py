@@ -0,0 +1,94 @@
+"""
+Keeponfirst Local Brain - Rate Limiter
+Token bucket shared by every process on the machine, for the Notion API's
+~3 requests/s limit. The bucket is a 16-byte state file (tokens, updated at)
+in the brain root, read and updated under an exclusive flock, so captures,
+the capture daemon and outbox drainers draw from the same budget.
+
+NOTION_RATE_LIMIT sets the rate in requests/s (default 3, 0 disables).
+"""
+
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Optional
+
+# fcntl is POSIX-only; without it each process keeps its own bucket
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+BUCKET_FILENAME = ".agentic/notion_rate.bucket"
+DEFAULT_RATE = 3.0
+_STATE = struct.Struct("<dd")  # tokens, time.time() of the last update
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`; acquire() blocks until a token is free."""
+
+    def __init__(self, path: Path, rate: float = DEFAULT_RATE, burst: Optional[float] = None):
+        self.path = Path(path)
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+
+    @classmethod
+    def for_config(cls, config) -> "TokenBucket":
+        raw = os.environ.get("NOTION_RATE_LIMIT", "").strip()
+        try:
+            rate = float(raw) if raw else DEFAULT_RATE
+        except ValueError:
+            rate = DEFAULT_RATE
+        return cls(config.records_dir.parent / BUCKET_FILENAME, rate)
+
+    def _update(self, take: float = 0.0, debt_s: float = 0.0) -> float:
+        """
+        Refill, then take `take` tokens if they are there. debt_s empties the
+        bucket for that long (a Retry-After). Returns the seconds to wait
+        before `take` tokens are free (0.0 if they were taken).
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read(_STATE.size)
+                now = time.time()
+                tokens, updated = _STATE.unpack(raw) if len(raw) == _STATE.size else (self.burst, now)
+                tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+                if debt_s:
+                    tokens = min(tokens, -debt_s * self.rate)
+                wait = 0.0
+                if take:
+                    if tokens >= take:
+                        tokens -= take
+                    else:
+                        wait = (take - tokens) / self.rate
+                f.seek(0)
+                f.truncate()
+                f.write(_STATE.pack(tokens, now))
+                # Before the unlock, or the next process reads the old state
+                f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return wait
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are taken. Returns the seconds spent waiting."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            wait = self._update(take=tokens)
+            if not wait:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        """Hold every process off for `seconds` (e.g. a 429's Retry-After)."""
+        if self.rate > 0 and seconds > 0:
+            self._update(debt_s=seconds)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Keeponfirst Local Brain - Related Records
+Local "Context-Aware Capture": suggests past records related to a draft
+without a Notion round trip.
+
+Every record is a TF-IDF vector over hashed character n-grams of its
+title, tags and body (n-grams also work for CJK text, which has no word
+boundaries). Vectors are kept in a feature-sorted postings layout under
+.agentic/related/, so a query only touches the postings of its most
+informative n-grams.
+
+Usage:
+    python related.py --input /tmp/kof_record.json
+    python related.py --title "Cache invalidation" --body "..." -k 5
+"""
+
+import argparse
+import json
+import time
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+import numpy as np
+
+from sparse_index import PostingsIndex
+
+NGRAM = 3
+N_FEATURES = 1 << 20
+TITLE_REPEAT = 2        # title n-grams count double
+BODY_CHARS = 4000       # only the head of very long bodies is vectorized
+QUERY_FEATURES = 96     # most informative draft n-grams used for lookup
+
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+
+
+@dataclass
+class RelatedHit:
+    """A past record similar to the draft."""
+    title: str
+    record_type: str
+    created_at: str
+    notion_url: Optional[str]
+    json_path: str
+    score: float
+
+
+def hash_ngrams(text: str) -> np.ndarray:
+    """Feature ids of the character n-grams in text (FNV-1a over code points)."""
+    text = " " + " ".join(text.lower().split()) + " "
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    count = len(codes) - NGRAM + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.uint32)
+    h = np.full(count, _FNV_OFFSET, dtype=np.uint64)
+    for k in range(NGRAM):
+        h = (h ^ codes[k:k + count]) * _FNV_PRIME
+    return (h % np.uint64(N_FEATURES)).astype(np.uint32)
+
+
+def vectorize(title: str, body: str = "", tags: Optional[list[str]] = None) -> tuple[np.ndarray, np.ndarray]:
+    """Sparse term-frequency vector of a record: (sorted feature ids, 1 + log(tf))."""
+    parts = [hash_ngrams(title or "")] * TITLE_REPEAT
+    parts.append(hash_ngrams(" ".join(tags or [])))
+    parts.append(hash_ngrams((body or "")[:BODY_CHARS]))
+    features, counts = np.unique(np.concatenate(parts), return_counts=True)
+    return features, (1.0 + np.log(counts)).astype(np.float32)
+
+
+class RelatedIndex(PostingsIndex):
+    """TF-IDF cosine similarity over all records in a LocalIndex."""
+
+    name = "related"
+    doc_arrays = ("norm",)
+    corpus_arrays = ("idf",)
+
+    def __init__(self, index):
+        super().__init__(index)
+        self.idf = np.ones(N_FEATURES, dtype=np.float32)
+
+    def vectorize(self, row: dict) -> tuple[np.ndarray, np.ndarray, dict]:
+        features, tf = vectorize(row["title"], row["final_body"], row["tags"])
+        return features, tf, {}
+
+    def _norms(self, features: np.ndarray, docs: np.ndarray, values: np.ndarray, first: int, count: int) -> np.ndarray:
+        weights = (values * self.idf[features]) ** 2
+        return np.sqrt(np.bincount(docs - first, weights=weights, minlength=count)).astype(np.float32)
+
+    def _on_merge(self) -> None:
+        df = np.bincount(self.features, minlength=N_FEATURES)
+        self.idf = (np.log((self.n_base + 1) / (df + 1)) + 1.0).astype(np.float32)
+        self.doc["norm"] = self._norms(self.features, self.docs, self.values, 0, self.n_base)
+
+    def _on_delta(self) -> None:
+        # Delta records are weighted with the base idf until the next merge
+        self.delta_doc["norm"] = self._norms(
+            self.delta_features, self.delta_docs, self.delta_values, self.n_base, len(self.delta_keys)
+        )
+
+    def related(
+        self,
+        title: str,
+        body: str = "",
+        tags: Optional[list[str]] = None,
+        k: int = 5,
+        min_score: float = 0.05,
+    ) -> list[RelatedHit]:
+        """Top-k records most similar (cosine) to a draft."""
+        self.refresh()
+        qf, qtf = vectorize(title, body, tags)
+        if not len(qf):
+            return []
+        qw = qtf * self.idf[qf]
+        qnorm = float(np.linalg.norm(qw))
+        if len(qf) > QUERY_FEATURES:
+            top = np.sort(np.argpartition(-qw, QUERY_FEATURES)[:QUERY_FEATURES])
+            qf, qw = qf[top], qw[top]
+
+        # Postings carry the record tf; query weight x idf is folded in per feature
+        slots, tf, terms = self.lookup(qf)
+        scores = np.bincount(slots, weights=tf * (qw * self.idf[qf])[terms], minlength=self.n_docs)
+        norms = self.all_doc("norm")
+        live = self.all_alive() & (norms > 0)
+        scores = np.where(live, scores / np.maximum(norms, 1e-12) / max(qnorm, 1e-12), 0.0)
+        scores[scores < min_score] = 0.0
+
+        top = self.top_k(scores, k)
+        hits = []
+        for slot, row in zip(top, self.rows_for(top)):
+            if row is None:
+                continue
+            title, record_type, created_at, _date, _tags, notion_url, json_path, _md = row
+            hits.append(RelatedHit(
+                title=title,
+                record_type=record_type,
+                created_at=created_at,
+                notion_url=notion_url,
+                json_path=json_path,
+                score=round(float(scores[slot]), 4),
+            ))
+        return hits
+
+
+def main():
+    from config import get_config
+
+    parser = argparse.ArgumentParser(description="Suggest past records related to a draft")
+    parser.add_argument("--input", "-i", type=str, help="Draft JSON file (same format as write_record.py)")
+    parser.add_argument("--title", type=str, default="", help="Draft title")
+    parser.add_argument("--body", type=str, default="", help="Draft body")
+    parser.add_argument("--tags", type=str, default="", help="Comma-separated tags")
+    parser.add_argument("-k", type=int, default=5, help="Number of suggestions")
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            draft = json.load(f)
+        title, body, tags = draft.get("title", ""), draft.get("body", ""), draft.get("tags") or []
+    elif args.title or args.body:
+        title, body = args.title, args.body
+        tags = [t.strip() for t in args.tags.split(",") if t.strip()]
+    else:
+        parser.error("Either --input or --title/--body is required")
+        return
+
+    engine = RelatedIndex.for_config(get_config())
+    start = time.perf_counter()
+    hits = engine.related(title, body, tags, k=args.k)
+    elapsed = (time.perf_counter() - start) * 1000
+    engine.index.close()
+
+    print(json.dumps({
+        "related": [asdict(h) for h in hits],
+        "elapsed_ms": round(elapsed, 1),
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
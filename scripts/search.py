@@ -1,16 +1,20 @@
 #!/usr/bin/env python3
 """
 Search Notion Brain.
-Usage: 
+Usage:
     python search.py "query string"
     python search.py --mode trace "topic"
     python search.py --mode recall "query"
+    python search.py --local "query"     # offline, against records/ index
+    python search.py --mode recall --since 7d
+    python search.py --mode recall --between 2026-09-01 2026-09-30 "query"
+    python search.py --type backlog --tag perf          # tag filters (AND; --any-tag for OR)
+    python search.py --facets --since 30d               # tag counts
 """
 
 import sys
 import argparse
 from datetime import datetime
-from notion_client import Client
 from config import get_config
 
 def format_date(iso_str):
@@ -21,81 +25,224 @@ def format_date(iso_str):
     except:
         return iso_str
 
+def search_notion(config, query):
+    """Search the Notion workspace, most recently edited first."""
+    import http_transport
+
+    client = http_transport.notion_sdk(config.notion_token)
+    response = client.search(
+        query=query,
+        sort={"direction": "descending", "timestamp": "last_edited_time"},
+        page_size=20
+    )
+
+    results = []
+    for page in response.get("results", []):
+        if page["object"] != "page":
+            continue
+
+        title = "Untitled"
+        props = page.get("properties", {})
+        for key, val in props.items():
+            if val["type"] == "title" and val["title"]:
+                title = val["title"][0]["text"]["content"]
+                break
+
+        # Try to get Type
+        record_type = "📄"
+        # Note: In a real database we'd look for the specific 'Type' property
+        # For page-based, we might infer from title emoji if present
+
+        results.append({
+            "title": title,
+            "url": page["url"],
+            "last_edited": page["last_edited_time"]
+        })
+    return results
+
+def search_local(config, query, profile=None, limit=20, flt=None):
+    """
+    Search the local records index, best match first.
+    flt: optional RecordFilter (time window, type, tags) restricting results.
+    Without a query, lists the filtered records newest first.
+    """
+    from local_index import LocalIndex
+
+    index = LocalIndex.for_config(config)
+    try:
+        if not query:
+            hits = index.list_records(flt, limit=limit)
+        else:
+            try:
+                from ranking import BM25Index
+            except ImportError:
+                # NumPy not installed: fall back to FTS5's built-in bm25()
+                hits = index.search(query, limit=limit if flt is None else 10 * limit)
+                if flt is not None:
+                    allowed = {h.json_path for h in index.list_records(flt)}
+                    hits = [h for h in hits if h.json_path in allowed][:limit]
+            else:
+                allowed = index.filter_rowids(flt) if flt is not None else None
+                hits = BM25Index(index).search(query, profile, limit=limit, allowed_rowids=allowed)
+    finally:
+        index.close()
+    return [_local_result(hit) for hit in hits]
+
+def _local_result(hit):
+    return {
+        "title": hit.title,
+        "url": hit.notion_url or hit.md_path,
+        "last_edited": hit.date or hit.created_at
+    }
+
+def filter_summary(config, flt, facets=False):
+    """Per-type counts (and optionally top tags) for a filter, from the local index."""
+    from local_index import LocalIndex
+
+    index = LocalIndex.for_config(config)
+    try:
+        counts = index.type_counts(flt)
+        tags = index.tag_facets(flt) if facets else {}
+        return counts, tags
+    finally:
+        index.close()
+
+def parse_filter(args):
+    """RecordFilter from --since/--between/--type/--tag/--any-tag, or None."""
+    from local_index import RecordFilter, parse_since, day_range
+
+    flt = RecordFilter(record_type=args.type)
+    if args.between:
+        flt.start_ts, flt.end_ts = day_range(*args.between)
+    elif args.since:
+        flt.start_ts = parse_since(args.since)
+    if args.any_tag:
+        flt.tags, flt.match_all_tags = args.any_tag, False
+    elif args.tag:
+        flt.tags = args.tag
+    return flt if flt.active else None
+
+def describe_filter(args):
+    """Short human label for the active filters."""
+    parts = []
+    if args.since:
+        parts.append(f"since {args.since}")
+    elif args.between:
+        parts.append(f"{args.between[0]} → {args.between[1]}")
+    if args.type:
+        parts.append(f"type {args.type}")
+    if args.any_tag:
+        parts.append(" | ".join(f"#{t}" for t in args.any_tag))
+    elif args.tag:
+        parts.append(" & ".join(f"#{t}" for t in args.tag))
+    return ", ".join(parts)
+
+def build_profile(args):
+    """Ranking profile for the mode, with --half-life/--boost overrides. None without NumPy."""
+    try:
+        from ranking import PROFILES
+    except ImportError:
+        return None
+    from dataclasses import replace
+
+    profile = replace(PROFILES[args.mode], type_boosts=dict(PROFILES[args.mode].type_boosts))
+    if args.half_life is not None:
+        profile.half_life_days = args.half_life or None
+    for item in args.boost:
+        record_type, _, factor = item.partition("=")
+        profile.type_boosts[record_type.strip()] = float(factor)
+    return profile
+
 def main():
     parser = argparse.ArgumentParser(description="Search Notion Brain")
-    parser.add_argument("query", help="Search query")
+    parser.add_argument("query", nargs="?", default="", help="Search query (optional with --since/--between)")
     parser.add_argument("--mode", choices=["search", "trace", "recall"], default="search", help="Output mode")
-    
+    parser.add_argument("--local", action="store_true", help="Search the local records index instead of Notion (works offline)")
+    parser.add_argument("--half-life", type=float, help="Local ranking: recency half-life in days (0 disables decay)")
+    parser.add_argument("--boost", action="append", default=[], metavar="TYPE=FACTOR", help="Local ranking: boost a record type, e.g. decision=1.5")
+    parser.add_argument("--since", type=str, help="Only records from a relative window, e.g. 7d, 2w, 12h (implies --local)")
+    parser.add_argument("--between", nargs=2, metavar=("START", "END"), help="Only records between two YYYY-MM-DD days, inclusive (implies --local)")
+    parser.add_argument("--type", choices=["decision", "worklog", "idea", "backlog"], help="Only records of this type (implies --local)")
+    parser.add_argument("--tag", action="append", default=[], help="Only records with this tag; repeat to require all (implies --local)")
+    parser.add_argument("--any-tag", action="append", default=[], help="Only records with any of these tags (implies --local)")
+    parser.add_argument("--facets", action="store_true", help="Show tag counts for the matching records (implies --local)")
+    parser.add_argument("--limit", type=int, default=20, help="Max results for local search")
+
     args = parser.parse_args()
-    
+
+    try:
+        flt = parse_filter(args)
+    except ValueError as e:
+        parser.error(str(e))
+    if flt or args.facets:
+        args.local = True
+    if not args.query and not flt and not args.facets:
+        parser.error("A query is required unless filters (--since/--between/--type/--tag) or --facets are given")
+
     config = get_config()
-    client = Client(auth=config.notion_token)
-    
-    print(f"[{args.mode.upper()}] Searching for: '{args.query}'...\n")
-    
+
+    source = "LOCAL" if args.local else "NOTION"
+    label = args.query
+    if flt:
+        span = describe_filter(args)
+        label = f"{args.query} ({span})" if args.query else span
+    print(f"[{args.mode.upper()}] Searching {source} for: '{label}'...\n")
+
     try:
-        response = client.search(
-            query=args.query,
-            sort={"direction": "descending", "timestamp": "last_edited_time"},
-            page_size=20
-        )
-        
-        results = []
-        for page in response.get("results", []):
-            if page["object"] != "page":
-                continue
-                
-            title = "Untitled"
-            props = page.get("properties", {})
-            for key, val in props.items():
-                if val["type"] == "title" and val["title"]:
-                    title = val["title"][0]["text"]["content"]
-                    break
-            
-            # Try to get Type
-            record_type = "📄"
-            # Note: In a real database we'd look for the specific 'Type' property
-            # For page-based, we might infer from title emoji if present
-            
-            results.append({
-                "title": title,
-                "url": page["url"],
-                "last_edited": page["last_edited_time"]
-            })
+        if args.facets:
+            counts, tags = filter_summary(config, flt, facets=True)
+            print(f"📦 {sum(counts.values())} records")
+            print("🏷️  Tags: " + (", ".join(f"{t} ({n})" for t, n in tags.items()) or "none"))
+            if not args.query and not flt:
+                return
+            print("")
+
+        if args.local:
+            results = search_local(config, args.query, profile=build_profile(args), limit=args.limit, flt=flt)
+        else:
+            results = search_notion(config, args.query)
 
         if not results:
             print("No results found.")
             return
 
         if args.mode == "trace":
-            print(f"🔍 Timeline for '{args.query}':\n")
+            print(f"🔍 Timeline for '{label}':\n")
             # Sort by date ascending for trace
             results.sort(key=lambda x: x["last_edited"])
-            
+
             for res in results:
                 date_str = format_date(res['last_edited'])
                 print(f"📅 {date_str} | {res['title']}")
                 print(f"   🔗 {res['url']}")
                 print("")
-                
+
         elif args.mode == "recall":
-            print(f"📊 Summary for '{args.query}':\n")
+            print(f"📊 Summary for '{label}':\n")
+            if flt:
+                counts, _ = filter_summary(config, flt)
+                breakdown = ", ".join(f"{t}: {n}" for t, n in counts.items())
+                print(f"Filter matches {sum(counts.values())} records ({breakdown}).")
             print(f"Found {len(results)} related records.")
             print("## Recent Activity")
-            
-            for res in results[:5]: # Show top 5
+
+            # Filtered recall lists every match; text recall shows the top 5
+            shown = results if flt and not args.query else results[:5]
+            for res in shown:
                 date_str = format_date(res['last_edited'])
                 print(f"- {date_str}: {res['title']}")
-                
+
         else: # Normal search
             for i, res in enumerate(results, 1):
                 date_str = format_date(res['last_edited'])
                 print(f"{i}. {res['title']}")
                 print(f"   {date_str} | {res['url']}")
                 print("")
-            
+
     except Exception as e:
         print(f"Error: {e}")
+        if not args.local:
+            print("Hint: use --local to search the offline records index.")
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Keeponfirst Local Brain - Seen URLs
+Answers "has this source_url been captured before?" without a network
+fetch, so write_record can reuse the stored og_* metadata instead of
+calling url_parser.parse_url again.
+
+URLs are kept (normalized) in the records_urls table of the local index.
+A Bloom filter in front of it (.agentic/seen_urls.bloom) rejects new URLs
+with a few hash probes; only probable hits touch SQLite. The filter file
+records the highest records_urls sequence number it covers and is topped up
+incrementally (deleted records just become rare false positives); it is
+rebuilt when the index is rebuilt or migrated, or when the table holds rows
+the filter cannot account for.
+
+Usage:
+    python seen_urls.py "https://example.com/article"
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Optional
+
+from local_index import LocalIndex, normalize_url
+
+BLOOM_FILENAME = ".agentic/seen_urls.bloom"
+BLOOM_BITS_PER_URL = 10  # ~1% false positives with 7 probes
+BLOOM_HASHES = 7
+BLOOM_MIN_BITS = 1 << 16
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on blake2b)."""
+
+    def __init__(self, n_bits: int, n_hashes: int = BLOOM_HASHES, bits: Optional[bytearray] = None):
+        self.n_bits = n_bits
+        self.n_hashes = n_hashes
+        self.bits = bits if bits is not None else bytearray((n_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, n_items: int) -> "BloomFilter":
+        n_bits = BLOOM_MIN_BITS
+        while n_bits < n_items * BLOOM_BITS_PER_URL:
+            n_bits <<= 1
+        return cls(n_bits)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.n_hashes):
+            yield (h1 + i * h2) % self.n_bits
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class SeenUrls:
+    """Bloom-fronted lookup of previously captured URLs in a LocalIndex."""
+
+    def __init__(self, index: LocalIndex):
+        self.index = index
+        self.bloom_path = index.records_dir.parent / BLOOM_FILENAME
+        self._bloom: Optional[BloomFilter] = None
+
+    @classmethod
+    def for_config(cls, config) -> "SeenUrls":
+        return cls(LocalIndex.for_config(config))
+
+    def close(self) -> None:
+        self.index.close()
+
+    @property
+    def bloom(self) -> BloomFilter:
+        """The filter, loaded from disk and brought up to date with the index."""
+        if self._bloom is None:
+            self.index.ensure_built()
+            # Generation of the index: a rebuild or schema migration starts the sequence over
+            index_id = f'{self.index._get_meta("schemaVersion")}/{self.index._get_meta("createdAt")}'
+            header, bloom = self._load()
+            if bloom is None or header.get("index") != index_id or "seq" not in header:
+                header, bloom = {"seq": 0, "urls": 0, "rows": 0}, None
+            (rows,) = self.index.conn.execute("SELECT COUNT(*) FROM records_urls").fetchone()
+            new_urls = self.index.conn.execute(
+                "SELECT url, seq FROM records_urls WHERE seq > ?", (header["seq"],)
+            ).fetchall()
+            total = header["urls"] + len(new_urls)
+            # Deletes only leave false positives, but rows the filter cannot account for mean
+            # the sequence was reset under it
+            stale = rows > header["rows"] + len(new_urls)
+            if bloom is None or stale or total * BLOOM_BITS_PER_URL > bloom.n_bits:
+                # Missing, from an older index, out of step or too full: rebuild at the right size
+                new_urls = self.index.conn.execute("SELECT url, seq FROM records_urls").fetchall()
+                total = len(new_urls)
+                bloom = BloomFilter.for_capacity(total)
+            if new_urls or not self.bloom_path.exists():
+                for url, _ in new_urls:
+                    bloom.add(url)
+                seq = max([header["seq"], *(n for _, n in new_urls)])
+                self._save(bloom, {"index": index_id, "seq": seq, "urls": total, "rows": rows})
+            self._bloom = bloom
+        return self._bloom
+
+    def invalidate(self) -> None:
+        """Forget the in-memory filter; the next lookup reloads and tops it up."""
+        self._bloom = None
+
+    def _load(self) -> tuple[dict, Optional[BloomFilter]]:
+        try:
+            with open(self.bloom_path, "rb") as f:
+                header = json.loads(f.readline())
+                return header, BloomFilter(header["bits"], header["hashes"], bytearray(f.read()))
+        except (OSError, ValueError, KeyError):
+            return {}, None
+
+    def _save(self, bloom: BloomFilter, header: dict) -> None:
+        self.bloom_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.bloom_path.with_name(f"{self.bloom_path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            header = {**header, "bits": bloom.n_bits, "hashes": bloom.n_hashes}
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            f.write(bloom.bits)
+        os.replace(tmp, self.bloom_path)
+
+    def lookup(self, url: str) -> Optional[tuple[str, dict]]:
+        """(json_path, record) of the newest capture of url, or None if it was never captured."""
+        key = normalize_url(url)
+        if not key or key not in self.bloom:
+            return None
+        rows = self.index.conn.execute(
+            "SELECT f.json_path FROM records_urls u JOIN records_files f ON f.fts_rowid = u.fts_rowid "
+            "WHERE u.url = ? ORDER BY f.record_ts DESC",
+            (key,),
+        ).fetchall()
+        for (json_path,) in rows:
+            loaded = self.index.load(json_path)
+            if loaded is not None:
+                return json_path, loaded[0]
+        return None
+
+
+def main():
+    from config import get_config
+
+    if len(sys.argv) != 2:
+        print(__doc__.strip().splitlines()[-1].strip())
+        sys.exit(1)
+
+    seen = SeenUrls.for_config(get_config())
+    try:
+        _ = seen.bloom
+        start = time.perf_counter()
+        hit = seen.lookup(sys.argv[1])
+        elapsed_us = (time.perf_counter() - start) * 1e6
+    finally:
+        seen.close()
+
+    print(json.dumps({
+        "url": normalize_url(sys.argv[1]),
+        "seen": hit is not None,
+        "json_path": hit[0] if hit else None,
+        "og_title": hit[1].get("og_title") if hit else None,
+        "elapsed_us": round(elapsed_us, 1),
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+"""
+Keeponfirst Local Brain - Segment Store
+Optional record storage backend (RECORD_STORAGE=segments): each capture is
+appended as one JSON line to a size-bounded segment file under
+records/segments/ instead of creating a .json + .md file pair.
+
+An offset index (records/segments/offsets.sqlite) maps every record id to
+(segment, offset, length), and reads slice the segment through mmap. Every
+line carries a store-wide sequence number, so the segments are the source
+of truth: the offset index can always be rebuilt by scanning them
+(--reindex), the highest sequence number of each id winning. Deletions
+append a tombstone line. Markdown is rendered on demand by markdown_view.py.
+
+Compaction (--compact) rewrites sealed segments without superseded or
+deleted versions. Lines are copied without holding the writer lock; the
+lock is only taken to seal the active segment and to swap the new
+segments and offsets in, so captures are never blocked for long.
+
+Usage:
+    python segment_store.py --stats
+    python segment_store.py --delete <record_id>
+    python segment_store.py --compact [--full] [--min-dead 0.25]
+    python segment_store.py --reindex
+"""
+
+import argparse
+import json
+import math
+import mmap
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+# fcntl is POSIX-only; without it appends are not serialized across processes
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SEGMENTS_DIRNAME = "segments"
+OFFSETS_FILENAME = "offsets.sqlite"
+LOCK_FILENAME = ".lock"
+# Held for a whole compaction run, so only one runs at a time
+COMPACT_LOCK_FILENAME = ".compact.lock"
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+URI_PREFIX = "segment:"
+OFFSETS_VERSION = 2
+# Sealed segments with at least this share of dead bytes are compacted
+COMPACT_MIN_DEAD_RATIO = 0.25
+
+
+def segment_name(number: int) -> str:
+    return f"seg-{number:06d}.jsonl"
+
+
+def record_uri(record_id: str) -> str:
+    """Stable locator for a segment record (stored as json_path in the local index)."""
+    return f"{URI_PREFIX}{record_id}"
+
+
+def parse_uri(value: str) -> Optional[str]:
+    """Record id of a segment URI, or None for a regular file path."""
+    value = str(value)
+    return value[len(URI_PREFIX):] if value.startswith(URI_PREFIX) else None
+
+
+def _close_synced(file) -> None:
+    """Flush, fsync and close a file written by compaction."""
+    file.flush()
+    os.fsync(file.fileno())
+    file.close()
+
+
+def _fsync_dir(path: Path) -> None:
+    """Make renames in a directory durable (POSIX; Windows cannot open directories)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _encode(entry: dict) -> bytes:
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+@dataclass
+class RecordRef:
+    """Where the current version of a record lives."""
+    record_id: str
+    segment: int
+    offset: int
+    length: int
+    seq: int = 0
+
+    @property
+    def uri(self) -> str:
+        return record_uri(self.record_id)
+
+    @property
+    def watermark(self) -> tuple[int, int, int]:
+        """
+        Change watermark for the local index (plays the role of a file's mtime/size/inode).
+        Based on the version, not the location, so compaction does not force a re-index.
+        """
+        return (self.seq, self.length, 0)
+
+
+@dataclass
+class CompactionStats:
+    """Outcome of one compaction run."""
+    segments_compacted: int = 0
+    segments_written: int = 0
+    records_kept: int = 0
+    tombstones_dropped: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    elapsed_ms: float = 0.0
+    # Another compaction was already running
+    skipped: bool = False
+
+    @property
+    def reclaimed_bytes(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+
+class SegmentStore:
+    """Append-only JSONL segments plus an offset index, read through mmap."""
+
+    def __init__(self, records_dir: Path, max_segment_bytes: int = SEGMENT_MAX_BYTES):
+        self.records_dir = Path(records_dir)
+        self.dir = self.records_dir / SEGMENTS_DIRNAME
+        self.max_segment_bytes = max_segment_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._maps: dict[int, mmap.mmap] = {}
+
+    @classmethod
+    def for_config(cls, config) -> "SegmentStore":
+        return cls(config.records_dir)
+
+    def exists(self) -> bool:
+        """True once anything has been written to the store."""
+        return (self.dir / OFFSETS_FILENAME).exists()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.dir / OFFSETS_FILENAME), timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != OFFSETS_VERSION:
+                self._create_schema()
+        return self._conn
+
+    def _create_schema(self) -> None:
+        conn = self._conn
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS offsets")
+            conn.execute("DROP TABLE IF EXISTS store_meta")
+            conn.execute(
+                """CREATE TABLE offsets (
+                record_id TEXT PRIMARY KEY,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                seq INTEGER NOT NULL
+             ) WITHOUT ROWID"""
+            )
+            conn.execute("CREATE INDEX offsets_segment ON offsets (segment, offset)")
+            conn.execute("CREATE TABLE store_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute(f"PRAGMA user_version = {OFFSETS_VERSION}")
+        if self.segment_numbers():
+            # Index written by an older version: rebuild it from the segments
+            self.reindex()
+
+    def close(self) -> None:
+        for mm in self._maps.values():
+            mm.close()
+        self._maps.clear()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @contextmanager
+    def _lock(self):
+        """Exclusive writer lock shared by every process using this store."""
+        # Open (and if needed migrate) the offset index first: a migration
+        # reindexes, which takes this lock itself
+        self.conn
+        with open(self.dir / LOCK_FILENAME, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _compaction_lock(self):
+        """Yield True if this process may compact (no other compaction is running), else False."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.dir / COMPACT_LOCK_FILENAME, "a") as lock_file:
+            if fcntl is None:
+                yield True
+                return
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ── Segments ──────────────────────────────────────────────────────────────
+
+    def segment_path(self, number: int) -> Path:
+        return self.dir / segment_name(number)
+
+    def segment_numbers(self) -> list[int]:
+        if not self.dir.is_dir():
+            return []
+        return sorted(int(p.name[4:10]) for p in self.dir.glob("seg-*.jsonl"))
+
+    def _active_segment(self, incoming: int) -> int:
+        """Segment the next line goes to; rolls over once the current one is full."""
+        numbers = self.segment_numbers()
+        if not numbers:
+            return 1
+        last = numbers[-1]
+        size = self.segment_path(last).stat().st_size
+        if size and size + incoming > self.max_segment_bytes:
+            return last + 1
+        return last
+
+    def _append_line(self, payload: bytes) -> tuple[int, int]:
+        """Append one line to the active segment (caller holds the lock). Returns (segment, offset)."""
+        segment = self._active_segment(len(payload) + 1)
+        with open(self.segment_path(segment), "a+b") as f:
+            offset = f.seek(0, os.SEEK_END)
+            if offset:
+                # Never continue a line torn by a crashed writer
+                f.seek(offset - 1)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+                    offset += 1
+            f.write(payload + b"\n")
+        return segment, offset
+
+    def scan(self, segment: int) -> Iterator[tuple[int, int, dict]]:
+        """(offset, length, entry) for every readable line of a segment, in order."""
+        offset = 0
+        with open(self.segment_path(segment), "rb") as f:
+            for line in f:
+                length = len(line.rstrip(b"\n"))
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    entry = None
+                if isinstance(entry, dict) and entry.get("id"):
+                    yield offset, length, entry
+                offset += len(line)
+
+    # ── Records ───────────────────────────────────────────────────────────────
+
+    def _next_seq(self) -> int:
+        """Next store-wide sequence number (caller holds the lock)."""
+        row = self.conn.execute("SELECT value FROM store_meta WHERE key = 'seq'").fetchone()
+        return (row[0] if row else 0) + 1
+
+    def _set_seq(self, seq: int) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('seq', ?)", (seq,))
+
+    def append(self, record_id: str, record: dict) -> RecordRef:
+        """Store a new version of a record; it supersedes any earlier one."""
+        return self.append_many([(record_id, record)])[0]
+
+    def append_many(self, items: list[tuple[str, dict]]) -> list[RecordRef]:
+        """Append several (record_id, record) pairs under one lock and one index transaction."""
+        refs = []
+        with self._lock():
+            seq = self._next_seq() - 1
+            for record_id, record in items:
+                seq += 1
+                payload = _encode({"id": record_id, "seq": seq, "record": record})
+                segment, offset = self._append_line(payload)
+                refs.append(RecordRef(record_id, segment, offset, len(payload), seq))
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO offsets (record_id, segment, offset, length, seq) VALUES (?, ?, ?, ?, ?)",
+                    [(r.record_id, r.segment, r.offset, r.length, r.seq) for r in refs],
+                )
+                self._set_seq(seq)
+        return refs
+
+    def delete(self, record_id: str) -> bool:
+        """Append a tombstone for a record. Returns True if it was live."""
+        with self._lock():
+            if self.ref(record_id) is None:
+                return False
+            seq = self._next_seq()
+            payload = _encode({
+                "id": record_id,
+                "seq": seq,
+                "deleted": True,
+                "deleted_at": datetime.now().isoformat(),
+            })
+            self._append_line(payload)
+            with self.conn:
+                self.conn.execute("DELETE FROM offsets WHERE record_id = ?", (record_id,))
+                self._set_seq(seq)
+        return True
+
+    def ref(self, record_id: str) -> Optional[RecordRef]:
+        row = self.conn.execute(
+            "SELECT segment, offset, length, seq FROM offsets WHERE record_id = ?", (record_id,)
+        ).fetchone()
+        return RecordRef(record_id, *row) if row else None
+
+    def refs(self) -> Iterator[RecordRef]:
+        """Every live record, in storage order."""
+        rows = self.conn.execute(
+            "SELECT record_id, segment, offset, length, seq FROM offsets ORDER BY segment, offset"
+        ).fetchall()
+        for row in rows:
+            yield RecordRef(*row)
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM offsets").fetchone()[0]
+
+    def read(self, ref: RecordRef) -> dict:
+        """Record stored at ref, sliced from the memory-mapped segment."""
+        try:
+            return self._read(ref)
+        except FileNotFoundError:
+            # Segment compacted away since ref was looked up: follow the record
+            moved = self.ref(ref.record_id)
+            if moved is None:
+                raise
+            return self._read(moved)
+
+    def _read(self, ref: RecordRef) -> dict:
+        end = ref.offset + ref.length
+        mm = self._maps.get(ref.segment)
+        if mm is None or len(mm) < end:
+            # Segments only grow, so a short mapping just needs refreshing
+            if mm is not None:
+                mm.close()
+            with open(self.segment_path(ref.segment), "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[ref.segment] = mm
+        return json.loads(mm[ref.offset:end])["record"]
+
+    def get(self, record_id: str) -> Optional[dict]:
+        ref = self.ref(record_id)
+        return self.read(ref) if ref else None
+
+    def iter_records(self) -> Iterator[tuple[RecordRef, dict]]:
+        """(ref, record) for every live record, reading segments sequentially."""
+        for ref in self.refs():
+            yield ref, self.read(ref)
+
+    def reindex(self) -> int:
+        """Rebuild the offset index from the segments (the highest seq of each id wins)."""
+        with self._lock():
+            latest: dict[str, tuple] = {}
+            max_seq = 0
+            for segment in self.segment_numbers():
+                for offset, length, entry in self.scan(segment):
+                    seq = entry.get("seq", 0)
+                    max_seq = max(max_seq, seq)
+                    current = latest.get(entry["id"])
+                    if current is None or seq >= current[0]:
+                        latest[entry["id"]] = (seq, segment, offset, length, entry.get("deleted", False))
+            live = [
+                (record_id, segment, offset, length, seq)
+                for record_id, (seq, segment, offset, length, deleted) in latest.items()
+                if not deleted
+            ]
+            with self.conn:
+                self.conn.execute("DELETE FROM offsets")
+                self.conn.executemany(
+                    "INSERT INTO offsets (record_id, segment, offset, length, seq) VALUES (?, ?, ?, ?, ?)",
+                    live,
+                )
+                self._set_seq(max_seq)
+        return len(live)
+
+    # ── Compaction ────────────────────────────────────────────────────────────
+
+    def _live_bytes(self) -> dict[int, int]:
+        rows = self.conn.execute("SELECT segment, SUM(length + 1) FROM offsets GROUP BY segment")
+        return dict(rows)
+
+    def compact(self, min_dead_ratio: float = COMPACT_MIN_DEAD_RATIO, full: bool = False) -> CompactionStats:
+        """
+        Rewrite sealed segments without superseded or deleted versions.
+        full=True seals the active segment first and rewrites every segment,
+        which also drops tombstones (nothing older is left for them to hide).
+        Returns at once with stats.skipped set if another compaction is running.
+        """
+        with self._compaction_lock() as acquired:
+            if not acquired:
+                return CompactionStats(skipped=True)
+            return self._compact(min_dead_ratio, full)
+
+    def _compact(self, min_dead_ratio: float, full: bool) -> CompactionStats:
+        start = time.perf_counter()
+        stats = CompactionStats()
+
+        # 1. Under the lock: pick segments, reserve output numbers, open a fresh active segment
+        with self._lock():
+            numbers = self.segment_numbers()
+            sealed = numbers if full else numbers[:-1]
+            live_bytes = self._live_bytes()
+            sizes = {n: self.segment_path(n).stat().st_size for n in sealed}
+            victims = [
+                n for n in sealed
+                if full or not sizes[n] or 1.0 - live_bytes.get(n, 0) / sizes[n] >= min_dead_ratio
+            ]
+            if not victims:
+                stats.elapsed_ms = (time.perf_counter() - start) * 1000
+                return stats
+            reserved = math.ceil(sum(live_bytes.get(n, 0) for n in victims) / self.max_segment_bytes) + 1
+            first_output = numbers[-1] + 1
+            # Appends continue in a segment numbered after the outputs
+            self.segment_path(first_output + reserved).touch()
+            snapshot = {
+                (segment, offset): record_id
+                for record_id, segment, offset in self.conn.execute(
+                    f"SELECT record_id, segment, offset FROM offsets WHERE segment IN ({', '.join('?' for _ in victims)})",
+                    victims,
+                )
+            }
+
+        # 2. Without the lock: copy live lines (and still-needed tombstones) to temp files
+        # Tombstones must outlive every older version of their record; after a full
+        # rewrite no older version is left anywhere, so they can go too
+        outputs: list[Path] = []
+        moves: list[tuple] = []
+        out = None
+        out_size = 0
+        for segment in victims:
+            with open(self.segment_path(segment), "rb") as src:
+                for offset, length, entry in self.scan(segment):
+                    record_id = snapshot.get((segment, offset))
+                    if record_id is None:
+                        if not entry.get("deleted"):
+                            continue
+                        if full:
+                            stats.tombstones_dropped += 1
+                            continue
+                    if out is None or (out_size + length + 1 > self.max_segment_bytes and len(outputs) < reserved):
+                        if out is not None:
+                            _close_synced(out)
+                        outputs.append(self.dir / f".compact-{first_output + len(outputs):06d}.tmp")
+                        out = open(outputs[-1], "wb")
+                        out_size = 0
+                    src.seek(offset)
+                    out.write(src.read(length) + b"\n")
+                    if record_id is not None:
+                        moves.append((first_output + len(outputs) - 1, out_size, record_id, segment, offset))
+                        stats.records_kept += 1
+                    out_size += length + 1
+        if out is not None:
+            _close_synced(out)
+
+        # 3. Under the lock: publish the new segments and repoint the offsets atomically
+        with self._lock():
+            for i, tmp in enumerate(outputs):
+                os.replace(tmp, self.segment_path(first_output + i))
+            # The outputs must be on disk before the offsets point at them and the originals go
+            _fsync_dir(self.dir)
+            with self.conn:
+                # Records rewritten or deleted meanwhile no longer match and keep their new location
+                self.conn.executemany(
+                    "UPDATE offsets SET segment = ?, offset = ? WHERE record_id = ? AND segment = ? AND offset = ?",
+                    [(new_segment, new_offset, record_id, segment, offset)
+                     for new_segment, new_offset, record_id, segment, offset in moves],
+                )
+            for segment in victims:
+                stats.bytes_before += sizes[segment]
+                self.segment_path(segment).unlink()
+                mm = self._maps.pop(segment, None)
+                if mm is not None:
+                    mm.close()
+
+        stats.segments_compacted = len(victims)
+        stats.segments_written = len(outputs)
+        stats.bytes_after = sum(self.segment_path(first_output + i).stat().st_size for i in range(len(outputs)))
+        stats.elapsed_ms = (time.perf_counter() - start) * 1000
+        return stats
+
+    def stats(self) -> dict:
+        """Segment count, bytes on disk and bytes held by live records."""
+        sizes = {n: self.segment_path(n).stat().st_size for n in self.segment_numbers()}
+        live_records, live_bytes = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length + 1), 0) FROM offsets"
+        ).fetchone()
+        return {
+            "segments": len(sizes),
+            "bytes": sum(sizes.values()),
+            "live_records": live_records,
+            "live_bytes": live_bytes,
+        }
+
+
+def delete_record(store: SegmentStore, record_id: str, config) -> bool:
+    """Tombstone a record, drop it from the local index and mark it deleted in Supabase."""
+    from local_index import LocalIndex
+    from markdown_view import _as_local_record
+    from write_record import _sync_to_supabase
+
+    record = store.get(record_id)
+    if record is None or not store.delete(record_id):
+        return False
+    index = LocalIndex.for_config(config)
+    try:
+        index.remove(record_uri(record_id))
+    finally:
+        index.close()
+    local = _as_local_record(record)
+    _sync_to_supabase(local, local.supabase_id or record_id, config, is_deleted=True)
+    if local.supabase_sync_status == "FAILED":
+        print(f"⚠️  Supabase delete failed: {local.supabase_error}", file=sys.stderr)
+    return True
+
+
+def main():
+    from config import get_config
+    import log_manager
+
+    parser = argparse.ArgumentParser(description="Maintain the record segment store")
+    parser.add_argument("--stats", action="store_true", help="Show segment and record counts")
+    parser.add_argument("--delete", metavar="RECORD_ID", help="Delete a record (appends a tombstone)")
+    parser.add_argument("--compact", action="store_true", help="Rewrite segments without dead versions")
+    parser.add_argument("--full", action="store_true", help="With --compact: rewrite every segment and drop tombstones")
+    parser.add_argument("--min-dead", type=float, default=COMPACT_MIN_DEAD_RATIO, help="With --compact: minimum dead-byte ratio of a segment")
+    parser.add_argument("--reindex", action="store_true", help="Rebuild the offset index from the segments")
+    args = parser.parse_args()
+
+    config = get_config()
+    store = SegmentStore.for_config(config)
+    try:
+        if args.reindex:
+            print(f"✅ Reindexed {store.reindex()} records")
+        if args.delete:
+            if not delete_record(store, parse_uri(args.delete) or args.delete, config):
+                print(f"❌ No record {args.delete}", file=sys.stderr)
+                sys.exit(1)
+            print(f"🗑️  Deleted {args.delete}")
+        if args.compact:
+            stats = store.compact(min_dead_ratio=args.min_dead, full=args.full)
+            if stats.skipped:
+                print("⏭️  Another compaction is running; skipped", file=sys.stderr)
+                sys.exit(1)
+            log_manager.write_central_log(
+                task_intent="compact_segments",
+                event_data={**asdict(stats), "reclaimed_bytes": stats.reclaimed_bytes, "full": args.full},
+                status="SUCCESS",
+            )
+            print(
+                f"✅ Compacted {stats.segments_compacted} segments into {stats.segments_written}: "
+                f"reclaimed {stats.reclaimed_bytes / 1024:.0f} KiB, kept {stats.records_kept} records, "
+                f"dropped {stats.tombstones_dropped} tombstones in {stats.elapsed_ms:.0f}ms"
+            )
+        if args.stats or not (args.reindex or args.delete or args.compact):
+            s = store.stats()
+            print(
+                f"📦 {s['live_records']} records in {s['segments']} segments "
+                f"({s['bytes'] / 1024:.0f} KiB, {s['live_bytes'] / 1024:.0f} KiB live) at {store.dir}"
+            )
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
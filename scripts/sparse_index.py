@@ -0,0 +1,294 @@
+"""
+Keeponfirst Local Brain - Sparse Postings Index
+Shared storage for the NumPy scorers (related records, BM25 ranking).
+
+Each record in the LocalIndex becomes a sparse vector (feature ids ->
+values). Vectors are kept as feature-sorted postings arrays persisted
+under .agentic/<name>/ and memory-mapped on load; records added or edited
+since the last write are held in a small in-memory delta and merged into
+the persisted base once enough accumulate.
+"""
+
+import json
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+from local_index import LocalIndex, parse_timestamp
+
+MERGE_THRESHOLD = 256   # new/edited/deleted records tolerated before the base is rewritten
+_ROW_COLUMNS = ("rowid", "record_type", "title", "final_body", "source_text", "tags", "created_at")
+
+
+def gather_ranges(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Concatenate the index ranges [lo[i], hi[i]) without a Python loop."""
+    lengths = hi - lo
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    starts = np.repeat(lo - (np.cumsum(lengths) - lengths), lengths)
+    return starts + np.arange(total)
+
+
+class PostingsIndex:
+    """
+    Base + delta postings over every record of a LocalIndex.
+    Subclasses define vectorize() and may derive corpus statistics in the
+    _on_merge()/_on_delta() hooks.
+    """
+
+    name = "postings"           # cache directory under .agentic/
+    doc_arrays: tuple = ()      # per-record float32 attributes
+    corpus_arrays: tuple = ()   # derived arrays persisted with the base
+
+    def __init__(self, index: LocalIndex):
+        self.index = index
+        self.cache_dir = index.db_path.parent / self.name
+        self._loaded_at: Optional[str] = None
+        # Base: feature-sorted postings persisted on disk
+        self.keys = np.empty((0, 2), dtype=np.int64)   # (fts_rowid, mtime_ns) per doc slot
+        self.features = np.empty(0, dtype=np.uint32)
+        self.docs = np.empty(0, dtype=np.int32)
+        self.values = np.empty(0, dtype=np.float32)
+        self.doc = {name: np.empty(0, dtype=np.float32) for name in self.doc_arrays}
+        self.alive = np.empty(0, dtype=bool)
+        # Delta: records added/edited since the base was written (doc-ordered)
+        self.delta_keys = np.empty((0, 2), dtype=np.int64)
+        self.delta_features = np.empty(0, dtype=np.uint32)
+        self.delta_docs = np.empty(0, dtype=np.int32)
+        self.delta_values = np.empty(0, dtype=np.float32)
+        self.delta_doc = {name: np.empty(0, dtype=np.float32) for name in self.doc_arrays}
+
+    @classmethod
+    def for_config(cls, config):
+        return cls(LocalIndex.for_config(config))
+
+    # ── Subclass hooks ────────────────────────────────────────────────────────
+
+    def vectorize(self, row: dict) -> tuple[np.ndarray, np.ndarray, dict]:
+        """Return (sorted unique feature ids, values, {doc_array: value}) for one record row."""
+        raise NotImplementedError
+
+    def _on_merge(self) -> None:
+        """Recompute corpus_arrays after the base was rebuilt."""
+
+    def _on_delta(self) -> None:
+        """Recompute delta-dependent values after the delta changed."""
+
+    # ── Combined views (base + delta) ─────────────────────────────────────────
+
+    @property
+    def n_base(self) -> int:
+        return len(self.keys)
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.keys) + len(self.delta_keys)
+
+    def all_doc(self, name: str) -> np.ndarray:
+        return np.concatenate([self.doc[name], self.delta_doc[name]])
+
+    def all_alive(self) -> np.ndarray:
+        return np.concatenate([self.alive, np.ones(len(self.delta_keys), dtype=bool)])
+
+    # ── Persistence ───────────────────────────────────────────────────────────
+
+    def _array_names(self) -> list[str]:
+        names = ["keys", "features", "docs", "values"]
+        names += [f"doc_{name}" for name in self.doc_arrays]
+        names += list(self.corpus_arrays)
+        return names
+
+    def _get_array(self, name: str) -> np.ndarray:
+        if name.startswith("doc_"):
+            return self.doc[name[4:]]
+        return getattr(self, name)
+
+    def _set_array(self, name: str, array: np.ndarray) -> None:
+        if name.startswith("doc_"):
+            self.doc[name[4:]] = array
+        else:
+            setattr(self, name, array)
+
+    def _load_base(self) -> Optional[str]:
+        """Map the persisted base into memory. Returns the index updatedAt it reflects."""
+        try:
+            with open(self.cache_dir / "current.json", "r", encoding="utf-8") as f:
+                current = json.load(f)
+            arrays = {
+                name: np.load(self.cache_dir / f"{name}.{current['generation']}.npy", mmap_mode="r")
+                for name in self._array_names()
+            }
+        except (OSError, ValueError, KeyError):
+            return None
+        for name, array in arrays.items():
+            self._set_array(name, array)
+        return current.get("updatedAt")
+
+    def _save_base(self, updated_at: Optional[str]) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        generation = f"{time.time_ns()}-{os.getpid()}"
+        for name in self._array_names():
+            np.save(self.cache_dir / f"{name}.{generation}.npy", np.ascontiguousarray(self._get_array(name)))
+        tmp = self.cache_dir / f"current.json.{generation}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"generation": generation, "docs": self.n_base, "updatedAt": updated_at}, f)
+        os.replace(tmp, self.cache_dir / "current.json")
+        # Older generations are unreferenced now (open mmaps stay valid after unlink)
+        for path in self.cache_dir.glob("*.npy"):
+            if not path.name.endswith(f".{generation}.npy"):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    # ── Maintenance ───────────────────────────────────────────────────────────
+
+    def refresh(self) -> None:
+        """Load the persisted base and fold in records changed since it was written."""
+        self.index.ensure_built()
+        updated_at = self.index._get_meta("updatedAt")
+        if self._loaded_at is not None and self._loaded_at == updated_at:
+            return
+        base_at = self._load_base()
+        if base_at is not None and base_at == updated_at:
+            # Nothing changed since the base was written
+            self.alive = np.ones(self.n_base, dtype=bool)
+            self._set_delta(np.empty((0, 2), dtype=np.int64))
+            self._loaded_at = updated_at
+            return
+
+        current = np.array(
+            self.index.conn.execute("SELECT fts_rowid, mtime_ns FROM records_files ORDER BY fts_rowid").fetchall(),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+
+        # Base slots survive only if their (rowid, mtime) is still indexed
+        pos = np.minimum(np.searchsorted(current[:, 0], self.keys[:, 0]), max(len(current) - 1, 0))
+        if len(current):
+            self.alive = (current[pos, 0] == self.keys[:, 0]) & (current[pos, 1] == self.keys[:, 1])
+        else:
+            self.alive = np.zeros(self.n_base, dtype=bool)
+        seen = np.zeros(len(current), dtype=bool)
+        seen[pos[self.alive]] = True
+        pending = current[~seen]
+        dead = int((~self.alive).sum())
+
+        if len(pending) + dead > MERGE_THRESHOLD or (self.n_base == 0 and len(pending)):
+            self._merge(pending)
+            self._save_base(updated_at)
+        else:
+            self._set_delta(pending)
+        self._loaded_at = updated_at
+
+    def _fetch_rows(self, rowids: list[int]) -> dict[int, dict]:
+        rows = {}
+        for i in range(0, len(rowids), 500):
+            chunk = rowids[i:i + 500]
+            marks = ",".join("?" for _ in chunk)
+            for values in self.index.conn.execute(
+                f"SELECT {', '.join(_ROW_COLUMNS)} FROM records_fts WHERE rowid IN ({marks})", chunk
+            ):
+                row = dict(zip(_ROW_COLUMNS, values))
+                row["tags"] = [t for t in (row["tags"] or "").split(",") if t]
+                row["created_ts"] = parse_timestamp(row["created_at"])
+                rows[row["rowid"]] = row
+        return rows
+
+    def _vectorize_rows(self, rowids: np.ndarray, first_slot: int):
+        """Vectorize records; returns (features, docs, values, {doc_array: values})."""
+        ids = [int(r) for r in rowids]
+        rows = self._fetch_rows(ids)
+        empty = {"rowid": 0, "record_type": "", "title": "", "final_body": "", "source_text": "",
+                 "tags": [], "created_at": "", "created_ts": 0.0}
+        vectors = [self.vectorize(rows.get(r, empty)) for r in ids]
+        attrs = {
+            name: np.array([v[2].get(name, 0.0) for v in vectors], dtype=np.float32)
+            for name in self.doc_arrays
+        }
+        if not vectors:
+            return (np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.int32),
+                    np.empty(0, dtype=np.float32), attrs)
+        lengths = np.array([len(v[0]) for v in vectors])
+        features = np.concatenate([v[0] for v in vectors]).astype(np.uint32)
+        values = np.concatenate([v[1] for v in vectors]).astype(np.float32)
+        docs = np.repeat(np.arange(first_slot, first_slot + len(vectors), dtype=np.int32), lengths)
+        return features, docs, values, attrs
+
+    def _set_delta(self, pending: np.ndarray) -> None:
+        self.delta_keys = pending
+        (self.delta_features, self.delta_docs,
+         self.delta_values, self.delta_doc) = self._vectorize_rows(pending[:, 0], self.n_base)
+        self._on_delta()
+
+    def _merge(self, pending: np.ndarray) -> None:
+        """Rewrite the base from its live postings plus the pending records."""
+        keep = self.alive[self.docs] if len(self.docs) else np.empty(0, dtype=bool)
+        remap = np.cumsum(self.alive) - 1
+        n_live = int(self.alive.sum())
+        new_features, new_docs, new_values, new_attrs = self._vectorize_rows(pending[:, 0], n_live)
+
+        features = np.concatenate([np.asarray(self.features)[keep], new_features])
+        docs = np.concatenate([remap[np.asarray(self.docs)[keep]].astype(np.int32), new_docs])
+        values = np.concatenate([np.asarray(self.values)[keep], new_values])
+        order = np.argsort(features, kind="stable")
+        self.features, self.docs, self.values = features[order], docs[order], values[order]
+        self.doc = {
+            name: np.concatenate([np.asarray(self.doc[name])[self.alive], new_attrs[name]])
+            for name in self.doc_arrays
+        }
+        self.keys = np.concatenate([np.asarray(self.keys)[self.alive], pending]).astype(np.int64)
+        self.alive = np.ones(self.n_base, dtype=bool)
+        self._on_merge()
+        self._set_delta(np.empty((0, 2), dtype=np.int64))
+
+    # ── Query ─────────────────────────────────────────────────────────────────
+
+    def lookup(self, qf: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Postings of the sorted, unique query features qf across base and delta.
+        Returns (doc slots, values, position in qf) for every posting.
+        """
+        lo = np.searchsorted(self.features, qf, side="left")
+        hi = np.searchsorted(self.features, qf, side="right")
+        idx = gather_ranges(lo, hi)
+        slots = [np.asarray(self.docs[idx])]
+        values = [np.asarray(self.values[idx])]
+        terms = [np.repeat(np.arange(len(qf)), hi - lo)]
+
+        if len(self.delta_features) and len(qf):
+            pos = np.minimum(np.searchsorted(qf, self.delta_features), len(qf) - 1)
+            match = qf[pos] == self.delta_features
+            slots.append(self.delta_docs[match])
+            values.append(self.delta_values[match])
+            terms.append(pos[match])
+        return np.concatenate(slots), np.concatenate(values), np.concatenate(terms)
+
+    def top_k(self, scores: np.ndarray, k: int) -> np.ndarray:
+        """Slots of the k best positive scores, best first (partial selection, no full sort)."""
+        candidates = np.flatnonzero(scores > 0)
+        if not len(candidates) or k <= 0:
+            return candidates[:0]
+        if len(candidates) > k:
+            part = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[part]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def rows_for(self, slots: np.ndarray) -> list[Optional[tuple]]:
+        """(title, record_type, created_at, date, tags, notion_url, json_path, md_path) per slot."""
+        all_keys = np.concatenate([self.keys, self.delta_keys])
+        rowids = [int(all_keys[s, 0]) for s in slots]
+        if not rowids:
+            return []
+        marks = ",".join("?" for _ in rowids)
+        rows = {
+            row[0]: row[1:]
+            for row in self.index.conn.execute(
+                f"SELECT rowid, title, record_type, created_at, date, tags, notion_url, json_path, md_path "
+                f"FROM records_fts WHERE rowid IN ({marks})",
+                rowids,
+            )
+        }
+        return [rows.get(r) for r in rowids]
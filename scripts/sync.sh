@@ -5,8 +5,23 @@ SKILL_DIR="skills/keeponfirst-local-brain-skill/scripts"
 SCRIPT_DIR="scripts"
 cp "$SCRIPT_DIR/config.py" "$SKILL_DIR/"
 cp "$SCRIPT_DIR/notion_api.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/notion_blocks.py" "$SKILL_DIR/"
 cp "$SCRIPT_DIR/write_record.py" "$SKILL_DIR/"
 cp "$SCRIPT_DIR/log_manager.py" "$SKILL_DIR/"
 cp "$SCRIPT_DIR/search.py" "$SKILL_DIR/"
 cp "$SCRIPT_DIR/url_parser.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/local_index.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/sparse_index.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/related.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/ranking.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/segment_store.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/markdown_view.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/seen_urls.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/migrate_layout.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/capture_client.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/capture_daemon.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/log_index.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/notion_outbox.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/rate_limit.py" "$SKILL_DIR/"
+cp "$SCRIPT_DIR/http_transport.py" "$SKILL_DIR/"
 echo "✅ Scripts synced to skill directory"
@@ -20,6 +20,8 @@ from urllib.parse import urlparse
 import requests
 from bs4 import BeautifulSoup
 
+import http_transport
+
 # Optional: use requests with a simple timeout and user-agent to avoid blocks
 DEFAULT_HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; KOF-LocalBrain/1.0; +https://github.com/keeponfirst/keeponfirst-local-brain)",
@@ -91,10 +93,10 @@ def parse_url(url: str) -> URLMetadata:
     platform = _platform_from_url(source_url)
 
     try:
-        resp = requests.get(
+        resp = http_transport.session().get(
             source_url,
             headers=DEFAULT_HEADERS,
-            timeout=REQUEST_TIMEOUT,
+            timeout=http_transport.timeout(REQUEST_TIMEOUT),
             allow_redirects=True,
         )
         resp.raise_for_status()
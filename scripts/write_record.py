@@ -7,29 +7,35 @@ Usage:
     python write_record.py --input record.json
     python write_record.py --dry-run --input record.json
     echo '{"type": "idea", ...}' | python write_record.py --stdin
+    python write_record.py --jsonl --input notes.jsonl --workers 4 > results.jsonl
 """
 
 import argparse
 import json
 import os
 import sys
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from itertools import islice
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
 from dataclasses import dataclass, asdict
 
-import requests as _req
-
 from config import get_config, PROJECT_ROOT
-from notion_api import NotionClient, RecordData, NotionPage
+from local_index import LocalIndex, capture_hash, _watermark
+from segment_store import SegmentStore, parse_uri
+from seen_urls import SeenUrls
 import log_manager
 import uuid as _uuid
 
-# Optional: URL metadata extraction (optional import to avoid hard dep at import time)
-try:
-    from url_parser import parse_url
-except ImportError:
-    parse_url = None
+if TYPE_CHECKING:
+    from notion_api import NotionClient
+
+# write_records: concurrent Notion/Supabase requests and records saved per local batch
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_SIZE = 50
+
 
 
 @dataclass
@@ -56,6 +62,17 @@ class LocalRecord:
     supabase_id: Optional[str] = None
     supabase_sync_status: str = "PENDING"  # PENDING | SUCCESS | FAILED | SKIPPED
     supabase_error: Optional[str] = None
+    # Dedupe key of the submitted capture (before URL enrichment)
+    content_hash: Optional[str] = None
+
+
+def _url_parser():
+    """url_parser module, imported on first use (it pulls in requests and bs4); None if unavailable."""
+    try:
+        import url_parser
+    except ImportError:
+        return None
+    return url_parser
 
 
 def _is_single_url(text: str) -> bool:
@@ -94,45 +111,154 @@ def slugify(text: str, max_length: int = 50) -> str:
     return slug[:max_length]
 
 
+_CROCKFORD32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_ulid_lock = threading.Lock()
+_ulid_last = (0, 0)  # (ms, randomness) of the previous ULID in this process
+
+
+def new_ulid() -> tuple[str, int]:
+    """
+    A ULID (48-bit ms timestamp + 80 random bits, Crockford base32) and its ms.
+    Monotonic within a process: same-millisecond ULIDs increment the random part.
+    """
+    global _ulid_last
+    with _ulid_lock:
+        ms = time.time_ns() // 1_000_000
+        last_ms, last_rand = _ulid_last
+        if ms <= last_ms:
+            ms, rand = last_ms, last_rand + 1
+        else:
+            rand = int.from_bytes(os.urandom(10), "big")
+        _ulid_last = (ms, rand)
+    value = (ms << 80) | (rand & ((1 << 80) - 1))
+    return "".join(_CROCKFORD32[(value >> shift) & 31] for shift in range(125, -1, -5)), ms
+
+
 def generate_filename(record_type: str, title: str) -> str:
-    """Generate filename: timestamp_type_slug"""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    """
+    Generate filename: timestamp_ULID_type_slug.
+    The ULID makes names unique even for same-title captures in the same
+    second from parallel processes; the timestamp keeps them readable.
+    """
+    ulid, ms = new_ulid()
+    timestamp = datetime.fromtimestamp(ms / 1000).strftime("%Y%m%d_%H%M%S")
     slug = slugify(title)
-    return f"{timestamp}_{record_type}_{slug}"
+    return f"{timestamp}_{ulid}_{record_type}_{slug}"
+
+
+def write_atomic(path: Path, content: str) -> None:
+    """Write a file via a temp file in the same directory and an atomic rename."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
 
 
 def save_local(record: LocalRecord, config) -> tuple[Path, Path]:
     """Save record to local storage as markdown and JSON."""
+    return save_local_many([record], config)[0]
+
+
+def save_local_many(records: list[LocalRecord], config, index: Optional[LocalIndex] = None) -> list[tuple]:
+    """
+    Save several records in bulk: files (or one segment-store append) for each,
+    then a single local index transaction. Returns (md_path, json_path) per record.
+    """
+    if config.record_storage == "segments":
+        # One append per record, no per-record files; Markdown is rendered on
+        # demand: markdown_view.py --show <uri>
+        store = SegmentStore.for_config(config)
+        try:
+            refs = store.append_many([(r.supabase_id or str(_uuid.uuid4()), asdict(r)) for r in records])
+        finally:
+            store.close()
+        _index_records([(ref.uri, asdict(r), ref.watermark) for r, ref in zip(records, refs)], config, index)
+        return [(ref.uri, ref.uri) for ref in refs]
+
     config.ensure_dirs()
-    
-    # Determine subdirectory
-    type_dirs = {
-        "decision": "decisions",
-        "worklog": "worklogs",
-        "idea": "ideas",
-        "backlog": "backlogs"
-    }
-    subdir = type_dirs.get(record.type, "other")
-    base_dir = config.records_dir / subdir
+    paths = [_write_record_files(record, config) for record in records]
+    rows = [(json_path, asdict(r), _watermark(json_path.stat())) for r, (_, json_path) in zip(records, paths)]
+    # Keep the local search index current in the same call
+    _index_records(rows, config, index)
+    return paths
+
+
+def _write_record_files(record: LocalRecord, config) -> tuple[Path, Path]:
+    """Write the .md (eager mode) and .json of one record."""
+    # Determine subdirectory (records/<type>/ or records/<type>/YYYY/MM/)
+    base_dir = config.record_dir(record.type, datetime.fromisoformat(record.created_at))
     base_dir.mkdir(parents=True, exist_ok=True)
     
     # Generate filename
     base_name = generate_filename(record.type, record.title)
     
-    # Save JSON
-    json_path = base_dir / f"{base_name}.json"
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(asdict(record), f, ensure_ascii=False, indent=2)
-    
-    # Save Markdown (human readable)
+    # Save Markdown first (human readable); lazy mode leaves it to markdown_view.py.
+    # Readers key on the JSON, so once it appears the record is complete.
     md_path = base_dir / f"{base_name}.md"
-    md_content = generate_markdown(record)
-    with open(md_path, "w", encoding="utf-8") as f:
-        f.write(md_content)
+    if config.markdown_mode == "eager":
+        write_atomic(md_path, generate_markdown(record))
     
+    # Save JSON
+    json_path = base_dir / f"{base_name}.json"
+    write_atomic(json_path, json.dumps(asdict(record), ensure_ascii=False, indent=2))
     return md_path, json_path
 
 
+def _index_records(rows: list[tuple], config, index: Optional[LocalIndex] = None) -> None:
+    """Push freshly saved (json_path, record, watermark) rows into the local index. Never fails the capture."""
+    try:
+        owned = index is None
+        if owned:
+            index = LocalIndex.for_config(config)
+        try:
+            index.upsert_many(rows)
+        finally:
+            if owned:
+                index.close()
+    except Exception as e:
+        print(f"⚠️  Local index update failed (run local_index.py --sync): {e}", file=sys.stderr)
+
+
+def update_local(location, changes: dict, config, index: Optional[LocalIndex] = None) -> Optional[dict]:
+    """
+    Apply field changes to a saved record in place and re-index it: the JSON
+    (and an eager .md) is rewritten, or a new segment version appended.
+    Returns the updated record, or None if it no longer exists.
+    """
+    owned = index is None
+    index = index or LocalIndex.for_config(config)
+    try:
+        loaded = index.load(location)
+        if loaded is None:
+            return None
+        record = {**loaded[0], **changes}
+        record_id = parse_uri(location)
+        if record_id is not None:
+            store = SegmentStore.for_config(config)
+            try:
+                ref = store.append(record_id, record)
+            finally:
+                store.close()
+            _index_records([(location, record, ref.watermark)], config, index)
+            return record
+        json_path = Path(location)
+        md_path = json_path.with_suffix(".md")
+        if md_path.exists():
+            from markdown_view import render_markdown
+
+            write_atomic(md_path, render_markdown(record))
+        write_atomic(json_path, json.dumps(record, ensure_ascii=False, indent=2))
+        _index_records([(json_path, record, _watermark(json_path.stat()))], config, index)
+        return record
+    finally:
+        if owned:
+            index.close()
+
+
 def generate_markdown(record: LocalRecord) -> str:
     """Generate human-readable markdown from record."""
     type_emoji = {
@@ -180,122 +306,495 @@ def generate_markdown(record: LocalRecord) -> str:
     return "\n".join(lines)
 
 
-def write_record(
+def lookup_seen_url(url: str, config, seen: Optional[SeenUrls] = None) -> Optional[tuple[str, dict]]:
+    """Earlier capture of the same URL, if any (no network). `seen` is reused when given."""
+    try:
+        if seen is not None:
+            return seen.lookup(url)
+        seen = SeenUrls.for_config(config)
+        try:
+            return seen.lookup(url)
+        finally:
+            seen.close()
+    except Exception as e:
+        print(f"⚠️  Seen-URL lookup failed: {e}", file=sys.stderr)
+        return None
+
+
+def _stored_url_metadata(url: str, record: dict):
+    """URLMetadata rebuilt from an earlier record, or None if it has none worth reusing."""
+    if not any(record.get(k) for k in ("og_title", "og_description", "og_image")):
+        return None
+    return _url_parser().URLMetadata(
+        source_url=record.get("source_url") or url,
+        source_platform=record.get("source_platform"),
+        og_title=record.get("og_title"),
+        og_description=record.get("og_description"),
+        og_image=record.get("og_image"),
+    )
+
+
+def find_recent_duplicate(content_hash: str, config, index: Optional[LocalIndex] = None) -> Optional[tuple[str, str, dict]]:
+    """Existing record for the same capture within the dedupe window, if any. `index` is reused when given."""
+    if config.dedupe_window_minutes <= 0:
+        return None
+    try:
+        since = datetime.now().timestamp() - config.dedupe_window_minutes * 60
+        if index is not None:
+            return index.find_duplicate(content_hash, since)
+        index = LocalIndex.for_config(config)
+        try:
+            return index.find_duplicate(content_hash, since)
+        finally:
+            index.close()
+    except Exception as e:
+        print(f"⚠️  Dedupe lookup failed (writing anyway): {e}", file=sys.stderr)
+        return None
+
+
+def _duplicate_result(duplicate: tuple[str, str, dict], dry_run: bool) -> dict:
+    """write_record result for a capture that was already stored."""
+    json_path, md_path, record = duplicate
+    return {
+        "success": True,
+        "dry_run": dry_run,
+        "deduplicated": True,
+        "notion_synced": bool(record.get("notion_page_id")),
+        "notion_pending": record.get("notion_sync_status") == "PENDING",
+        "notion_error": record.get("notion_error"),
+        "notion_page_id": record.get("notion_page_id"),
+        "notion_url": record.get("notion_url"),
+        "local_md": md_path,
+        "local_json": json_path,
+        "supabase_synced": record.get("supabase_sync_status") == "SUCCESS",
+        "supabase_error": record.get("supabase_error"),
+        "record": record
+    }
+
+
+@dataclass
+class Capture:
+    """A capture on its way through write_records: planned, published, then saved."""
+    record: LocalRecord
+    seen_url: Optional[str] = None
+    fetch_url: Optional[str] = None  # URL whose metadata still needs a parse_url fetch
+    repeat_of: Optional["Capture"] = None  # same capture planned earlier in the batch
+    md_path: Optional[Path] = None
+    json_path: Optional[Path] = None
+    queued: bool = False  # Notion page left to the outbox (NOTION_SYNC=outbox)
+
+
+@dataclass
+class CaptureStats:
+    """Counts and stage timings of a write_records run."""
+    written: int = 0
+    deduplicated: int = 0
+    failed: int = 0
+    notion_pending: int = 0
+    plan_s: float = 0.0
+    remote_s: float = 0.0
+    save_s: float = 0.0
+    elapsed_s: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return self.written + self.deduplicated + self.failed
+
+    @property
+    def per_second(self) -> float:
+        return self.total / self.elapsed_s if self.elapsed_s else 0.0
+
+
+def _apply_url_metadata(record: LocalRecord, meta) -> None:
+    """Fill source/og_* fields (and an empty title or body) from URL metadata."""
+    if meta is None or meta.error:
+        # keep any caller-provided fields and leave rest None
+        return
+    record.source_url = record.source_url or meta.source_url
+    record.source_platform = record.source_platform or meta.source_platform
+    record.og_title = record.og_title or meta.og_title
+    record.og_image = record.og_image or meta.og_image
+    record.og_description = record.og_description or meta.og_description
+    if (not record.title or record.title == "Untitled") and meta.og_title:
+        record.title = meta.og_title
+    if not record.final_body.strip() and meta.og_description:
+        record.final_body = meta.og_description
+
+
+def plan_capture(
     input_data: dict,
-    dry_run: bool = False
-) -> dict:
-    """
-    Write a record to Notion and local storage.
-    
-    Args:
-        input_data: Dictionary with record data
-        dry_run: If True, skip Notion write but still return what would be written
-    
-    Returns:
-        Dictionary with result information
+    config,
+    force: bool = False,
+    index: Optional[LocalIndex] = None,
+    seen: Optional[SeenUrls] = None,
+):
     """
-    config = get_config()
-    local_id = str(_uuid.uuid4())
+    Local half of a capture: parse the input, check for a duplicate and reuse
+    stored URL metadata. No network calls.
 
+    Returns the existing record's result dict for a duplicate, else a Capture.
+    """
     # Parse input
     record_type = input_data.get("type", "idea")
     title = input_data.get("title", "Untitled")
     body = input_data.get("body", "")
     source_text = input_data.get("source_text", "")
-    date = input_data.get("date")
-    tags = input_data.get("tags", [])
-    source_url = input_data.get("source_url")
-    source_platform = input_data.get("source_platform")
-    og_title = input_data.get("og_title")
-    og_image = input_data.get("og_image")
-    og_description = input_data.get("og_description")
 
-    # Optional: resolve URL metadata when source_url given or source_text is a single URL
-    if parse_url and (source_url or _is_single_url(source_text)):
-        url_to_parse = source_url or _extract_url_from_text(source_text)
-        if url_to_parse:
-            meta = parse_url(url_to_parse)
-            if not meta.error:
-                source_url = source_url or meta.source_url
-                source_platform = source_platform or meta.source_platform
-                og_title = og_title or meta.og_title
-                og_image = og_image or meta.og_image
-                og_description = og_description or meta.og_description
-                if (not title or title == "Untitled") and meta.og_title:
-                    title = meta.og_title
-                if not body.strip() and meta.og_description:
-                    body = meta.og_description
-            # if meta.error, keep any caller-provided fields and leave rest None
-    
-    # Create record data for Notion
-    notion_data = RecordData(
-        record_type=record_type,
-        title=title,
-        body_markdown=body,
-        date=date,
-        tags=tags
-    )
-    
-    # Write to Notion (unless dry run) - with fallback on failure
-    notion_result: Optional[NotionPage] = None
-    notion_error: Optional[str] = None
-    notion_sync_status = "SUCCESS"
-    
-    if not dry_run:
-        try:
-            client = NotionClient()
-            notion_result = client.create_record(notion_data)
-        except Exception as e:
-            # Notion failed - record error but continue with local write
-            notion_error = str(e)
-            notion_sync_status = "PENDING"
-            print(f"⚠️  Notion sync failed (will write locally): {e}", file=sys.stderr)
-    
-    # Create local record (always, even if Notion failed)
-    local_record = LocalRecord(
+    # A re-submitted capture returns the stored record: no network calls, no new files
+    content_hash = capture_hash(record_type, title, body, source_text)
+    if not force:
+        duplicate = find_recent_duplicate(content_hash, config, index)
+        if duplicate is not None:
+            return duplicate
+
+    capture = Capture(LocalRecord(
         type=record_type,
         title=title,
         created_at=datetime.now().isoformat(),
-        notion_page_id=notion_result.page_id if notion_result else None,
-        notion_url=notion_result.url if notion_result else None,
+        notion_page_id=None,
+        notion_url=None,
         source_text=source_text,
         final_body=body,
-        tags=tags,
-        date=date,
-        notion_sync_status=notion_sync_status,
-        notion_error=notion_error,
-        source_url=source_url,
-        source_platform=source_platform,
-        og_title=og_title,
-        og_image=og_image,
-        og_description=og_description,
-        supabase_id=local_id,
-    )
-    
-    # Save locally (always, even on dry run for testing)
-    if not dry_run:
-        md_path, json_path = save_local(local_record, config)
-        # Supabase sync (optional — skip if not configured)
-        _sync_to_supabase(local_record, local_id, config)
-    else:
-        md_path = json_path = Path("/dry-run/would-save-here")
-    
+        tags=input_data.get("tags", []),
+        date=input_data.get("date"),
+        source_url=input_data.get("source_url"),
+        source_platform=input_data.get("source_platform"),
+        og_title=input_data.get("og_title"),
+        og_image=input_data.get("og_image"),
+        og_description=input_data.get("og_description"),
+        supabase_id=str(_uuid.uuid4()),
+        content_hash=content_hash,
+    ))
+
+    # Optional: resolve URL metadata when source_url given or source_text is a single URL
+    record = capture.record
+    if (record.source_url or _is_single_url(source_text)) and _url_parser():
+        url_to_parse = record.source_url or _extract_url_from_text(source_text)
+        if url_to_parse:
+            # A URL captured before reuses its stored metadata instead of a fetch
+            seen_url = lookup_seen_url(url_to_parse, config, seen)
+            meta = _stored_url_metadata(url_to_parse, seen_url[1]) if seen_url else None
+            if seen_url:
+                capture.seen_url = seen_url[0]
+                if config.warn_seen_urls:
+                    print(f"ℹ️  URL already captured: {capture.seen_url}", file=sys.stderr)
+            if meta is None:
+                capture.fetch_url = url_to_parse
+            else:
+                _apply_url_metadata(record, meta)
+    return capture
+
+
+def publish_capture(capture: Capture, client: Optional["NotionClient"], client_error: Optional[Exception] = None) -> None:
+    """
+    Remote half of a capture: fetch URL metadata if still needed, then create
+    the Notion page. A Notion failure marks the record PENDING; it is still
+    saved locally. client=None with no client_error skips Notion (a dry run,
+    or NOTION_SYNC=outbox).
+    """
+    record = capture.record
+    if capture.fetch_url:
+        _apply_url_metadata(record, _url_parser().parse_url(capture.fetch_url))
+    if client is None and client_error is None:
+        return
+    # Notion failed - record error but continue with local write
+    if not sync_to_notion(record, client, client_error):
+        print(f"⚠️  Notion sync failed (will write locally): {record.notion_error}", file=sys.stderr)
+
+
+def sync_to_notion(record: LocalRecord, client: Optional["NotionClient"], client_error: Optional[Exception] = None) -> bool:
+    """Create the Notion page of a record. On failure the record is marked PENDING with the error."""
+    from notion_api import RecordData
+
+    try:
+        if client is None:
+            raise client_error
+        notion_result = client.create_record(RecordData(
+            record_type=record.type,
+            title=record.title,
+            body_markdown=record.final_body,
+            date=record.date,
+            tags=record.tags
+        ))
+    except Exception as e:
+        record.notion_error = str(e)
+        record.notion_sync_status = "PENDING"
+        return False
+    record.notion_page_id = notion_result.page_id
+    record.notion_url = notion_result.url
+    return True
+
+
+def _capture_result(capture: Capture, dry_run: bool) -> dict:
+    """write_record result for a newly written capture."""
+    record = capture.record
     return {
         "success": True,  # Local write succeeded
         "dry_run": dry_run,
-        "notion_synced": notion_result is not None,
-        "notion_pending": notion_error is not None,
-        "notion_error": notion_error,
-        "notion_page_id": local_record.notion_page_id,
-        "notion_url": local_record.notion_url,
-        "local_md": str(md_path),
-        "local_json": str(json_path),
-        "supabase_synced": local_record.supabase_sync_status == "SUCCESS",
-        "supabase_error": local_record.supabase_error,
-        "record": asdict(local_record)
+        "deduplicated": False,
+        "seen_url": capture.seen_url,
+        "notion_synced": record.notion_page_id is not None,
+        "notion_pending": record.notion_sync_status == "PENDING",
+        "notion_queued": capture.queued,
+        "notion_error": record.notion_error,
+        "notion_page_id": record.notion_page_id,
+        "notion_url": record.notion_url,
+        "local_md": str(capture.md_path),
+        "local_json": str(capture.json_path),
+        "supabase_synced": record.supabase_sync_status == "SUCCESS",
+        "supabase_error": record.supabase_error,
+        "record": asdict(record)
+    }
+
+
+def _error_result(e: Exception) -> dict:
+    """write_record result for a capture that failed."""
+    error_code = "UNKNOWN_ERROR"
+    if "NOTION_TOKEN" in str(e):
+        error_code = "NOTION_AUTH_FAILED"
+    elif "Invalid" in str(e):
+        error_code = "INVALID_INPUT"
+    return {
+        "success": False,
+        "error_code": error_code,
+        "error": str(e)
     }
 
 
+class CaptureContext:
+    """
+    Everything a capture needs besides its input: config, local index,
+    seen-URL filter and Notion client. write_record/write_records open one
+    per call; capture_daemon.py keeps one open across captures.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self.index = LocalIndex.for_config(self.config)
+        self.seen = SeenUrls(self.index)
+        self._notion: Optional[tuple] = None
+        self._outbox = None
+        # Set by capture_daemon.py to its drain thread; otherwise queueing starts a drainer process
+        self.drainer = None
+        self._drainer_process = None
+
+    def queue_notion(self, captures: list[Capture]) -> None:
+        """Add saved captures to the Notion outbox and get a drainer going."""
+        from notion_outbox import NotionOutbox, start_drainer
+
+        if self._outbox is None:
+            self._outbox = NotionOutbox.for_config(self.config)
+        self._outbox.enqueue_many([(c.record.supabase_id, str(c.json_path)) for c in captures])
+        for capture in captures:
+            capture.queued = True
+        if self.drainer is not None:
+            self.drainer.wake(self.config)
+        elif self._drainer_process is None or self._drainer_process.poll() is not None:
+            # One drainer process at a time per context: it drains until nothing is due
+            try:
+                self._drainer_process = start_drainer(self.config)
+            except OSError as e:
+                print(f"⚠️  Could not start the Notion outbox drainer (run notion_outbox.py --drain): {e}", file=sys.stderr)
+
+    def notion(self) -> tuple[Optional["NotionClient"], Optional[Exception]]:
+        """(client, None), or (None, error) if the client cannot be created. Created once."""
+        if self._notion is None:
+            try:
+                from notion_api import NotionClient
+
+                self._notion = (NotionClient(self.config), None)
+            except Exception as e:
+                self._notion = (None, e)
+        return self._notion
+
+    def refresh(self) -> None:
+        """Pick up config edits and records written by other processes since the last capture."""
+        config = get_config()
+        if config is self.config:
+            self.seen.invalidate()
+            return
+        # .env, local state or log home changed: start over with the new config
+        self.close()
+        self.config = config
+        self.index = LocalIndex.for_config(config)
+        self.seen = SeenUrls(self.index)
+        self._notion = None
+
+    def close(self) -> None:
+        self.index.close()
+        if self._outbox is not None:
+            self._outbox.close()
+            self._outbox = None
+
+
+def _run_stage(fn, items: list, workers: int) -> None:
+    """Call fn on every item, on up to `workers` threads."""
+    if workers <= 1 or len(items) <= 1:
+        for item in items:
+            fn(item)
+        return
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        list(pool.map(fn, items))
+
+
+def write_records(
+    inputs: Iterable,
+    dry_run: bool = False,
+    force: bool = False,
+    workers: int = DEFAULT_WORKERS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    stats: Optional[CaptureStats] = None,
+    context: Optional[CaptureContext] = None,
+) -> Iterator[dict]:
+    """
+    Write many records, yielding one result per input, in input order.
+
+    Inputs are consumed lazily in batches of `batch_size`. Each batch goes
+    through the pipeline: plan (dedupe and seen-URL lookups on one shared
+    local index) → remote (URL fetch + Notion page, `workers` at a time) →
+    bulk local save (one index transaction) → Supabase sync (`workers` at a
+    time). With NOTION_SYNC=outbox the Notion page is left out of the remote
+    stage; saved records are queued for a background drainer instead, one
+    drainer per run. One CaptureContext (config, index, Notion client)
+    serves the whole run; pass `context` to reuse one across runs.
+
+    An input that is not a dict (e.g. the ValueError of an unparsable JSONL
+    line) yields an INVALID_INPUT result in its place.
+    """
+    stats = stats if stats is not None else CaptureStats()
+    start = time.perf_counter()
+    owned = context is None
+    context = context or CaptureContext()
+    config, index, seen = context.config, context.index, context.seen
+    # Dry runs never reach Notion; outbox captures reach it after they are saved
+    outbox = config.notion_sync == "outbox" and not dry_run
+    client, client_error = context.notion() if not (dry_run or outbox) else (None, None)
+    inputs = iter(inputs)
+    dedupe_in_batch = not force and config.dedupe_window_minutes > 0
+    try:
+        while True:
+            batch = list(islice(inputs, batch_size))
+            if not batch:
+                break
+
+            t = time.perf_counter()
+            slots = []
+            # content_hash -> Capture planned earlier in this batch (not yet visible to a dedupe lookup)
+            in_batch: dict[str, Capture] = {}
+            for item in batch:
+                try:
+                    if isinstance(item, Exception):
+                        raise ValueError(f"Invalid input: {item}")
+                    if not isinstance(item, dict):
+                        raise ValueError("Invalid input: expected a JSON object")
+                    planned = plan_capture(item, config, force, index, seen)
+                    if isinstance(planned, Capture) and dedupe_in_batch:
+                        earlier = in_batch.setdefault(planned.record.content_hash, planned)
+                        if earlier is not planned:
+                            planned = Capture(earlier.record, repeat_of=earlier)
+                    slots.append(planned)
+                except Exception as e:
+                    slots.append(_error_result(e))
+            fresh = [s for s in slots if isinstance(s, Capture) and s.repeat_of is None]
+            stats.plan_s += time.perf_counter() - t
+
+            t = time.perf_counter()
+            _run_stage(lambda c: publish_capture(c, client, client_error), fresh, workers)
+            stats.remote_s += time.perf_counter() - t
+
+            t = time.perf_counter()
+            if dry_run:
+                for capture in fresh:
+                    capture.md_path = capture.json_path = Path("/dry-run/would-save-here")
+            elif fresh:
+                if outbox:
+                    for capture in fresh:
+                        capture.record.notion_sync_status = "PENDING"
+                paths = save_local_many([c.record for c in fresh], config, index)
+                for capture, (md_path, json_path) in zip(fresh, paths):
+                    capture.md_path, capture.json_path = md_path, json_path
+                if outbox:
+                    context.queue_notion(fresh)
+            stats.save_s += time.perf_counter() - t
+
+            if not dry_run:
+                # Supabase sync (optional — skip if not configured)
+                t = time.perf_counter()
+                _run_stage(lambda c: _sync_to_supabase(c.record, c.record.supabase_id, config), fresh, workers)
+                stats.remote_s += time.perf_counter() - t
+
+            for slot in slots:
+                if isinstance(slot, dict):
+                    stats.failed += 1
+                    yield slot
+                elif isinstance(slot, tuple):
+                    stats.deduplicated += 1
+                    yield _duplicate_result(slot, dry_run)
+                elif slot.repeat_of is not None:
+                    stats.deduplicated += 1
+                    first = slot.repeat_of
+                    yield _duplicate_result((str(first.json_path), str(first.md_path), asdict(first.record)), dry_run)
+                else:
+                    stats.written += 1
+                    stats.notion_pending += slot.record.notion_sync_status == "PENDING"
+                    yield _capture_result(slot, dry_run)
+    finally:
+        if owned:
+            context.close()
+        stats.elapsed_s = time.perf_counter() - start
+
+
+def write_record(
+    input_data: dict,
+    dry_run: bool = False,
+    force: bool = False,
+    context: Optional[CaptureContext] = None
+) -> dict:
+    """
+    Write a record to Notion and local storage.
+    
+    Args:
+        input_data: Dictionary with record data
+        dry_run: If True, skip Notion write but still return what would be written
+        force: If True, write even if the same capture was stored within the dedupe window
+        context: Open CaptureContext to reuse (the capture daemon keeps one warm)
+    
+    Returns:
+        Dictionary with result information ("success": False with an error_code on invalid input)
+    """
+    return next(write_records([input_data], dry_run=dry_run, force=force, workers=1, context=context))
+
+
+def log_capture(result: dict) -> None:
+    """Central log entry for one write_record result."""
+    log_manager.write_central_log(
+        task_intent=f"capture_{result['record']['type']}",
+        event_data={
+            "record_type": result['record']['type'],
+            "title": result['record']['title'],
+            "notion_url": result['notion_url'],
+            "local_path": result['local_md'],
+            "tags": result['record']['tags'],
+            "deduplicated": result['deduplicated'],
+            "notion_pending": result['notion_pending']
+        },
+        status="SUCCESS"
+    )
+
+
+def _read_jsonl(stream) -> Iterator:
+    """Parsed objects of a JSONL stream (blank lines skipped); bad lines yield their ValueError."""
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield e
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Write records to Notion and local storage"
@@ -303,21 +802,49 @@ def main():
     parser.add_argument(
         "--input", "-i",
         type=str,
-        help="Path to JSON input file"
+        help="Path to JSON input file (or JSONL file with --jsonl)"
     )
     parser.add_argument(
         "--stdin",
         action="store_true",
         help="Read JSON from stdin"
     )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Input is one JSON record per line; results are streamed as JSONL"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Concurrent Notion/Supabase requests in --jsonl mode (default {DEFAULT_WORKERS})"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Records saved per local batch in --jsonl mode (default {DEFAULT_BATCH_SIZE})"
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="Show what would be written without actually writing"
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Write even if the same capture was stored within DEDUPE_WINDOW_MINUTES"
+    )
     
     args = parser.parse_args()
     
+    if args.jsonl:
+        if not (args.stdin or args.input):
+            parser.error("--jsonl needs --input FILE or --stdin")
+        main_jsonl(args)
+        return
+
     # Read input
     if args.stdin:
         input_data = json.load(sys.stdin)
@@ -330,36 +857,71 @@ def main():
     
     # Execute
     try:
-        result = write_record(input_data, dry_run=args.dry_run)
-        # Central Log
-        log_manager.write_central_log(
-            task_intent=f"capture_{result['record']['type']}",
-            event_data={
-                "record_type": result['record']['type'],
-                "title": result['record']['title'],
-                "notion_url": result['notion_url'],
-                "local_path": result['local_md'],
-                "tags": result['record']['tags']
-            },
-            status="SUCCESS"
+        result = write_record(input_data, dry_run=args.dry_run, force=args.force)
+    except Exception as e:
+        result = _error_result(e)
+    if not result["success"]:
+        print(json.dumps(result, indent=2))
+        sys.exit(1)
+    # Central Log
+    log_capture(result)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+def main_jsonl(args) -> None:
+    """--jsonl: stream results as JSONL on stdout, throughput report on stderr."""
+    stream = sys.stdin if args.stdin else open(args.input, "r", encoding="utf-8")
+    stats = CaptureStats()
+    # One central log entry per capture, appended in batches
+    log_manager.enable_buffering()
+    try:
+        results = write_records(
+            _read_jsonl(stream),
+            dry_run=args.dry_run,
+            force=args.force,
+            workers=max(1, args.workers),
+            batch_size=max(1, args.batch_size),
+            stats=stats,
         )
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+        for result in results:
+            if result["success"]:
+                log_capture(result)
+            print(json.dumps(result, ensure_ascii=False), flush=True)
     except Exception as e:
-        error_code = "UNKNOWN_ERROR"
-        if "NOTION_TOKEN" in str(e):
-            error_code = "NOTION_AUTH_FAILED"
-        elif "Invalid" in str(e):
-            error_code = "INVALID_INPUT"
-        print(json.dumps({
-            "success": False,
-            "error_code": error_code,
-            "error": str(e)
-        }, indent=2))
+        print(json.dumps(_error_result(e)), flush=True)
+        sys.exit(1)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    log_manager.write_central_log(
+        task_intent="capture_batch",
+        event_data={
+            "written": stats.written,
+            "deduplicated": stats.deduplicated,
+            "failed": stats.failed,
+            "notion_pending": stats.notion_pending,
+            "elapsed_s": round(stats.elapsed_s, 3),
+            "records_per_s": round(stats.per_second, 1),
+        },
+        status="SUCCESS"
+    )
+    print(
+        f"✅ {stats.total} records in {stats.elapsed_s:.1f}s ({stats.per_second:.0f}/s): "
+        f"{stats.written} written, {stats.deduplicated} deduplicated, {stats.failed} failed, "
+        f"{stats.notion_pending} Notion pending",
+        file=sys.stderr,
+    )
+    print(
+        f"   plan {stats.plan_s:.1f}s · remote {stats.remote_s:.1f}s · local save {stats.save_s:.1f}s",
+        file=sys.stderr,
+    )
+    if stats.failed:
         sys.exit(1)
 
 
-def _sync_to_supabase(record: LocalRecord, local_id: str, config) -> None:
-    """Sync record to Supabase. Silently skips if not configured."""
+def _sync_to_supabase(record: LocalRecord, local_id: str, config, is_deleted: bool = False) -> None:
+    """Sync record to Supabase (or its deletion). Silently skips if not configured."""
     url = os.environ.get("SUPABASE_URL", "").strip()
     key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "").strip()
     user_id = os.environ.get("KOF_USER_ID", "").strip()
@@ -369,14 +931,11 @@ def _sync_to_supabase(record: LocalRecord, local_id: str, config) -> None:
         return
 
     try:
-        resp = _req.post(
+        import http_transport
+
+        resp = http_transport.post_json(
             f"{url}/rest/v1/rpc/upsert_record",
-            headers={
-                "apikey": key,
-                "Authorization": f"Bearer {key}",
-                "Content-Type": "application/json",
-            },
-            json={
+            {
                 "p_id": local_id,
                 "p_user_id": user_id,
                 "p_local_id": local_id,
@@ -392,10 +951,11 @@ def _sync_to_supabase(record: LocalRecord, local_id: str, config) -> None:
                 "p_og_image": record.og_image,
                 "p_key_insight": None,
                 "p_date": record.date,
-                "p_is_deleted": False,
-                "p_updated_at": record.created_at,
+                "p_is_deleted": is_deleted,
+                "p_updated_at": datetime.now().isoformat() if is_deleted else record.created_at,
             },
-            timeout=10,
+            headers={"apikey": key, "Authorization": f"Bearer {key}"},
+            default_timeout=10,
         )
         if resp.ok:
             record.supabase_sync_status = "SUCCESS"
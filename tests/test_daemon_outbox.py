@@ -0,0 +1,75 @@
+"""The capture daemon's drain thread covers every brain it queued Notion pages in."""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+SCRIPTS = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS))
+
+
+def _brain(root: Path) -> Path:
+    (root / ".agentic").mkdir(parents=True)
+    (root / ".agentic" / "CENTRAL_LOG_MARKER").touch()
+    return root
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    import capture_daemon
+    import notion_outbox
+
+    monkeypatch.setenv("NOTION_TOKEN", "test")
+    monkeypatch.setenv("NOTION_PARENT", "test")
+    monkeypatch.setenv("NOTION_SYNC", "outbox")
+    monkeypatch.setenv("ANTIGRAVITY_LOG_HOME", str(_brain(tmp_path / "daemon")))
+    monkeypatch.delenv("SUPABASE_URL", raising=False)
+
+    drained: list[tuple[Path, int]] = []
+    lock = threading.Condition()
+
+    def fake_drain(config, notion=None, **kwargs):
+        outbox = notion_outbox.NotionOutbox.for_config(config)
+        try:
+            pending = len(outbox.entries()) if outbox.exists() else 0
+        finally:
+            outbox.close()
+        with lock:
+            drained.append((config.records_dir.parent, pending))
+            lock.notify_all()
+
+    monkeypatch.setattr(notion_outbox, "drain", fake_drain)
+    server = capture_daemon.CaptureServer(tmp_path / "daemon.sock")
+    try:
+        yield server, drained, lock
+    finally:
+        server.server_close()
+
+
+def _wait_for(drained, lock, homes) -> bool:
+    """Wait until every home was drained with its entry still queued."""
+    with lock:
+        return lock.wait_for(lambda: homes <= {home for home, pending in drained if pending}, timeout=10)
+
+
+def test_drains_each_brain_queued_in(tmp_path, daemon):
+    server, drained, lock = daemon
+    homes = {_brain(tmp_path / "brain_a"), _brain(tmp_path / "brain_b")}
+    for n, home in enumerate(sorted(homes)):
+        result = server.handle_message({
+            "op": "write",
+            "input": {"type": "idea", "title": f"Outbox idea {n}", "content": "Body"},
+            "cwd": str(home),
+            "log_home": str(home),
+        })
+        assert result["success"], result
+        assert result["notion_queued"]
+    assert _wait_for(drained, lock, homes), drained
+
+    # A retry round (what runs every RETRY_DELAY_S) covers both brains, not just the last one captured in
+    with lock:
+        drained.clear()
+    server.drainer.wake()
+    assert _wait_for(drained, lock, homes), drained
@@ -0,0 +1,57 @@
+"""search.py --facets against a throwaway brain, with and without filters."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parent.parent / "scripts"
+
+
+def _brain(tmp_path: Path) -> Path:
+    ideas = tmp_path / "records" / "ideas"
+    ideas.mkdir(parents=True)
+    for n, tags in enumerate((["alpha", "beta"], ["alpha"])):
+        record = {
+            "type": "idea",
+            "title": f"Facet idea {n}",
+            "created_at": f"2026-01-0{n + 1}T10:00:00",
+            "final_body": "Body text",
+            "tags": tags,
+            "notion_sync_status": "SUCCESS",
+        }
+        (ideas / f"2026010{n + 1}_100000_idea_facet-idea-{n}.json").write_text(json.dumps(record), encoding="utf-8")
+    (tmp_path / ".agentic").mkdir()
+    (tmp_path / ".agentic" / "CENTRAL_LOG_MARKER").touch()
+    return tmp_path
+
+
+def _search(brain: Path, *args: str) -> subprocess.CompletedProcess:
+    env = {**os.environ, "ANTIGRAVITY_LOG_HOME": str(brain), "NOTION_TOKEN": "test", "NOTION_PARENT": "test"}
+    return subprocess.run(
+        [sys.executable, str(SCRIPTS / "search.py"), *args],
+        cwd=brain, env=env, capture_output=True, text=True, timeout=60,
+    )
+
+
+def test_facets_without_filter(tmp_path):
+    result = _search(_brain(tmp_path), "--facets")
+    assert result.returncode == 0, result.stderr
+    assert "Error" not in result.stdout
+    assert "📦 2 records" in result.stdout
+    assert "alpha (2), beta (1)" in result.stdout
+
+
+def test_local_facets_with_query_without_filter(tmp_path):
+    result = _search(_brain(tmp_path), "--local", "--facets", "facet")
+    assert result.returncode == 0, result.stderr
+    assert "Error" not in result.stdout
+    assert "📦 2 records" in result.stdout
+    assert "Facet idea" in result.stdout
+
+
+def test_facets_with_filter(tmp_path):
+    result = _search(_brain(tmp_path), "--facets", "--tag", "beta")
+    assert result.returncode == 0, result.stderr
+    assert "📦 1 records" in result.stdout